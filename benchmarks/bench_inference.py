@@ -0,0 +1,94 @@
+"""Compare the AST and bytecode return type inference engines.
+
+Usage: python benchmarks/bench_inference.py [ROUTES] [REPEAT]
+"""
+
+import importlib.util
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+
+import flask
+
+from typesync.codegen import RouteTypeExtractor
+from typesync.codegen.extractor import BufferedLogger
+from typesync.codegen.inference import InferenceCache, InferenceEngine
+
+
+HELPERS = """
+def load_user(user_id: int):
+    return {"id": user_id, "name": "user", "email": "user@example.com"}
+
+
+def load_tags():
+    return ["admin", "staff", "user"]
+"""
+
+VIEW = """
+def get_view_{i}(user_id: int):
+    user = load_user(user_id)
+    if user_id < 0:
+        return None
+    return user, load_tags(), [user_id, 1, 2], ("ok", 200)
+"""
+
+
+def make_app(routes: int, directory: str) -> flask.Flask:
+    # The views are written to a module, so that their source can be found
+    path = Path(directory) / "bench_inference_views.py"
+    path.write_text(
+        HELPERS + "".join(textwrap.dedent(VIEW.format(i=i)) for i in range(routes))
+    )
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    app = flask.Flask(__name__)
+    for i in range(routes):
+        app.add_url_rule(
+            f"/users/<int:user_id>/{i}", f"get_{i}", getattr(module, f"get_view_{i}")
+        )
+    return app
+
+
+def extract_all(app: flask.Flask, engine: InferenceEngine) -> None:
+    logger = BufferedLogger()
+    # A run's cache, so that shared helpers are only inferred once
+    with InferenceCache():
+        for rule in app.url_map.iter_rules():
+            RouteTypeExtractor(
+                app,
+                rule,
+                inference_enabled=True,
+                inference_engine=engine,
+                logger=logger,
+            ).parse_return_types()
+
+
+def bench(app: flask.Flask, engine: InferenceEngine, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_all(app, engine)
+        best = min(best, time.perf_counter() - start)
+    per_route = best / len(list(app.url_map.iter_rules())) * 1e6
+    print(f"{engine:>10}: {best * 1e3:8.2f} ms total, {per_route:8.2f} us/route")
+    return best
+
+
+def main() -> None:
+    routes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(routes, directory)
+        ast_time = bench(app, "ast", repeat)
+        bytecode_time = bench(app, "bytecode", repeat)
+    print(f"{'speedup':>10}: {ast_time / bytecode_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
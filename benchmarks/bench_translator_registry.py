@@ -0,0 +1,106 @@
+"""Compare the per-route extraction cost with and without a shared registry.
+
+Usage: python benchmarks/bench_translator_registry.py [ROUTES] [REPEAT]
+"""
+
+import sys
+import time
+import typing
+
+import flask
+import pydantic
+
+from typesync.codegen import RouteTypeExtractor
+from typesync.type_translators import TranslatorRegistry
+from typesync.utils import Response, with_json_body
+
+
+class User(typing.TypedDict):
+    id: int
+    name: str
+    tags: list[str]
+
+
+class Page[T](typing.TypedDict):
+    items: list[T]
+    total: int
+
+
+type UserPage = Page[User]
+
+
+class Payload(pydantic.BaseModel):
+    name: str
+    tags: list[str]
+
+
+def make_app(routes: int) -> flask.Flask:
+    app = flask.Flask(__name__)
+    for i in range(routes):
+
+        def get_view(user_id: int) -> Response[UserPage]:
+            raise NotImplementedError
+
+        @with_json_body
+        def post_view(user_id: int, json: Payload) -> User:
+            raise NotImplementedError
+
+        app.add_url_rule(f"/users/<int:user_id>/{i}", f"get_{i}", get_view)
+        app.add_url_rule(
+            f"/users/<int:user_id>/{i}/edit",
+            f"post_{i}",
+            post_view,
+            methods=("POST",),
+        )
+    return app
+
+
+class PerCallRegistryExtractor(RouteTypeExtractor):
+    """Mimics the old behaviour of building every translator on each call."""
+
+    def translate_type(self, type_, ctx):
+        return TranslatorRegistry().translate(type_, ctx)
+
+
+def extract_all(app: flask.Flask, extractor_factory) -> None:
+    for rule in app.url_map.iter_rules():
+        extractor = extractor_factory(rule)
+        extractor.parse_return_types()
+        extractor.parse_args_types()
+        extractor.parse_json_body()
+
+
+def bench(name: str, app: flask.Flask, extractor_factory, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_all(app, extractor_factory)
+        best = min(best, time.perf_counter() - start)
+    per_route = best / len(list(app.url_map.iter_rules())) * 1e6
+    print(f"{name:>10}: {best * 1e3:8.2f} ms total, {per_route:8.2f} us/route")
+    return best
+
+
+def main() -> None:
+    routes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    app = make_app(routes)
+
+    registry = TranslatorRegistry()
+    before = bench(
+        "per-call",
+        app,
+        lambda rule: PerCallRegistryExtractor(app, rule),
+        repeat,
+    )
+    after = bench(
+        "shared",
+        app,
+        lambda rule: RouteTypeExtractor(app, rule, registry=registry),
+        repeat,
+    )
+    print(f"{'speedup':>10}: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
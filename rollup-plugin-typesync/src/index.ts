@@ -1,8 +1,10 @@
 import { Plugin, PluginContext } from "rollup";
-import { SpawnOptionsWithoutStdio, spawn } from "node:child_process";
+import { ChildProcessWithoutNullStreams, SpawnOptionsWithoutStdio, spawn } from "node:child_process";
 
 import fg from "fast-glob";
 import path from "node:path";
+import { readFile } from "node:fs/promises";
+import { createInterface } from "node:readline";
 
 interface RequiredTypesyncPluginOptions {
     outDir: string;
@@ -17,9 +19,12 @@ interface OptionalTypesyncPluginOptions {
     inferenceCanEval: boolean;
     typesFileName: string;
     apisFileName: string;
+    manifestFileName: string;
     returnTypeFormat: string;
     argsTypeFormat: string;
     functionNameFormat: string;
+    persistentWorker: boolean;
+    debounceMs: number;
 }
 
 export type TypesyncPluginOptions = RequiredTypesyncPluginOptions & Partial<OptionalTypesyncPluginOptions>;
@@ -51,6 +56,10 @@ function cmdLineArgsFromOptions(options: Partial<OptionalTypesyncPluginOptions>)
         args.push("--apis-file");
         args.push(options.apisFileName);
     }
+    if (options.manifestFileName) {
+        args.push("--manifest-file");
+        args.push(options.manifestFileName);
+    }
     if (options.returnTypeFormat) {
         args.push("--return-type-format");
         args.push(options.returnTypeFormat);
@@ -75,11 +84,19 @@ async function aspawn(command: string, args: readonly string[] | undefined, opti
         }
         child.on("close", code => resolve(code));
         child.on("exit", code => resolve(code));
+        // e.g. aborted through options.signal
+        child.on("error", () => resolve(null));
     });
     return { status, output };
 }
 
-async function runCodegen(this: PluginContext, options: TypesyncPluginOptions) {
+interface CodegenOutcome {
+    status: "ok" | "failed" | "cancelled";
+    // Time spent generating code on the Python side, when known
+    durationMs?: number;
+}
+
+async function runCodegen(this: PluginContext, options: TypesyncPluginOptions, changed: string[], signal?: AbortSignal): Promise<CodegenOutcome> {
     const {
         backendRoot,
         outDir,
@@ -91,14 +108,20 @@ async function runCodegen(this: PluginContext, options: TypesyncPluginOptions) {
             "typesync",
             "generate",
             path.resolve(outDir),
-            ...cmdLineArgsFromOptions(options)
+            ...cmdLineArgsFromOptions(options),
+            ...changed.flatMap(file => ["--changed", file])
         ],
         {
             cwd: path.resolve(backendRoot),
             shell: process.platform === "win32",
+            signal,
         }
     );
 
+    if (signal?.aborted) {
+        return { status: "cancelled" };
+    }
+
     for (const line of result.output.split("\n")) {
         if (line.startsWith("Warning: ")) {
             this.warn(line.substring(9));
@@ -106,30 +129,375 @@ async function runCodegen(this: PluginContext, options: TypesyncPluginOptions) {
     }
 
     if (result.status !== 0) {
-       this.warn(`codegen failed with status ${result.status}`);
+        this.warn(`codegen failed with status ${result.status}`);
+        return { status: "failed" };
+    }
+    return { status: "ok" };
+}
+
+/** The source files each route was generated from, written by typesync next to the generated code. */
+interface TypesyncManifest {
+    version: number;
+    app: string | null;
+    routes: Record<string, string[] | null>;
+    files: string[];
+}
+
+async function readManifest(options: TypesyncPluginOptions): Promise<TypesyncManifest | null> {
+    const manifestPath = path.join(path.resolve(options.outDir), options.manifestFileName ?? ".typesync-manifest.json");
+    try {
+        const manifest: TypesyncManifest = JSON.parse(await readFile(manifestPath, "utf-8"));
+        return manifest.version === 2 ? manifest : null;
+    }
+    catch {
+        return null;
+    }
+}
+
+function affectedRoutes(manifest: TypesyncManifest, file: string): string[] {
+    return Object.entries(manifest.routes)
+        .filter(([, files]) => files?.includes(file))
+        .map(([endpoint]) => endpoint);
+}
+
+function addWatchFiles(context: PluginContext, files: Iterable<string>) {
+    for (const file of files) {
+        try {
+            context.addWatchFile(file);
+        }
+        catch {
+            // Rollup only accepts watch files while building, they are added again
+            // by the next buildStart
+        }
+    }
+}
+
+interface WorkerMessage {
+    level: "info" | "warning" | "error";
+    text: string;
+}
+
+interface WorkerResponse {
+    id: number | null;
+    ok: boolean;
+    updated?: string[];
+    messages?: WorkerMessage[];
+    error?: string;
+    cancelled?: boolean;
+    duration_ms?: number;
+}
+
+/**
+ * A long-lived `flask typesync serve --stdio` process, which keeps the Flask app
+ * loaded between code generation requests.
+ */
+class TypesyncWorker {
+    private child: ChildProcessWithoutNullStreams;
+    private nextId = 1;
+    private pending = new Map<number, (response: WorkerResponse) => void>();
+    private ready: Promise<void>;
+    private exited = false;
+    private stderr = "";
+
+    constructor(options: TypesyncPluginOptions) {
+        this.child = spawn(
+            "flask",
+            [
+                "typesync",
+                "serve",
+                "--stdio",
+                path.resolve(options.outDir),
+                ...cmdLineArgsFromOptions(options)
+            ],
+            {
+                cwd: path.resolve(options.backendRoot),
+                shell: process.platform === "win32",
+            }
+        );
+
+        let resolveReady = () => {};
+        this.ready = new Promise<void>(resolve => resolveReady = resolve);
+
+        createInterface({ input: this.child.stdout }).on("line", line => {
+            let message: WorkerResponse & { event?: string };
+            try {
+                message = JSON.parse(line);
+            }
+            catch {
+                return;
+            }
+            if (message.event === "ready") {
+                resolveReady();
+                return;
+            }
+            const resolve = message.id === null ? undefined : this.pending.get(message.id);
+            if (resolve !== undefined && message.id !== null) {
+                this.pending.delete(message.id);
+                resolve(message);
+            }
+        });
+        // Keep the end of stderr around to explain why the worker died
+        this.child.stderr.on("data", (chunk: string) => {
+            this.stderr = (this.stderr + chunk).slice(-4096);
+        });
+
+        const onExit = (reason: string) => {
+            if (this.exited) return;
+            this.exited = true;
+            const error = `typesync worker ${reason}${this.stderr ? `:\n${this.stderr}` : ""}`;
+            for (const resolve of this.pending.values()) {
+                resolve({ id: null, ok: false, error });
+            }
+            this.pending.clear();
+            resolveReady();
+        };
+        this.child.on("exit", code => onExit(`exited with status ${code}`));
+        this.child.on("error", err => onExit(`failed to start (${err.message})`));
+    }
+
+    get alive(): boolean {
+        return !this.exited;
+    }
+
+    async request(command: string, payload: Record<string, unknown> = {}): Promise<WorkerResponse> {
+        await this.ready;
+        if (this.exited) {
+            return { id: null, ok: false, error: `typesync worker is not running${this.stderr ? `:\n${this.stderr}` : ""}` };
+        }
+        const id = this.nextId++;
+        return new Promise<WorkerResponse>(resolve => {
+            this.pending.set(id, resolve);
+            this.child.stdin.write(JSON.stringify({ id, command, ...payload }) + "\n");
+        });
     }
-    else {
-        this.info("codegen finished")
+
+    async shutdown() {
+        if (this.exited) return;
+        await this.request("shutdown");
+        this.child.stdin.end();
     }
 }
 
+async function runWorkerCodegen(this: PluginContext, worker: TypesyncWorker, changed: string[], signal?: AbortSignal): Promise<CodegenOutcome> {
+    const cancel = () => void worker.request("cancel");
+    signal?.addEventListener("abort", cancel, { once: true });
+    let response: WorkerResponse;
+    try {
+        response = await worker.request("generate", { changed });
+    }
+    finally {
+        signal?.removeEventListener("abort", cancel);
+    }
+    if (response.cancelled) {
+        return { status: "cancelled", durationMs: response.duration_ms };
+    }
+
+    for (const message of response.messages ?? []) {
+        if (message.level !== "info") {
+            this.warn(message.text);
+        }
+    }
+
+    if (!response.ok) {
+        this.warn(`codegen failed${response.error ? ` (${response.error})` : ""}`);
+        return { status: "failed", durationMs: response.duration_ms };
+    }
+    return { status: "ok", durationMs: response.duration_ms };
+}
+
+function plural(count: number, noun: string): string {
+    return `${count} ${noun}${count === 1 ? "" : "s"}`;
+}
+
 export default function TypesyncPlugin(options: TypesyncPluginOptions): Plugin {
+    const persistentWorker = options.persistentWorker ?? true;
+    let worker: TypesyncWorker | null = null;
+
+    function getWorker(): TypesyncWorker {
+        // Start a new worker if the previous one died (e.g. the app failed to import)
+        if (worker === null || !worker.alive) {
+            worker = new TypesyncWorker(options);
+        }
+        return worker;
+    }
+
+    const debounceMs = options.debounceMs ?? 100;
+    // Whether a run was requested since the last one started, and the changes and
+    // number of file events that it covers
+    let queued = false;
+    const pendingChanges = new Set<string>();
+    let pendingEvents = 0;
+    let queuedAt = 0;
+    let debounceTimer: ReturnType<typeof setTimeout> | null = null;
+    let running: Promise<void> | null = null;
+    let runController: AbortController | null = null;
+    let cancelledRuns = 0;
+
+    function queue() {
+        if (!queued) {
+            queued = true;
+            queuedAt = performance.now();
+        }
+    }
+
+    // The files the generated code depends on, or null while they aren't known
+    // (e.g. before the first run, or if some route's sources couldn't be found)
+    let watchedFiles: Set<string> | null = null;
+    let manifest: TypesyncManifest | null = null;
+
+    async function loadManifest(context: PluginContext) {
+        manifest = await readManifest(options);
+        const complete = manifest !== null && Object.values(manifest.routes).every(files => files !== null);
+        watchedFiles = complete && manifest !== null ? new Set(manifest.files) : null;
+        if (watchedFiles !== null) {
+            addWatchFiles(context, watchedFiles);
+        }
+    }
+
+    async function regenerate(context: PluginContext) {
+        const changed = [...pendingChanges];
+        const events = pendingEvents;
+        const waitedMs = performance.now() - queuedAt;
+        queued = false;
+        pendingChanges.clear();
+        pendingEvents = 0;
+
+        const controller = runController = new AbortController();
+        const start = performance.now();
+        const outcome = persistentWorker
+            ? await runWorkerCodegen.call(context, getWorker(), changed, controller.signal)
+            : await runCodegen.call(context, options, changed, controller.signal);
+        runController = null;
+
+        if (outcome.status === "cancelled") {
+            // Newer changes came in, the next run covers these ones too
+            for (const file of changed) {
+                pendingChanges.add(file);
+            }
+            pendingEvents += events;
+            cancelledRuns++;
+            queue();
+            return;
+        }
+
+        const previousManifest = manifest;
+        await loadManifest(context);
+        if (outcome.status === "ok") {
+            const details: string[] = [];
+            if (outcome.durationMs !== undefined) {
+                details.push(`python ${Math.round(outcome.durationMs)}ms`);
+            }
+            if (events > 0) {
+                details.push(`${plural(events, "file event")} coalesced over ${Math.round(waitedMs)}ms`);
+            }
+            if (previousManifest !== null && changed.length > 0) {
+                const routes = new Set(changed.flatMap(file => affectedRoutes(previousManifest, file)));
+                details.push(`${plural(routes.size, "affected route")}`);
+            }
+            if (cancelledRuns > 0) {
+                details.push(`${plural(cancelledRuns, "outdated run")} cancelled`);
+            }
+            context.info(
+                `codegen finished in ${Math.round(performance.now() - start)}ms`
+                + (details.length > 0 ? ` (${details.join(", ")})` : "")
+            );
+        }
+        cancelledRuns = 0;
+    }
+
+    /** Run codegen until no run is queued, unless more changes are still being debounced. */
+    function drain(context: PluginContext): Promise<void> {
+        if (running === null && queued) {
+            running = (async () => {
+                try {
+                    do {
+                        await regenerate(context);
+                    } while (queued && debounceTimer === null);
+                }
+                finally {
+                    running = null;
+                }
+            })();
+        }
+        return running ?? Promise.resolve();
+    }
+
+    async function flush(context: PluginContext) {
+        if (debounceTimer !== null) {
+            clearTimeout(debounceTimer);
+            debounceTimer = null;
+        }
+        await drain(context);
+    }
+
+    function schedule(context: PluginContext, file: string) {
+        queue();
+        pendingChanges.add(file);
+        pendingEvents++;
+        // The running codegen, if any, is already out of date
+        runController?.abort();
+        if (debounceTimer !== null) {
+            clearTimeout(debounceTimer);
+        }
+        debounceTimer = setTimeout(() => {
+            debounceTimer = null;
+            void drain(context);
+        }, debounceMs);
+    }
+
+    async function stopWorker() {
+        if (debounceTimer !== null) {
+            clearTimeout(debounceTimer);
+            debounceTimer = null;
+        }
+        runController?.abort();
+        await running;
+        const current = worker;
+        worker = null;
+        await current?.shutdown();
+    }
+
+    let started = false;
+
     return {
         name: "typesync",
         async buildStart() {
-            const files = await fg(path.join(options.backendRoot, "*"), {
-                dot: true,
-                absolute: true,
-                onlyFiles: true,
-            });
-            for (const file of files) {
-                this.addWatchFile(file);
+            // The manifest of a previous run tells which files to watch, without it
+            // fall back to watching the files in backendRoot
+            await loadManifest(this);
+            if (watchedFiles === null) {
+                const files = await fg(path.join(options.backendRoot, "*"), {
+                    dot: true,
+                    absolute: true,
+                    onlyFiles: true,
+                });
+                addWatchFiles(this, files);
+            }
+            if (!started) {
+                started = true;
+                queue();
+            }
+            // Later builds (in watch mode) wait for the changes that triggered them
+            await flush(this);
+        },
+        watchChange(id) {
+            const file = path.resolve(id);
+            if (watchedFiles !== null ? !watchedFiles.has(file) : !file.startsWith(path.resolve(options.backendRoot))) {
+                return;
+            }
+            // Bursts of changes (e.g. a git checkout) are debounced into a single
+            // run. The worker only extracts the routes depending on the changed
+            // files again, the others are reused from its previous run.
+            schedule(this, file);
+        },
+        async buildEnd() {
+            // Outside of watch mode there won't be another build to serve
+            if (!this.meta.watchMode) {
+                await stopWorker();
             }
-            await runCodegen.call(this, options);
         },
-        async watchChange(id) {
-            if (!id.startsWith(path.resolve(options.backendRoot))) return;
-            await runCodegen.call(this, options);
+        async closeWatcher() {
+            await stopWorker();
         }
     };
 }
@@ -1,10 +1,17 @@
+import pathlib
+import sys
+import textwrap
 import typing
+from collections.abc import Mapping
 
 import flask
 import pytest
+from werkzeug.routing import Rule
 
+from typesync.cli import cli
 from typesync.ts_types import TSType
 from typesync.codegen.extractor import RouteTypeExtractor
+from typesync.type_translators import TranslationContext
 
 
 @pytest.fixture
@@ -14,6 +21,69 @@ def app():
 
 
 type ParserFixture = typing.Callable[[flask.Flask, str], TSType | None]
+type ExtractorFixture = typing.Callable[..., RouteTypeExtractor]
+type ModulesFixture = typing.Callable[..., pathlib.Path]
+type GenerateFixture = typing.Callable[..., str]
+
+
+@pytest.fixture
+def translation_context() -> TranslationContext:
+    """The context of translating the return type of a GET route."""
+    return TranslationContext(
+        rule=Rule("/"),
+        view_function=lambda: None,
+        method="GET",
+        mode="RETURN",
+        inferred=False,
+    )
+
+
+@pytest.fixture
+def extractor():
+    """Create a `RouteTypeExtractor` for the route of `endpoint`, passing it any
+    other keyword arguments."""
+
+    def inner(
+        app: flask.Flask, endpoint: str, **kwargs: typing.Any
+    ) -> RouteTypeExtractor:
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint == endpoint:
+                return RouteTypeExtractor(app, rule, **kwargs)
+        raise KeyError(endpoint)
+
+    return inner
+
+
+@pytest.fixture
+def write_modules(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """Write the `sources` of modules (by name) to `directory` (`tmp_path` by
+    default) and put it on `sys.path`, so that the tests import them afresh."""
+
+    def inner(
+        sources: Mapping[str, str], directory: pathlib.Path | None = None
+    ) -> pathlib.Path:
+        root = tmp_path if directory is None else directory
+        root.mkdir(parents=True, exist_ok=True)
+        for name, source in sources.items():
+            (root / f"{name}.py").write_text(textwrap.dedent(source))
+            monkeypatch.delitem(sys.modules, name, raising=False)
+        monkeypatch.syspath_prepend(str(root))
+        return root
+
+    return inner
+
+
+@pytest.fixture
+def generate():
+    """Run `generate` for `app` into `out_dir` with the other `args`, and return
+    its output."""
+
+    def inner(app: flask.Flask, out_dir: pathlib.Path, *args: str) -> str:
+        result = app.test_cli_runner().invoke(cli, ["generate", str(out_dir), *args])
+        assert result.exit_code == 0, result.output
+        return result.output
+
+    return inner
 
 
 @pytest.fixture
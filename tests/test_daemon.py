@@ -0,0 +1,134 @@
+import importlib
+import io
+import json
+import pathlib
+import time
+import typing
+
+import pytest
+from flask import Flask
+
+from typesync.codegen.extractor import BufferedLogger
+from typesync.codegen.generator import (
+    CodeGenerator,
+    GenerateOptions,
+    GenerationCancelledError,
+)
+from typesync.daemon import Daemon, stale_modules
+
+from conftest import ModulesFixture
+
+
+@pytest.fixture
+def project(tmp_path: pathlib.Path, write_modules: ModulesFixture) -> pathlib.Path:
+    return write_modules(
+        {
+            "daemon_models": """
+                import typing
+
+
+                class User(typing.TypedDict):
+                    id: int
+                """,
+            "daemon_views": """
+                from daemon_models import User
+
+
+                def user() -> User: ...
+                """,
+            "daemon_app": """
+                from flask import Flask
+
+                import daemon_views
+
+                app = Flask(__name__)
+                app.add_url_rule("/user", "user", daemon_views.user)
+                """,
+            "daemon_unrelated": "X = 1\n",
+        },
+        tmp_path / "project",
+    )
+
+
+def load_app() -> Flask:
+    return importlib.import_module("daemon_app").app
+
+
+def test_stale_modules(project: pathlib.Path) -> None:
+    load_app()
+    importlib.import_module("daemon_unrelated")
+
+    assert stale_modules([str(project / "daemon_models.py")], str(project)) == {
+        "daemon_models",
+        "daemon_views",
+        "daemon_app",
+    }
+    assert stale_modules([str(project / "daemon_unrelated.py")], str(project)) == {
+        "daemon_unrelated"
+    }
+
+
+def test_daemon_regenerates_changed_modules(
+    project: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    models = project / "daemon_models.py"
+    requests = [
+        {"id": 1, "command": "generate"},
+        {"id": 2, "command": "generate", "changed": []},
+        {"id": 3, "command": "generate", "changed": [str(models)]},
+        {"id": 4, "command": "shutdown"},
+    ]
+
+    stdout = io.StringIO()
+
+    def stdin() -> typing.Iterator[str]:
+        for sent, request in enumerate(requests):
+            # Like the Rollup plugin, wait for the previous response (after the
+            # "ready" event) before sending the next request
+            deadline = time.monotonic() + 10
+            while len(stdout.getvalue().splitlines()) <= sent:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            # Modify the sources right before the request that reports the change
+            if request["id"] == 3:
+                models.write_text(models.read_text() + "    name: str\n")
+            yield json.dumps(request) + "\n"
+
+    out_dir = tmp_path / "out"
+    Daemon(
+        CodeGenerator(GenerateOptions(str(out_dir)), keep_in_memory=True),
+        load_app(),
+        load_app,
+        str(project),
+        stdin(),  # type: ignore[arg-type]
+        stdout,
+    ).serve()
+
+    ready, first, second, third, shutdown = map(
+        json.loads, stdout.getvalue().splitlines()
+    )
+    assert ready == {"event": "ready"}
+    assert first["ok"]
+    assert first["updated"] == ["types.ts", "apis.ts"]
+    assert second["ok"]
+    assert second["updated"] == []
+    assert third["ok"]
+    assert third["updated"] == ["types.ts"]
+    assert shutdown == {"id": 4, "ok": True}
+    assert "{id: number; name: string;}" in (out_dir / "types.ts").read_text()
+
+
+def test_cancelled_generation_leaves_files_untouched(
+    project: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    out_dir = tmp_path / "out"
+    generator = CodeGenerator(GenerateOptions(str(out_dir)))
+    app = load_app()
+
+    with app.app_context(), pytest.raises(GenerationCancelledError):
+        generator.run(app, BufferedLogger(), cancelled=lambda: True)
+    assert not (out_dir / "types.ts").exists()
+
+    with app.app_context():
+        assert generator.run(app, BufferedLogger(), cancelled=lambda: False).ok
+    assert (out_dir / "types.ts").exists()
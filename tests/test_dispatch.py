@@ -0,0 +1,101 @@
+import dataclasses
+import typing
+
+import pytest
+
+from typesync.ts_types import TSSimpleType, TSType
+from typesync.type_translators import (
+    TranslationContext,
+    Translator,
+    TranslatorRegistry,
+    TypeNode,
+)
+
+
+class Money:
+    pass
+
+
+class MoneyTranslator(Translator):
+    ID = "tests.MoneyTranslator"
+    DEFAULT_PRIORITY = 10
+    ORIGINS = frozenset({Money})
+
+    def translate(
+        self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
+    ) -> TSType | None:
+        return TSSimpleType("string")
+
+
+class CatchAllTranslator(Translator):
+    # Declares nothing, so it is consulted for every node
+    ID = "tests.CatchAllTranslator"
+    DEFAULT_PRIORITY = -1000
+
+    def translate(
+        self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
+    ) -> TSType | None:
+        return TSSimpleType("unknown")
+
+
+class Nested:
+    pass
+
+
+class NestingTranslator(Translator):
+    # Starts another translation, with another context, while translating `Nested`
+    ID = "tests.NestingTranslator"
+    ORIGINS = frozenset({Nested})
+    registry: typing.ClassVar[TranslatorRegistry]
+
+    def translate(
+        self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
+    ) -> TSType | None:
+        outer_method = self.ctx.method
+        self.registry.translate(int, dataclasses.replace(self.ctx, method="POST"))
+        return TSSimpleType(f'"{outer_method} {self.ctx.method}"')
+
+
+class Payload(typing.TypedDict):
+    amount: Money
+    items: list[int]
+    extra: set[int]
+
+
+def test_only_matching_translators_are_consulted(
+    translation_context: TranslationContext,
+) -> None:
+    registry = TranslatorRegistry(
+        (MoneyTranslator, CatchAllTranslator), collect_stats=True
+    )
+    result, _ = registry.translate(Payload, translation_context)
+    assert result.generate() == "{amount: string; items: number[]; extra: unknown;}"
+
+    assert registry.stats is not None
+    # The catch-all is only consulted for `set`, which no other translator handles
+    assert registry.stats["tests.MoneyTranslator"].attempts == 1
+    assert registry.stats["tests.CatchAllTranslator"].attempts == 1
+    assert registry.stats["typesync.PydanticTranslator"].attempts == 0
+    assert registry.stats["typesync.FlaskTranslator"].attempts == 0
+
+
+def test_unhashable_origins_consult_every_translator(
+    translation_context: TranslationContext,
+) -> None:
+    registry = TranslatorRegistry((CatchAllTranslator,), collect_stats=True)
+    result, _ = registry.translate(typing.Literal[1], translation_context)
+    assert result.generate() == "number"
+    assert registry._candidates([]) == registry.translators
+
+
+def test_nested_translations_restore_the_context(
+    translation_context: TranslationContext,
+) -> None:
+    registry = TranslatorRegistry((NestingTranslator,))
+    NestingTranslator.registry = registry
+    result, _ = registry.translate(Nested, translation_context)
+    assert result.generate() == '"GET GET"'
+
+    # Contexts are only bound while translating
+    with pytest.raises(RuntimeError):
+        registry.translators[0].ctx  # noqa: B018
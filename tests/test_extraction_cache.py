@@ -0,0 +1,147 @@
+import importlib
+import pathlib
+import sys
+import textwrap
+
+import pytest
+from flask import Flask
+
+from conftest import GenerateFixture, ModulesFixture
+
+
+MODELS = textwrap.dedent(
+    """
+    import typing
+
+
+    class User(typing.TypedDict):
+        id: int
+        name: str
+    """
+)
+
+
+COUNTS = textwrap.dedent(
+    """
+    def count():
+        return 1
+    """
+)
+HELPERS = textwrap.dedent(
+    """
+    from cached_counts import count
+
+
+    def total():
+        return count()
+    """
+)
+
+
+@pytest.fixture
+def models(write_modules: ModulesFixture) -> pathlib.Path:
+    return write_modules({"cached_models": MODELS}) / "cached_models.py"
+
+
+@pytest.fixture
+def counts(write_modules: ModulesFixture) -> pathlib.Path:
+    root = write_modules({"cached_counts": COUNTS, "cached_helpers": HELPERS})
+    return root / "cached_counts.py"
+
+
+def make_app() -> Flask:
+    models = importlib.import_module("cached_models")
+    app = Flask(__name__)
+
+    def user() -> models.User: ...
+
+    def count() -> int: ...
+
+    app.add_url_rule("/user", "user", user)
+    app.add_url_rule("/count", "count", count)
+    return app
+
+
+def make_inferred_app() -> Flask:
+    helpers = importlib.import_module("cached_helpers")
+    app = Flask(__name__)
+
+    def total():
+        return helpers.total()
+
+    app.add_url_rule("/total", "total", total)
+    return app
+
+
+def cache_args(tmp_path: pathlib.Path) -> tuple[str, ...]:
+    return ("--cache-dir", str(tmp_path / "cache"), "--cache-stats")
+
+
+def test_unchanged_routes_are_loaded_from_cache(
+    tmp_path: pathlib.Path, models: pathlib.Path, generate: GenerateFixture
+) -> None:
+    app = make_app()
+    first = generate(app, tmp_path / "first", *cache_args(tmp_path))
+    second = generate(app, tmp_path / "second", *cache_args(tmp_path))
+
+    assert "extraction cache: 0 hits, 3 misses" in first
+    assert "extraction cache: 3 hits, 0 misses" in second
+    for name in ("types.ts", "apis.ts"):
+        assert (tmp_path / "first" / name).read_text() == (
+            tmp_path / "second" / name
+        ).read_text()
+
+
+def test_changed_sources_invalidate_routes(
+    tmp_path: pathlib.Path, models: pathlib.Path, generate: GenerateFixture
+) -> None:
+    generate(make_app(), tmp_path / "out", *cache_args(tmp_path))
+    models.write_text(MODELS + "    email: str\n")
+    sys.modules.pop("cached_models")
+
+    output = generate(make_app(), tmp_path / "out", *cache_args(tmp_path))
+
+    # Only the route using `User` depends on the modified module
+    assert "extraction cache: 2 hits, 1 misses" in output
+    assert "email: string;" in (tmp_path / "out" / "types.ts").read_text()
+
+
+def test_changed_helpers_invalidate_inferred_routes(
+    tmp_path: pathlib.Path, counts: pathlib.Path, generate: GenerateFixture
+) -> None:
+    generate(
+        make_inferred_app(), tmp_path / "out", *cache_args(tmp_path), "--inference"
+    )
+    # `count` is only called by `total`, in another module
+    counts.write_text(COUNTS.replace("return 1", 'return "one"'))
+    sys.modules.pop("cached_counts")
+    sys.modules.pop("cached_helpers")
+
+    output = generate(
+        make_inferred_app(), tmp_path / "out", *cache_args(tmp_path), "--inference"
+    )
+
+    assert "extraction cache: 1 hits, 1 misses" in output
+    assert (
+        "export type TotalGETReturnType = string;"
+        in (tmp_path / "out" / "types.ts").read_text()
+    )
+
+
+def test_pruning_keeps_other_files(
+    tmp_path: pathlib.Path, models: pathlib.Path, generate: GenerateFixture
+) -> None:
+    cache = tmp_path / "cache"
+    app = make_app()
+    generate(app, tmp_path / "out", *cache_args(tmp_path))
+    entries = set(cache.glob("*.typesync.pickle"))
+    other = cache / "other.pickle"
+    other.write_bytes(b"")
+
+    # Without the `count` route, whose entry is pruned
+    smaller_app = Flask(__name__)
+    smaller_app.add_url_rule("/user", "user", app.view_functions["user"])
+    generate(smaller_app, tmp_path / "out", *cache_args(tmp_path))
+
+    assert set(cache.glob("*.typesync.pickle")) < entries
+    assert other.exists()
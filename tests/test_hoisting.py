@@ -0,0 +1,199 @@
+import io
+import pathlib
+import typing
+
+from flask import Flask
+
+from typesync.annotations import ForHTTPGet
+from typesync.codegen import CodeWriter
+from typesync.codegen.extractor import BufferedLogger, RouteTypeExtractor
+from typesync.ts_types import TSArray, TSObject, TSReference, TSSimpleType
+from typesync.type_translators import TranslatorRegistry
+from typesync.utils import Loadable, with_json_body
+
+from conftest import ExtractorFixture, GenerateFixture
+
+
+type Tree[T] = tuple[T | Tree[T], ...]
+
+
+class User(typing.TypedDict):
+    id: int
+    name: str
+
+
+class Page[T](typing.TypedDict):
+    items: list[T]
+    total: int
+
+
+def test_named_type_is_declared_once(app: Flask, extractor: ExtractorFixture) -> None:
+    @app.route("/user")
+    def user() -> User: ...
+
+    @app.route("/users")
+    def users() -> list[User]: ...
+
+    registry = TranslatorRegistry(hoist_types=True)
+    user_type = extractor(app, "user", registry=registry).parse_return_types()["GET"]
+    users_type = extractor(app, "users", registry=registry).parse_return_types()["GET"]
+
+    assert isinstance(user_type, TSReference)
+    assert users_type == TSArray(user_type)
+    assert registry.declarations is not None
+    assert len(registry.declarations) == 1
+    declaration = registry.declarations[user_type.key]
+    assert declaration.name == "User"
+    assert declaration.definition == TSObject(
+        ("id", "name"), (TSSimpleType("number"), TSSimpleType("string"))
+    )
+
+
+def test_generic_types_become_ts_generics(
+    app: Flask, extractor: ExtractorFixture
+) -> None:
+    @app.route("/users")
+    def users() -> Page[User]: ...
+
+    registry = TranslatorRegistry(hoist_types=True)
+    result = extractor(app, "users", registry=registry).parse_return_types()["GET"]
+
+    assert result.generate() == "Page<User>"
+    assert registry.declarations is not None
+    declaration = registry.declarations[result.key]
+    assert declaration.params == ("T",)
+    assert declaration.definition.generate() == "{items: T[]; total: number;}"
+
+
+def test_recursive_alias_refers_to_itself(
+    app: Flask, extractor: ExtractorFixture
+) -> None:
+    @app.route("/tree")
+    def tree() -> Tree[int]: ...
+
+    registry = TranslatorRegistry(hoist_types=True)
+    result = extractor(app, "tree", registry=registry).parse_return_types()["GET"]
+
+    assert result.generate() == "Tree<number>"
+    assert registry.declarations is not None
+    declaration = registry.declarations[result.key]
+    assert declaration.definition.generate("Tree<T>") == "(T | Tree<T>)[]"
+
+
+def test_method_dependent_types_stay_inline(
+    app: Flask, extractor: ExtractorFixture
+) -> None:
+    class Item(typing.TypedDict):
+        value: ForHTTPGet[int]
+
+    @app.route("/item")
+    def item() -> Item: ...
+
+    registry = TranslatorRegistry(hoist_types=True)
+    result = extractor(app, "item", registry=registry).parse_return_types()["GET"]
+
+    assert result == TSObject(("value",), (TSSimpleType("number"),))
+    assert registry.declarations is not None
+    assert len(registry.declarations) == 0
+
+
+def test_types_are_declared_per_translation_mode(
+    app: Flask, extractor: ExtractorFixture
+) -> None:
+    class Body(typing.TypedDict):
+        x: Loadable[int]
+
+    @app.route("/body", methods=("POST",))
+    @with_json_body
+    def body(json: Body) -> Body: ...
+
+    @app.route("/user", methods=("POST",))
+    @with_json_body
+    def user(json: User) -> User: ...
+
+    registry = TranslatorRegistry(hoist_types=True)
+    logger = BufferedLogger()
+    body_extractor = extractor(app, "body", registry=registry, logger=logger)
+    json_body = body_extractor.parse_json_body()["POST"]
+    return_type = body_extractor.parse_return_types()["POST"]
+
+    assert isinstance(json_body, TSReference)
+    assert isinstance(return_type, TSReference)
+    assert json_body.key != return_type.key
+    assert registry.declarations is not None
+    assert registry.declarations[json_body.key].definition.generate() == (
+        "{x: number;}"
+    )
+    assert registry.declarations[return_type.key].definition.generate() == ("{x: any;}")
+    assert [level for level, _ in logger.records] == ["warning"]
+
+    # Types that translate the same way in both modes share their declaration
+    user_extractor = extractor(app, "user", registry=registry)
+    assert (
+        user_extractor.parse_json_body()["POST"]
+        == user_extractor.parse_return_types()["POST"]
+    )
+    assert len(registry.declarations) == 3
+
+
+def test_writer_declares_types_before_first_use(app: Flask) -> None:
+    class RequestArgs(typing.TypedDict):
+        page: Page[User]
+
+    @app.route("/a")
+    def a() -> RequestArgs: ...
+
+    @app.route("/b")
+    def b() -> User: ...
+
+    registry = TranslatorRegistry(hoist_types=True)
+    types_file = io.StringIO()
+    CodeWriter(
+        types_file,
+        io.StringIO(),
+        "types.ts",
+        "{r_pc}{m_uc}ReturnType",
+        "{r_pc}{m_uc}ArgsType",
+        "{m_lc}{r_pc}",
+        declarations=registry.declarations,
+    ).write(
+        RouteTypeExtractor(app, rule, registry=registry)
+        for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.endpoint)
+        if rule.endpoint != "static"
+    )
+
+    code = types_file.getvalue()
+    assert code.count("export type User = ") == 1
+    assert code.index("export type RequestArgs2 = {page: Page<User>;};") < code.index(
+        "export type Page<T> = {items: T[]; total: number;};"
+    )
+    assert code.index("export type User = ") < code.index(
+        "export type AGETReturnType = RequestArgs2;"
+    )
+    assert "export type BGETReturnType = User;" in code
+
+
+def test_declarations_dont_shadow_other_types(
+    app: Flask, tmp_path: pathlib.Path, generate: GenerateFixture
+) -> None:
+    class Record(typing.TypedDict):
+        id: int
+
+    class BGETReturnType(typing.TypedDict):
+        record: Record
+
+    # Declared before route "b" is written
+    @app.route("/a")
+    def a() -> BGETReturnType: ...
+
+    @app.route("/b")
+    def b() -> dict[str, Record]: ...
+
+    generate(app, tmp_path, "--hoist-types")
+
+    code = (tmp_path / "types.ts").read_text()
+    assert "headers?: Record<string, string>;" in code
+    assert "export type Record2 = {id: number;};" in code
+    assert "export type BGETReturnType2 = {record: Record2;};" in code
+    assert "export type AGETReturnType = BGETReturnType2;" in code
+    assert "export type BGETReturnType = Record<string, Record2>;" in code
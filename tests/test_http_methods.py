@@ -0,0 +1,31 @@
+from flask import Flask
+
+from typesync.annotations import ForHTTPGet, ForHTTPPost
+from typesync.ts_types import TSSimpleType, TSUnion
+
+from conftest import ExtractorFixture
+
+
+def test_method_independent_type_is_shared(
+    app: Flask, extractor: ExtractorFixture
+) -> None:
+    @app.route("/main", methods=("GET", "POST"))
+    def main() -> dict[str, list[int]]:
+        return {}
+
+    results = extractor(app, "main").parse_return_types()
+
+    assert set(results) == {"GET", "HEAD", "OPTIONS", "POST"}
+    assert len({id(result) for result in results.values()}) == 1
+
+
+def test_method_annotations(app: Flask, extractor: ExtractorFixture) -> None:
+    @app.route("/main", methods=("GET", "POST"))
+    def main() -> ForHTTPGet[int] | ForHTTPPost[str]:
+        return 1
+
+    results = extractor(app, "main").parse_return_types()
+
+    assert results["GET"] == TSUnion((TSSimpleType("number"), TSSimpleType("never")))
+    assert results["POST"] == TSUnion((TSSimpleType("never"), TSSimpleType("string")))
+    assert results["HEAD"] == TSUnion((TSSimpleType("never"), TSSimpleType("never")))
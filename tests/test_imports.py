@@ -0,0 +1,64 @@
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+
+def imported_modules(code: str) -> set[str]:
+    # Runs the current interpreter on code from the tests themselves
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    return {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+@pytest.mark.parametrize(
+    ("code", "unused"),
+    [
+        (
+            "import typesync",
+            {"click", "flask", "typesync.cli", "typesync.utils"},
+        ),
+        # What `app.cli.add_command(typesync.cli)` costs
+        (
+            "import typesync; typesync.cli",
+            set(),
+        ),
+        # The fast path of `python -m typesync generate`
+        (
+            "import typesync.stamp",
+            {"click", "flask"},
+        ),
+    ],
+)
+def test_imports_are_lazy(code: str, unused: set[str]) -> None:
+    imported = imported_modules(code)
+    assert "typesync" in imported
+    for module in {
+        *unused,
+        "inflection",
+        "prettytable",
+        "pydantic",
+        "typesync.codegen",
+        "typesync.type_translators",
+        "typesync.ts_types",
+    }:
+        assert module not in imported
+
+
+def test_extraction_does_not_import_report_tables() -> None:
+    imported = imported_modules("import typesync.codegen")
+    assert "typesync.profiling" in imported
+    assert "prettytable" not in imported
@@ -0,0 +1,80 @@
+import importlib
+import pathlib
+import sys
+
+import pytest
+from flask import Flask
+
+from conftest import GenerateFixture, ModulesFixture
+
+
+@pytest.fixture
+def project(write_modules: ModulesFixture) -> pathlib.Path:
+    return write_modules(
+        {
+            name: f"""
+                import typing
+
+
+                class {type_name}(typing.TypedDict):
+                    id: int
+
+
+                def get() -> {type_name}: ...
+                """
+            for name, type_name in (
+                ("incremental_users", "User"),
+                ("incremental_posts", "Post"),
+            )
+        }
+    )
+
+
+def make_app() -> Flask:
+    app = Flask(__name__)
+    for name in ("incremental_users", "incremental_posts"):
+        sys.modules.pop(name, None)
+        app.add_url_rule(f"/{name}", name, importlib.import_module(name).get)
+    return app
+
+
+def read_output(out_dir: pathlib.Path) -> tuple[str, str]:
+    return (out_dir / "types.ts").read_text(), (out_dir / "apis.ts").read_text()
+
+
+def test_only_changed_routes_are_extracted(
+    project: pathlib.Path, generate: GenerateFixture
+) -> None:
+    out_dir = project / "out"
+    generate(make_app(), out_dir)
+
+    posts = project / "incremental_posts.py"
+    posts.write_text(posts.read_text().replace("id: int", "id: int\n    title: str"))
+    output = generate(make_app(), out_dir, "--cache-stats", "--changed", str(posts))
+
+    # The users and static routes don't depend on the modified file
+    assert "incremental run: 2 routes reused, 1 extracted" in output
+    assert "title: string;" in (out_dir / "types.ts").read_text()
+    # Same result as a full run
+    generate(make_app(), project / "full")
+    assert read_output(out_dir) == read_output(project / "full")
+
+
+def test_modified_output_is_generated_again(
+    project: pathlib.Path, generate: GenerateFixture
+) -> None:
+    out_dir = project / "out"
+    generate(make_app(), out_dir)
+    types = (out_dir / "types.ts").read_text()
+    (out_dir / "types.ts").write_text(types + "// edited\n")
+
+    output = generate(
+        make_app(),
+        out_dir,
+        "--cache-stats",
+        "--changed",
+        str(project / "incremental_posts.py"),
+    )
+
+    assert "incremental run: 0 routes reused, 3 extracted" in output
+    assert (out_dir / "types.ts").read_text() == types
@@ -1,11 +1,78 @@
+import ast
+import functools
+import threading
 import typing
-from flask import Flask
 
+import pytest
+from flask import Flask
+from hypothesis import given
+from hypothesis import strategies as st
+
+from typesync.codegen import RouteTypeExtractor
+from typesync.codegen.extractor import BufferedLogger
+from typesync.codegen.inference import (
+    InferenceCache,
+    coalesce_types,
+    combine_types,
+    infer_return_type,
+)
 from typesync.ts_types import TSArray, TSRecord, TSSimpleType
 
 from conftest import ParserFixture
 
 
+def is_even(n: int):
+    if n == 0:
+        return True
+    return is_odd(n - 1)
+
+
+def is_odd(n: int):
+    if n == 0:
+        return False
+    return is_even(n - 1)
+
+
+def load_numbers():
+    return [1, 2, 3]
+
+
+def load_status(code: int):
+    if code == 0:
+        return "starting"
+    if code == 1:
+        return "running"
+    return "stopped"
+
+
+lock = threading.Lock()
+
+
+def load_locked():
+    with lock:
+        return {"a": 1}
+
+
+def load_file(path: str):
+    with open(path) as f:
+        return f.read()
+
+
+def load_number(text: str):
+    try:
+        with lock:
+            return int(text)
+    except ValueError:
+        return None
+
+
+def load_user(user_id: int):
+    user = {"id": user_id, "name": "user"}
+    if user_id < 0:
+        return None
+    return user, [load_numbers(), [user_id]], ("admin", 1)
+
+
 def test_literal_string(app: Flask, inf_return_parser: ParserFixture) -> None:
     @app.route("/main")
     def main():
@@ -129,3 +196,240 @@ def test_class_factory(app: Flask, inf_return_parser: ParserFixture) -> None:
     app.add_url_rule("/main", "main", make_route_function(TestInference))
 
     assert inf_return_parser(app, "main") == TSSimpleType("number")
+
+
+def test_mutually_recursive_helpers(
+    app: Flask, inf_return_parser: ParserFixture
+) -> None:
+    @app.route("/main")
+    def main():
+        return is_even(3)
+
+    result = inf_return_parser(app, "main")
+    assert result is not None
+    assert "boolean" in result.generate()
+
+
+def test_helpers_are_inferred_once(
+    app: Flask, inf_return_parser: ParserFixture
+) -> None:
+    @app.route("/first")
+    def first():
+        return load_numbers()
+
+    @app.route("/second")
+    def second():
+        return load_numbers()
+
+    with InferenceCache() as cache:
+        assert inf_return_parser(app, "first") == TSArray(TSSimpleType("number"))
+        assert inf_return_parser(app, "second") == TSArray(TSSimpleType("number"))
+    # Both views, and the helper the first time
+    assert cache.misses == 3
+    assert cache.hits == 1
+
+
+def test_modules_are_parsed_once(
+    app: Flask, inf_return_parser: ParserFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    parsed: list[str] = []
+    parse = ast.parse
+
+    def counting_parse(source: str, filename: str = "<unknown>", *args, **kwargs):
+        parsed.append(filename)
+        return parse(source, filename, *args, **kwargs)
+
+    monkeypatch.setattr(ast, "parse", counting_parse)
+
+    def decorate(f):
+        @functools.wraps(f)
+        def wrapper():
+            return f()
+
+        return wrapper
+
+    @app.route("/first")
+    @decorate
+    def first():
+        return is_even(1)
+
+    @app.route("/second")
+    def second():
+        return load_numbers()
+
+    with InferenceCache():
+        assert inf_return_parser(app, "first") is not None
+        assert inf_return_parser(app, "second") == TSArray(TSSimpleType("number"))
+    assert parsed.count(__file__) == 1
+
+
+@pytest.mark.parametrize(
+    "function",
+    [is_even, load_numbers, load_user, load_locked, load_file, load_number],
+)
+def test_engines_agree(function: typing.Callable) -> None:
+    logger = BufferedLogger()
+    assert infer_return_type(function, logger, False, "bytecode") == (
+        infer_return_type(function, logger, False, "ast")
+    )
+
+
+@pytest.mark.parametrize(
+    ("engine", "expected"),
+    [
+        ("ast", None),
+        ("bytecode", TSArray(TSSimpleType("number"))),
+        ("auto", TSArray(TSSimpleType("number"))),
+    ],
+)
+def test_view_without_source(app: Flask, engine: str, expected: object) -> None:
+    namespace: dict[str, typing.Any] = {}
+    exec(  # noqa: S102
+        compile("def main():\n    return [1, 2, 3]\n", "<generated>", "exec"),
+        namespace,
+    )
+    app.add_url_rule("/main", "main", namespace["main"])
+    rule = next(rule for rule in app.url_map.iter_rules() if rule.endpoint == "main")
+
+    extractor = RouteTypeExtractor(
+        app,
+        rule,
+        inference_enabled=True,
+        inference_engine=engine,  # type: ignore[arg-type]
+        logger=BufferedLogger(),
+    )
+    assert extractor.parse_return_types().get("GET") == expected
+
+
+def closest_common_parent_type_pairwise(
+    type1: object, type2: object, allow_literals: bool, max_literal_union: int
+) -> object:
+    # The original implementation of `closest_common_parent_type`, which builds a
+    # new literal type on each merge
+    if type1 == type2:
+        return type1
+
+    types = [type1, type2]
+    literals = True
+    for i, type_ in enumerate(types):
+        if typing.get_origin(type_) is typing.Literal:
+            types[i] = type(typing.get_args(type_)[0])
+        else:
+            literals = False
+
+    if types[0] == types[1]:
+        if literals and allow_literals:
+            args = list({*typing.get_args(type1), *typing.get_args(type2)})
+            if len(args) > 1 and types[0] is bool:
+                return bool
+            if len(args) <= max_literal_union:
+                return typing.Literal[*args]
+        return types[0]
+
+    origins = [typing.get_origin(type_) or type_ for type_ in types]
+    if origins[0] == origins[1]:
+        return origins[0]
+    return None
+
+
+def coalesce_types_pairwise(type_list: list, max_literal_union: int) -> list:
+    # The original implementation of `coalesce_types`, which merges pairs of types
+    # until no more can be merged
+    if len(type_list) <= 1:
+        return type_list
+
+    result = type_list[:]
+    i = 0
+    j = 1
+    while i + j < len(result):
+        if result[i] != result[i + j]:
+            common = closest_common_parent_type_pairwise(
+                result[i], result[i + j], True, max_literal_union
+            )
+            if common is not None:
+                result[i] = result[i + j] = common
+                i = 0
+                j = 0
+        j += 1
+        if i + j >= len(result):
+            j = 1
+            i += 1
+
+    return list(set(result))
+
+
+def literal_of(values: list) -> object:
+    return typing.Literal[*values]
+
+
+inferred_types = st.one_of(
+    st.sampled_from(
+        [
+            int,
+            str,
+            bool,
+            float,
+            type(None),
+            list,
+            list[int],
+            list[str],
+            dict,
+            dict[str, int],
+            dict[str, typing.Any],
+            tuple[int, str],
+            tuple[int, ...],
+            type[int],
+            type[str],
+            typing.Any,
+        ]
+    ),
+    st.lists(st.integers(-3, 12), min_size=1, max_size=4).map(literal_of),
+    st.lists(st.sampled_from("abcdefghijkl"), min_size=1, max_size=4).map(literal_of),
+    st.lists(st.booleans(), min_size=1, max_size=2).map(literal_of),
+    st.lists(st.sampled_from([0.5, 1.5, 2.5]), min_size=1, max_size=2).map(literal_of),
+)
+
+
+@given(st.lists(inferred_types, max_size=30), st.integers(1, 12))
+def test_coalesce_types_matches_pairwise_merging(
+    type_list: list, max_literal_union: int
+) -> None:
+    coalesced = coalesce_types(type_list, max_literal_union)
+    assert len(coalesced) == len(set(coalesced))
+    assert set(coalesced) == set(coalesce_types_pairwise(type_list, max_literal_union))
+
+
+@given(
+    st.lists(inferred_types, min_size=1, max_size=30),
+    st.booleans(),
+    st.integers(1, 12),
+)
+def test_combine_types_matches_pairwise_merging(
+    type_list: list, allow_literals: bool, max_literal_union: int
+) -> None:
+    expected = type_list[0]
+    for type_ in type_list[1:]:
+        expected = closest_common_parent_type_pairwise(
+            type_, expected, allow_literals, max_literal_union
+        )
+        if expected is None:
+            break
+    assert combine_types(type_list, allow_literals, max_literal_union) == expected
+
+
+@given(st.lists(inferred_types, max_size=30), st.randoms())
+def test_coalesce_types_ignores_order(type_list: list, random) -> None:
+    shuffled = type_list[:]
+    random.shuffle(shuffled)
+    assert set(coalesce_types(shuffled)) == set(coalesce_types(type_list))
+
+
+@pytest.mark.parametrize("engine", ["ast", "bytecode"])
+def test_max_literal_union(engine: typing.Any) -> None:
+    def infer(max_literal_union: int) -> object:
+        return infer_return_type(
+            load_status, BufferedLogger(), False, engine, max_literal_union
+        )
+
+    assert infer(3) == typing.Literal["starting", "running", "stopped"]
+    assert infer(2) is str
@@ -0,0 +1,64 @@
+import pathlib
+import sys
+import textwrap
+
+import pytest
+
+from typesync.__main__ import main
+
+from conftest import ModulesFixture
+
+APP = textwrap.dedent(
+    """
+    from flask import Flask
+
+    app = Flask(__name__)
+
+
+    @app.route("/count")
+    def count() -> int: ...
+    """
+)
+
+
+@pytest.fixture
+def project(
+    monkeypatch: pytest.MonkeyPatch, write_modules: ModulesFixture
+) -> pathlib.Path:
+    root = write_modules({"stamp_app": APP})
+    monkeypatch.chdir(root)
+    return root
+
+
+def run(capsys: pytest.CaptureFixture[str]) -> str:
+    sys.modules.pop("stamp_app", None)
+    assert main(["generate", "--app", "stamp_app:app", "out"]) == 0
+    return capsys.readouterr().out
+
+
+def test_unchanged_sources_skip_loading_the_app(
+    project: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    assert "updated types.ts, apis.ts" in run(capsys)
+
+    assert "nothing changed" in run(capsys)
+    assert "stamp_app" not in sys.modules
+
+    # Only the modification time changes
+    (project / "stamp_app.py").write_text(APP)
+    assert "nothing changed" in run(capsys)
+
+    (project / "stamp_app.py").write_text(APP.replace("-> int", "-> str"))
+    assert "updated types.ts" in run(capsys)
+    assert "stamp_app" in sys.modules
+
+
+def test_modified_output_is_generated_again(
+    project: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    run(capsys)
+    types = (project / "out" / "types.ts").read_text()
+    (project / "out" / "types.ts").write_text("")
+
+    assert "updated types.ts" in run(capsys)
+    assert (project / "out" / "types.ts").read_text() == types
@@ -0,0 +1,52 @@
+import importlib
+import json
+import pathlib
+
+import pytest
+from flask import Flask
+
+from conftest import GenerateFixture, ModulesFixture
+
+
+@pytest.fixture
+def project(write_modules: ModulesFixture) -> pathlib.Path:
+    return write_modules(
+        {
+            "manifest_models": """
+                import typing
+
+
+                class User(typing.TypedDict):
+                    id: int
+                """,
+            "manifest_views": """
+                import manifest_models
+
+
+                def user() -> manifest_models.User: ...
+
+
+                def count() -> int: ...
+                """,
+        }
+    )
+
+
+def test_manifest_lists_route_sources(
+    project: pathlib.Path, generate: GenerateFixture
+) -> None:
+    views = importlib.import_module("manifest_views")
+    app = Flask(__name__)
+    app.add_url_rule("/user", "user", views.user)
+    app.add_url_rule("/count", "count", views.count)
+
+    generate(app, project / "out")
+
+    manifest = json.loads((project / "out" / ".typesync-manifest.json").read_text())
+    models_file = str(project / "manifest_models.py")
+    views_file = str(project / "manifest_views.py")
+    assert manifest["routes"]["user"] == [models_file, views_file]
+    assert manifest["routes"]["count"] == [views_file]
+    # Library modules (such as `typing`) are left out
+    assert models_file in manifest["files"]
+    assert not any(path.endswith("typing.py") for path in manifest["files"])
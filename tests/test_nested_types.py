@@ -2,6 +2,7 @@ from flask import Flask
 
 from typesync.ts_types import (
     TSArray,
+    TSType,
     TSSimpleType,
     TSRecord,
     TSTuple,
@@ -9,6 +10,9 @@ from typesync.ts_types import (
     TSRecursiveType,
 )
 
+from typesync.codegen import RouteTypeExtractor
+from typesync.type_translators import TranslatorRegistry
+
 from conftest import ParserFixture
 
 
@@ -18,6 +22,20 @@ type AliasedArgs[A, B] = dict[str, tuple[Alias1[B], Alias2[A]]]
 type Recursive1[A] = tuple[A | Recursive1[A], ...]
 type Recursive2[A, B] = tuple[A | Recursive2[B, A], ...]
 type Recursive3[A, B, C] = tuple[A | Recursive3[C, A, B], ...]
+# Each level uses the previous one twice, 2^12 leaves once fully expanded
+type Doubled0[A] = list[A]
+type Doubled1[A] = tuple[Doubled0[A], Doubled0[A]]
+type Doubled2[A] = tuple[Doubled1[A], Doubled1[A]]
+type Doubled3[A] = tuple[Doubled2[A], Doubled2[A]]
+type Doubled4[A] = tuple[Doubled3[A], Doubled3[A]]
+type Doubled5[A] = tuple[Doubled4[A], Doubled4[A]]
+type Doubled6[A] = tuple[Doubled5[A], Doubled5[A]]
+type Doubled7[A] = tuple[Doubled6[A], Doubled6[A]]
+type Doubled8[A] = tuple[Doubled7[A], Doubled7[A]]
+type Doubled9[A] = tuple[Doubled8[A], Doubled8[A]]
+type Doubled10[A] = tuple[Doubled9[A], Doubled9[A]]
+type Doubled11[A] = tuple[Doubled10[A], Doubled10[A]]
+type Doubled12[A] = tuple[Doubled11[A], Doubled11[A]]
 
 
 def test_nested_depth_1(app: Flask, return_parser: ParserFixture) -> None:
@@ -116,3 +134,21 @@ def test_recursive_args_3(app: Flask, return_parser: ParserFixture) -> None:
             )
         )
     )
+
+
+def test_alias_instances_are_translated_once(app: Flask) -> None:
+    @app.route("/main")
+    def main() -> Doubled12[int]:
+        return ([], [])
+
+    registry = TranslatorRegistry(collect_stats=True)
+    rule = next(rule for rule in app.url_map.iter_rules() if rule.endpoint == "main")
+    result = RouteTypeExtractor(app, rule, registry=registry).parse_return_types()
+
+    expected: TSType = TSArray(TSSimpleType("number"))
+    for _ in range(12):
+        expected = TSTuple((expected, expected))
+    assert result["GET"] == expected
+    assert registry.stats is not None
+    # Linear in the depth of the aliases, rather than in the size of the type
+    assert registry.stats["typesync.BaseTranslator"].attempts < 100
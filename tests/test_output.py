@@ -0,0 +1,32 @@
+import os
+import pathlib
+
+from flask import Flask
+
+from typesync.cli import cli
+from typesync.codegen.output import replace_if_changed
+
+
+def test_replace_if_changed(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "types.ts"
+
+    assert replace_if_changed(str(path), "export type A = number;\n")
+    os.utime(path, ns=(0, 0))
+    assert not replace_if_changed(str(path), "export type A = number;\n")
+    assert path.stat().st_mtime_ns == 0
+
+    assert replace_if_changed(str(path), "export type A = string;\n")
+    assert path.read_text() == "export type A = string;\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["types.ts"]
+
+
+def test_unchanged_files_are_not_rewritten(app: Flask, tmp_path: pathlib.Path) -> None:
+    @app.route("/main")
+    def main() -> int: ...
+
+    runner = app.test_cli_runner()
+    first = runner.invoke(cli, ["generate", str(tmp_path)])
+    second = runner.invoke(cli, ["generate", str(tmp_path)])
+
+    assert "Info: updated types.ts, apis.ts" in first.output
+    assert "Info: generated files are up to date" in second.output
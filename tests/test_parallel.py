@@ -0,0 +1,124 @@
+import pathlib
+import typing
+
+import pytest
+from flask import Flask
+
+from conftest import GenerateFixture
+
+
+class User(typing.TypedDict):
+    id: int
+    name: str
+
+
+class Unknown:
+    pass
+
+
+def make_item(value_type: type) -> type:
+    class Item(typing.TypedDict):
+        value: value_type
+
+    return Item
+
+
+IntItem = make_item(int)
+StrItem = make_item(str)
+
+
+def make_outer(value_type: type) -> type:
+    class Inner(typing.TypedDict):
+        value: value_type
+
+    class Outer(typing.TypedDict):
+        inner: Inner
+
+    return Outer
+
+
+IntOuter = make_outer(int)
+StrOuter = make_outer(str)
+
+
+def make_app() -> Flask:
+    app = Flask(__name__)
+    for i in range(12):
+
+        def view(user_id: int) -> list[User]: ...
+
+        def broken() -> Unknown: ...
+
+        app.add_url_rule(f"/users/<int:user_id>/{i}", f"users_{i}", view)
+        app.add_url_rule(f"/broken/{i}", f"broken_{i}", broken)
+    return app
+
+
+def make_items_app(int_type: type, str_type: type) -> Flask:
+    app = Flask(__name__)
+
+    def int_item() -> int_type: ...
+
+    def str_item() -> str_type: ...
+
+    # Few enough routes (with the static one) for each to get its own shard, so the
+    # workers see the two types in different orders
+    for i in range(6):
+        app.add_url_rule(f"/items/{i}", f"item_{i}", (int_item, str_item)[i % 2])
+    return app
+
+
+def run(
+    generate: GenerateFixture, app: Flask, out_dir: pathlib.Path, *args: str
+) -> tuple[str, dict[str, str]]:
+    output = generate(app, out_dir, *args)
+    return output, {path.name: path.read_text() for path in sorted(out_dir.iterdir())}
+
+
+def test_parallel_output_is_identical(
+    tmp_path: pathlib.Path, generate: GenerateFixture
+) -> None:
+    serial = run(generate, make_app(), tmp_path / "serial")
+    parallel = run(generate, make_app(), tmp_path / "parallel", "--jobs", "3")
+
+    assert "can't translate 'Unknown'" in serial[0]
+    assert parallel == serial
+
+
+def test_parallel_hoisted_output_is_identical(
+    tmp_path: pathlib.Path, generate: GenerateFixture
+) -> None:
+    serial = run(generate, make_app(), tmp_path / "serial", "--hoist-types")
+    parallel = run(
+        generate, make_app(), tmp_path / "parallel", "--hoist-types", "--jobs", "3"
+    )
+
+    assert serial[1]["types.ts"].count("export type User = ") == 1
+    assert parallel == serial
+
+
+def test_parallel_types_sharing_a_name_are_kept_apart(
+    tmp_path: pathlib.Path, generate: GenerateFixture
+) -> None:
+    app = make_items_app(IntItem, StrItem)
+    serial = run(generate, app, tmp_path / "serial", "--hoist-types")
+    parallel = run(generate, app, tmp_path / "parallel", "--hoist-types", "-j", "2")
+
+    assert "export type Item = {value: number;};" in serial[1]["types.ts"]
+    assert "export type Item2 = {value: string;};" in serial[1]["types.ts"]
+    assert parallel == serial
+
+
+@pytest.mark.parametrize("jobs", ["2", "3", "6"])
+def test_parallel_nested_types_sharing_a_name_are_kept_apart(
+    tmp_path: pathlib.Path, generate: GenerateFixture, jobs: str
+) -> None:
+    app = make_items_app(IntOuter, StrOuter)
+    serial = run(generate, app, tmp_path / "serial", "--hoist-types")
+    parallel = run(generate, app, tmp_path / "parallel", "--hoist-types", "-j", jobs)
+
+    types = serial[1]["types.ts"]
+    assert "export type Outer = {inner: Inner;};" in types
+    assert "export type Outer2 = {inner: Inner2;};" in types
+    assert "export type Inner2 = {value: string;};" in types
+    assert parallel == serial
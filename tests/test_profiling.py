@@ -0,0 +1,70 @@
+import json
+import pathlib
+import typing
+
+from flask import Flask
+
+from typesync.cli import cli
+from typesync.profiling import PHASES, Profiler, profile, profile_route
+
+
+class User(typing.TypedDict):
+    id: int
+    name: str
+
+
+def test_nested_phases_are_charged_their_own_time() -> None:
+    # Each context is entered inside the previous ones
+    with (
+        Profiler() as profiler,
+        profile_route("users"),
+        profile("translate", "GET"),
+        profile("type_node"),
+    ):
+        pass
+    # Outside of the profiler, nothing is recorded
+    with profile("translate", "GET"):
+        pass
+
+    assert profiler.phases["translate"].calls == 1
+    assert profiler.phases["type_node"].calls == 1
+    # The nested phase inherits the method of the enclosing one
+    assert set(profiler.routes["users"]["GET"]) == {"translate", "type_node"}
+    total = profiler.route_total("users").seconds
+    assert total == sum(timing.seconds for timing in profiler.phases.values())
+
+
+def test_profile_reports_phases_and_routes(tmp_path: pathlib.Path) -> None:
+    def get_user(user_id: int) -> User: ...
+
+    def list_users() -> list[User]: ...
+
+    app = Flask(__name__)
+    app.add_url_rule("/users/<int:user_id>", "get_user", get_user)
+    app.add_url_rule("/users", "list_users", list_users)
+
+    profile_json = tmp_path / "profile.json"
+    result = app.test_cli_runner().invoke(
+        cli,
+        [
+            "generate",
+            str(tmp_path / "out"),
+            "--profile",
+            "--profile-top",
+            "1",
+            "--profile-json",
+            str(profile_json),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "time per phase" in result.output
+    assert "slowest routes" in result.output
+    # Only the slowest route is listed, below the header
+    routes_table = result.output.split("slowest routes")[1]
+    assert len([line for line in routes_table.splitlines() if line[:2] == "| "]) == 2
+
+    report = json.loads(profile_json.read_text())
+    assert set(report["phases"]) == set(PHASES)
+    assert report["phases"]["extract"]["calls"] == 3
+    assert {"get_user", "list_users", "static"} <= set(report["routes"])
+    assert report["routes"]["get_user"]["methods"]["*"]["translate"]["calls"] > 0
@@ -0,0 +1,83 @@
+import pathlib
+import typing
+
+from flask import Flask
+
+from typesync.cli import cli
+from typesync.type_translators import TranslationContext, TranslatorRegistry
+
+from conftest import GenerateFixture
+
+
+class User(typing.TypedDict):
+    id: int
+    tags: list[str]
+
+
+def test_registry_counts_attempts_and_hits(
+    translation_context: TranslationContext,
+) -> None:
+    registry = TranslatorRegistry(collect_stats=True)
+    assert registry.stats is not None
+    registry.translate(User, translation_context)
+
+    base = registry.stats["typesync.BaseTranslator"]
+    # The TypedDict, its fields and the items of the list
+    assert base.attempts == base.hits == 4
+    assert base.hit_rate == 1.0
+    assert registry.stats["typesync.AnnotationsTranslator"].attempts == 0
+    assert list(registry.stats) == [t.ID for t in registry.translator_types]
+
+
+def test_registry_without_stats(translation_context: TranslationContext) -> None:
+    registry = TranslatorRegistry()
+    registry.translate(User, translation_context)
+    assert registry.stats is None
+
+
+def test_stats_reports() -> None:
+    def get_user() -> User: ...
+
+    app = Flask(__name__)
+    app.add_url_rule("/user", "get_user", get_user)
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(cli, ["list-translators", "--stats"])
+    assert result.exit_code == 0, result.output
+    assert "Hit rate (%)" in result.output
+    assert "typesync.BaseTranslator" in result.output
+
+    result = runner.invoke(cli, ["list-translators"])
+    assert result.exit_code == 0, result.output
+    assert "Attempts" not in result.output
+
+
+def stats_rows(output: str) -> list[list[str]]:
+    # Every column of the table but the time
+    return [
+        [cell.strip() for cell in line.split("|")[1:-2]]
+        for line in output.splitlines()
+        if "| typesync." in line
+    ]
+
+
+def test_listed_stats_match_generated_ones(
+    tmp_path: pathlib.Path, generate: GenerateFixture
+) -> None:
+    def get_user() -> User: ...
+
+    def get_count():
+        return 1
+
+    app = Flask(__name__)
+    app.add_url_rule("/user", "get_user", get_user)
+    app.add_url_rule("/count", "get_count", get_count)
+    args = ("--inference", "--translator-priority", "typesync.BaseTranslator:1")
+
+    result = app.test_cli_runner().invoke(cli, ["list-translators", "--stats", *args])
+    assert result.exit_code == 0, result.output
+    generated = generate(app, tmp_path, "--translator-stats", *args)
+
+    rows = stats_rows(result.output)
+    assert ["typesync.BaseTranslator", "1", "5", "5", "100.0"] in rows
+    assert rows == stats_rows(generated)
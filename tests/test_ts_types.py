@@ -0,0 +1,130 @@
+import io
+import pickle
+
+import pytest
+
+from typesync.ts_types import (
+    GenerationCache,
+    TSArray,
+    TSObject,
+    TSRecord,
+    TSRecursiveType,
+    TSSimpleType,
+    TSTuple,
+    TSType,
+    TSUnion,
+)
+
+
+def test_structural_equality() -> None:
+    assert TSObject(["a"], [TSSimpleType("number")]) == TSObject(
+        ("a",), (TSSimpleType("number"),), (True,)
+    )
+    assert TSArray(TSRecursiveType()) == TSArray(TSRecursiveType())
+    assert TSRecord(TSSimpleType("string"), TSSimpleType("number")) != TSRecord(
+        TSSimpleType("number"), TSSimpleType("string")
+    )
+
+
+def test_aggregators_are_distinguished() -> None:
+    types = (TSSimpleType("string"), TSSimpleType("number"))
+
+    assert TSUnion(types) != TSTuple(types)
+    assert len({TSUnion(types), TSTuple(types), TSUnion(list(types))}) == 2
+
+
+def test_string_comparison() -> None:
+    assert TSSimpleType("undefined") == "undefined"
+    assert TSArray(TSSimpleType("number")) == "number[]"
+
+
+def test_slots() -> None:
+    assert not hasattr(TSSimpleType("number"), "__dict__")
+    assert not hasattr(TSObject(("a",), (TSSimpleType("number"),)), "__dict__")
+
+
+def test_generation_cache_counters() -> None:
+    array = TSArray(TSSimpleType("number"))
+
+    with GenerationCache() as cache:
+        assert array.generate() == "number[]"
+        assert TSArray(TSSimpleType("number")).generate() == "number[]"
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 0
+
+
+def test_generation_cache_is_bounded() -> None:
+    with GenerationCache(maxsize=2) as cache:
+        for name in ("a", "b", "c"):
+            TSSimpleType(name).generate()
+        assert len(cache) == 2
+        TSSimpleType("a").generate()
+
+    assert cache.hits == 0
+    assert cache.misses == 4
+
+
+def test_generation_cache_is_scoped() -> None:
+    with GenerationCache() as cache:
+        pass
+    TSSimpleType("number").generate()
+
+    assert cache.misses == 0
+
+
+def test_emit_streams_code() -> None:
+    type_ = TSObject(
+        ("items", "next"),
+        (
+            TSArray(TSUnion((TSSimpleType("number"), TSRecursiveType()))),
+            TSSimpleType("null"),
+        ),
+        (True, False),
+    )
+    out = io.StringIO()
+    type_.emit(out, "Page")
+
+    assert out.getvalue() == "{items: (number | Page)[]; next?: null;}"
+    assert out.getvalue() == type_.generate("Page")
+
+
+def test_subclasses_implement_emit_or_generate() -> None:
+    class Generated(TSType):
+        def _generate(self, type_name: str | None = None) -> str:
+            return "never"
+
+    class Incomplete(TSType):
+        pass
+
+    out = io.StringIO()
+    TSArray(Generated()).emit(out)
+    assert out.getvalue() == "never[]"
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_emit_uses_generation_cache() -> None:
+    type_ = TSTuple((TSSimpleType("string"), TSSimpleType("number")))
+
+    with GenerationCache() as cache:
+        first, second = io.StringIO(), io.StringIO()
+        type_.emit(first)
+        type_.emit(second)
+
+    assert first.getvalue() == second.getvalue() == "[string, number]"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_pickle_round_trip() -> None:
+    t = TSObject(
+        ("items",),
+        (TSArray(TSUnion((TSSimpleType("number"), TSRecursiveType()))),),
+        (True,),
+    )
+    # The test only round-trips its own data
+    restored = pickle.loads(pickle.dumps(t))  # noqa: S301
+
+    assert restored == t
+    assert hash(restored) == hash(t)
+    assert restored.generate("Page") == t.generate("Page")
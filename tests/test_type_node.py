@@ -0,0 +1,46 @@
+import typing
+
+from typesync.type_translators import TypeNode, to_type_node
+
+
+class User(typing.TypedDict):
+    id: int
+    name: str
+
+
+type UserList = list[User]
+
+
+def test_nodes_are_hashable() -> None:
+    node = to_type_node(User)
+
+    assert isinstance(node, TypeNode)
+    assert hash(node) == hash(to_type_node(User))
+    assert node.hints == (("id", to_type_node(int)), ("name", to_type_node(str)))
+
+
+def test_identical_subtrees_are_shared() -> None:
+    alias_node = to_type_node(UserList)
+    dict_node = to_type_node(dict[str, User])
+
+    assert alias_node.value is not None
+    assert alias_node.value.args[0] is to_type_node(User)
+    assert dict_node.args[1] is to_type_node(User)
+    assert to_type_node(list[User]) is to_type_node(list[User])
+
+
+def test_literals_are_distinguished_by_type() -> None:
+    int_node = to_type_node(typing.Literal[1])
+    bool_node = to_type_node(typing.Literal[True])
+
+    assert int_node != bool_node
+    assert int_node.args[0].origin is not True
+    assert bool_node.args[0].origin is True
+
+
+def test_unhashable_annotations() -> None:
+    node = to_type_node(typing.Annotated[int, {"unhashable": True}])
+
+    assert node.origin is typing.Annotated
+    assert node.annotation == {"unhashable": True}
+    assert isinstance(hash(node), int)
@@ -7,9 +7,53 @@ __all__ = [
     "utils",
 ]
 
-from . import annotations
-from . import type_translators
-from . import utils
-from . import ts_types
-from .cli import cli
-from .codegen import extractor
+import importlib
+import sys
+import types
+import typing
+
+if typing.TYPE_CHECKING:
+    from . import annotations, ts_types, type_translators, utils
+    from .cli import cli
+    from .codegen import extractor
+
+
+# Registering the CLI (`app.cli.add_command(typesync.cli)`) happens on every `flask`
+# invocation, so nothing is imported until it's actually used
+_lazy_attributes = {
+    "annotations": (".annotations", None),
+    "cli": (".cli", "cli"),
+    "extractor": (".codegen.extractor", None),
+    "ts_types": (".ts_types", None),
+    "type_translators": (".type_translators", None),
+    "utils": (".utils", None),
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name not in _lazy_attributes:
+        raise AttributeError(  # noqa: TRY003
+            f"module {__name__!r} has no attribute {name!r}"
+        )
+    module_name, attribute = _lazy_attributes[name]
+    value = importlib.import_module(module_name, __name__)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        # Importing the `typesync.cli` module binds it to this package, which would
+        # hide the command group of the same name
+        if name == "cli" and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
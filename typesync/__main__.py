@@ -0,0 +1,109 @@
+"""`python -m typesync generate --app IMPORT [OPTIONS] OUT_DIR`
+
+Runs `flask --app IMPORT typesync generate [OPTIONS] OUT_DIR`, unless none of the
+files the previous run with the same arguments depended on changed since. In that
+case it exits right away, without importing the app.
+"""
+
+import os
+import sys
+import typing
+
+from .stamp import is_up_to_date, write_stamp
+
+USAGE = "Usage: python -m typesync generate --app IMPORT [OPTIONS] OUT_DIR"
+
+
+def _split_app(args: list[str]) -> tuple[str | None, list[str]]:
+    app: str | None = None
+    rest: list[str] = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in {"--app", "-A"} and i + 1 < len(args):
+            app = args[i + 1]
+            i += 2
+            continue
+        if arg.startswith("--app="):
+            app = arg.removeprefix("--app=")
+        else:
+            rest.append(arg)
+        i += 1
+    return app, rest
+
+
+def _generate(app: str, args: list[str], generate_args: list[str]) -> int:
+    # Only imported once the app has to be loaded anyway
+    import click  # noqa: PLC0415
+    from flask.cli import ScriptInfo, load_dotenv  # noqa: PLC0415
+
+    from .cli import generate  # noqa: PLC0415
+    from .codegen.dependencies import module_files  # noqa: PLC0415
+    from .codegen.manifest import load_manifest  # noqa: PLC0415
+
+    # Like the flask command
+    load_dotenv()
+    try:
+        with generate.make_context(
+            "python -m typesync generate",
+            generate_args,
+            obj=ScriptInfo(app_import_path=app),
+        ) as ctx:
+            result = generate.invoke(ctx)
+    except click.exceptions.Exit as e:
+        return e.exit_code
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.Abort:
+        return 1
+    if not result.ok:
+        return 1
+
+    params: dict[str, typing.Any] = ctx.params
+    out_dir: str = params["out_dir"]
+    output_files = [
+        os.path.join(out_dir, params[name])
+        for name in ("types_file", "apis_file", "manifest_file")
+    ]
+    manifest = load_manifest(output_files[-1])
+    if manifest is None or None in manifest["routes"].values():
+        # Without the sources of every route, changes can't be detected
+        return 0
+    write_stamp(
+        out_dir,
+        args,
+        [
+            *manifest["files"],
+            *output_files,
+            *module_files(
+                {
+                    *(translator.__module__ for translator in params["translator"]),
+                    *(name for name in sys.modules if name.split(".")[0] == "typesync"),
+                }
+            ),
+        ],
+    )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] != "generate":
+        print(USAGE, file=sys.stderr)
+        return 2
+    args = argv[1:]
+    app, generate_args = _split_app(args)
+    if app is None:
+        print(USAGE, file=sys.stderr)
+        print("Error: --app is required.", file=sys.stderr)
+        return 2
+
+    if is_up_to_date(args):
+        print("Info: nothing changed since the previous run")
+        return 0
+    return _generate(app, args, generate_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,9 @@ import typing
 from typesync.misc import HTTPMethod
 
 
-class TypesyncAnnotation: ...
+class TypesyncAnnotation:
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
 
 
 class TypesyncSkipGenerationAnnotation(TypesyncAnnotation): ...
@@ -13,6 +15,9 @@ class TypesyncHTTPMethodAnnotation(TypesyncAnnotation):
     def __init__(self, methods: set[HTTPMethod]) -> None:
         self.methods = methods
 
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({sorted(self.methods)!r})"
+
 
 type SkipGeneration[T] = typing.Annotated[T, TypesyncSkipGenerationAnnotation()]
 
@@ -3,10 +3,12 @@ import importlib.util
 import pathlib
 import sys
 import types
+import typing
 
 from click import ParamType
 
-from .type_translators import Translator
+if typing.TYPE_CHECKING:
+    from .type_translators import Translator
 
 
 class PythonModuleParamType(ParamType):
@@ -54,7 +56,10 @@ class TranslatorPluginParamType(ParamType):
         super().__init__(*args, **kwargs)
         self.python_module_plugin_param_type = PythonModuleParamType()
 
-    def convert(self, value, param, ctx) -> type[Translator]:
+    def convert(self, value, param, ctx) -> type["Translator"]:
+        # Only needed once a plugin is used
+        from .type_translators import Translator  # noqa: PLC0415
+
         module = self.python_module_plugin_param_type.convert(value, param, ctx)
 
         translator_func = getattr(module, "translator", None)
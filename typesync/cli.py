@@ -1,180 +1,350 @@
 import os
+import sys
 import typing
 
 import click
 from flask import current_app
-from flask.cli import AppGroup
-from prettytable import PrettyTable
-from werkzeug.routing.rules import Rule
+from flask.cli import AppGroup, ScriptInfo
 
 from . import argument_types
-from .codegen import CodeWriter, RouteTypeExtractor
 
+# The code generation modules are only imported once a command runs, since this
+# module is imported on every `flask` invocation of apps that register `cli`
 if typing.TYPE_CHECKING:
-    from .type_translators import Translator
+    from flask import Flask
+
+    from .codegen.generator import GenerationResult
 
 
 cli = AppGroup("typesync")
 
 
-@cli.command(help="Generate Typescript types based on Flask routes.")
-@click.argument("out_dir", type=click.Path(file_okay=False, resolve_path=True))
-@click.option("--endpoint", "-E", help="The base endpoint.", default="")
-@click.option("--samefile", "-S", help="Write types and apis to the same file.")
-@click.option(
-    "--translator",
-    "-t",
-    help=(
-        "Path to a python script containing a additional type translators. "
-        "May be used multiple times."
+# Options changing how types are translated, shared by `generate`, `serve` and
+# `list-translators`
+_translation_options = (
+    click.option(
+        "--translator",
+        "-t",
+        help=(
+            "Path to a python script containing a additional type translators. "
+            "May be used multiple times."
+        ),
+        type=argument_types.TRANSLATOR_PLUGIN,
+        multiple=True,
     ),
-    type=argument_types.TRANSLATOR_PLUGIN,
-    multiple=True,
-)
-@click.option(
-    "--translator-priority",
-    help=("Set the priority of a translator.May be used multiple times."),
-    type=argument_types.TRANSLATOR_PRIORITY,
-    multiple=True,
-)
-@click.option(
-    "--skip-unannotated",
-    type=bool,
-    default=True,
-    help=(
-        "Whether to skip code generation for routes whose annotations are not specified"
-        " and could not be inferred. Defaults to True."
+    click.option(
+        "--translator-priority",
+        help=("Set the priority of a translator.May be used multiple times."),
+        type=argument_types.TRANSLATOR_PRIORITY,
+        multiple=True,
+    ),
+    click.option(
+        "--skip-unannotated",
+        type=bool,
+        default=True,
+        help=(
+            "Whether to skip code generation for routes whose annotations are not"
+            " specified and could not be inferred. Defaults to True."
+        ),
+    ),
+    click.option(
+        "--inference",
+        "-i",
+        is_flag=True,
+        help="Whether to use inference when type annotations cannot be resolved.",
+    ),
+    click.option(
+        "--inference-can-eval",
+        is_flag=True,
+        help=(
+            "Whether eval() can be called during inference. WARNING: this will"
+            " execute arbitrary code."
+        ),
+    ),
+    click.option(
+        "--inference-engine",
+        type=click.Choice(["ast", "bytecode", "auto"]),
+        default="ast",
+        help=(
+            "How return types are inferred: from the source code of functions"
+            " ('ast'), from their bytecode, which also works without their source"
+            " ('bytecode'), or from their source code when it's available and from"
+            " their bytecode otherwise ('auto'). Defaults to 'ast'."
+        ),
+    ),
+    click.option(
+        "--max-literal-union",
+        type=click.IntRange(min=1),
+        default=9,
+        help=(
+            "Largest number of literal values an inferred type may be a union of"
+            " (e.g. 'ok' | 'error'). Literals with more values are widened to their"
+            " type (e.g. string). Defaults to 9."
+        ),
+    ),
+    click.option(
+        "--hoist-types",
+        is_flag=True,
+        help=(
+            "Write each named type (TypedDict, pydantic model or type alias) once as"
+            " its own declaration and refer to it by name, instead of expanding it"
+            " inline."
+        ),
     ),
 )
-@click.option(
-    "--inference",
-    "-i",
-    is_flag=True,
-    help="Whether to use inference when type annotations cannot be resolved.",
+
+# Options shared by `generate` and `serve`
+_generate_options = (
+    click.argument("out_dir", type=click.Path(file_okay=False, resolve_path=True)),
+    click.option("--endpoint", "-E", help="The base endpoint.", default=""),
+    click.option("--samefile", "-S", help="Write types and apis to the same file."),
+    *_translation_options,
+    click.option(
+        "--types-file",
+        help=(
+            "Name of output file containing type definitions (defaults to 'types.ts')."
+        ),
+        default="types.ts",
+    ),
+    click.option(
+        "--apis-file",
+        help="Name of output file containing API functions (defaults to 'apis.ts').",
+        default="apis.ts",
+    ),
+    click.option(
+        "--manifest-file",
+        help=(
+            "Name of the output file listing the source files each route depends on"
+            " (defaults to '.typesync-manifest.json')."
+        ),
+        default=".typesync-manifest.json",
+    ),
+    click.option(
+        "--return-type-format",
+        default="{r_pc}{m_uc}ReturnType",
+        help=(
+            "Format string used to generate return type names from the route name. "
+            "Available placeholders are: "
+            "{r_d} or {m_d} (default route name or HTTP method), "
+            "{r_cc} or {m_cc} (camelCase), "
+            "{r_pc} or {m_pc} (PascalCase), "
+            "{r_uc} or {m_uc} (UPPERCASE), "
+            "{r_lc} or {m_lc} (lowercase), "
+            "{r_sc} or {m_sc} (snake_case). "
+            "Defaults to: '{r_pc}{m_uc}ReturnType'."
+        ),
+    ),
+    click.option(
+        "--args-type-format",
+        default="{r_pc}{m_uc}ArgsType",
+        help=(
+            "Format string used to generate argument type names from the route name. "
+            "Available placeholders are: "
+            "{r_d} or {m_d} (default route name or HTTP method), "
+            "{r_cc} or {m_cc} (camelCase), "
+            "{r_pc} or {m_pc} (PascalCase), "
+            "{r_uc} or {m_uc} (UPPERCASE), "
+            "{r_lc} or {m_lc} (lowercase), "
+            "{r_sc} or {m_sc} (snake_case). "
+            "Defaults to: '{r_pc}{m_uc}ArgsType'."
+        ),
+    ),
+    click.option(
+        "--function-name-format",
+        default="{m_lc}{r_pc}",
+        help=(
+            "Format string used to generate function names from the route and HTTP "
+            "method. "
+            "Available placeholders are: "
+            "{r_d} or {m_d} (default route name or HTTP method), "
+            "{r_cc} or {m_cc} (camelCase), "
+            "{r_pc} or {m_pc} (PascalCase), "
+            "{r_uc} or {m_uc} (UPPERCASE), "
+            "{r_lc} or {m_lc} (lowercase), "
+            "{r_sc} or {m_sc} (snake_case). "
+            "Defaults to: '{m_lc}{r_pc}'."
+        ),
+    ),
+    click.option(
+        "--jobs",
+        "-j",
+        type=click.IntRange(min=1),
+        default=1,
+        help=(
+            "Number of worker processes used to extract route types. The output is the"
+            " same as with a single process. Defaults to 1."
+        ),
+    ),
+    click.option(
+        "--cache-dir",
+        type=click.Path(file_okay=False, resolve_path=True),
+        help=(
+            "Directory where extracted route types are kept between runs (e.g."
+            " '.typesync-cache'). Routes whose sources haven't changed are loaded from"
+            " it instead of being extracted again. Only point this to a trusted"
+            " location, as its contents are unpickled."
+        ),
+    ),
+    click.option(
+        "--cache-size",
+        type=click.IntRange(min=0),
+        default=4096,
+        help=(
+            "Maximum number of generated TypeScript snippets kept in memory during a "
+            "run. Use 0 to disable caching. Defaults to 4096."
+        ),
+    ),
+    click.option(
+        "--cache-stats",
+        is_flag=True,
+        help="Report hit and miss counts of the generation cache after the run.",
+    ),
+    click.option(
+        "--profile",
+        is_flag=True,
+        help=(
+            "Report the time and memory allocations spent in each phase of the run"
+            " (extraction, type nodes, inference, translation and writing), and the"
+            " slowest routes. Routes are extracted in a single process."
+        ),
+    ),
+    click.option(
+        "--profile-top",
+        type=click.IntRange(min=1),
+        default=10,
+        help="Number of routes listed by --profile. Defaults to 10.",
+    ),
+    click.option(
+        "--profile-json",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Also write the timings of --profile to this JSON file.",
+    ),
+    click.option(
+        "--profile-stats",
+        type=click.Path(dir_okay=False, writable=True),
+        help=(
+            "Also write cProfile statistics of the run to this file (e.g. for"
+            " 'python -m pstats' or snakeviz)."
+        ),
+    ),
+    click.option(
+        "--translator-stats",
+        is_flag=True,
+        help=(
+            "Report how many types each translator was asked to translate, how many"
+            " it did translate and the time it took. Routes loaded from the cache or"
+            " reused from the previous output aren't counted. Routes are extracted in"
+            " a single process."
+        ),
+    ),
 )
+
+
+def _apply_options[F: typing.Callable](
+    options: tuple[typing.Callable[[F], F], ...], f: F
+) -> F:
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
+def translation_options[F: typing.Callable](f: F) -> F:
+    return _apply_options(_translation_options, f)
+
+
+def generate_options[F: typing.Callable](f: F) -> F:
+    return _apply_options(_generate_options, f)
+
+
+@cli.command(help="Generate Typescript types based on Flask routes.")
+@generate_options
 @click.option(
-    "--inference-can-eval",
-    is_flag=True,
+    "--changed",
+    multiple=True,
+    type=click.Path(dir_okay=False, resolve_path=True),
     help=(
-        "Whether eval() can be called during inference. WARNING: this will"
-        " execute arbitrary code."
+        "A source file modified since the previous run. When given, only the routes"
+        " depending on these files are generated again, the others are copied from"
+        " the previous output. May be used multiple times."
     ),
 )
-@click.option(
-    "--types-file",
-    help="Name of output file containing type definitions (defaults to 'types.ts').",
-    default="types.ts",
-)
-@click.option(
-    "--apis-file",
-    help="Name of output file containing API functions (defaults to 'apis.ts').",
-    default="apis.ts",
-)
-@click.option(
-    "--return-type-format",
-    default="{r_pc}{m_uc}ReturnType",
+def generate(changed: tuple[str, ...], **options: typing.Any) -> "GenerationResult":
+    from .codegen.extractor import ClickLogger  # noqa: PLC0415
+    from .codegen.generator import CodeGenerator, GenerateOptions  # noqa: PLC0415
+
+    generator = CodeGenerator(GenerateOptions(**options))
+    result = generator.run(current_app, ClickLogger(), changed_files=changed or None)
+    if not result.ok:
+        click.secho("Errors occurred during file generation", fg="red")
+    return result
+
+
+@cli.command(
     help=(
-        "Format string used to generate return type names from the route name. "
-        "Available placeholders are: "
-        "{r_d} or {m_d} (default route name or HTTP method), "
-        "{r_cc} or {m_cc} (camelCase), "
-        "{r_pc} or {m_pc} (PascalCase), "
-        "{r_uc} or {m_uc} (UPPERCASE), "
-        "{r_lc} or {m_lc} (lowercase), "
-        "{r_sc} or {m_sc} (snake_case). "
-        "Defaults to: '{r_pc}{m_uc}ReturnType'."
-    ),
+        "Keep the app loaded and generate Typescript types on request. Used by the"
+        " Rollup plugin to avoid starting a new process on every change."
+    )
 )
 @click.option(
-    "--args-type-format",
-    default="{r_pc}{m_uc}ArgsType",
-    help=(
-        "Format string used to generate argument type names from the route name. "
-        "Available placeholders are: "
-        "{r_d} or {m_d} (default route name or HTTP method), "
-        "{r_cc} or {m_cc} (camelCase), "
-        "{r_pc} or {m_pc} (PascalCase), "
-        "{r_uc} or {m_uc} (UPPERCASE), "
-        "{r_lc} or {m_lc} (lowercase), "
-        "{r_sc} or {m_sc} (snake_case). "
-        "Defaults to: '{r_pc}{m_uc}ArgsType'."
-    ),
+    "--stdio",
+    is_flag=True,
+    help="Receive requests on stdin and write responses to stdout, as JSON lines.",
 )
+@generate_options
+def serve(stdio: bool, **options: typing.Any) -> None:
+    if not stdio:
+        raise click.UsageError("only --stdio is currently supported")  # noqa: TRY003
+
+    from .codegen.generator import CodeGenerator, GenerateOptions  # noqa: PLC0415
+    from .daemon import Daemon  # noqa: PLC0415
+
+    info = click.get_current_context().ensure_object(ScriptInfo)
+
+    def load_app() -> "Flask":
+        info._loaded_app = None
+        return info.load_app()
+
+    Daemon(
+        CodeGenerator(GenerateOptions(**options), keep_in_memory=True),
+        current_app._get_current_object(),  # type: ignore[attr-defined]
+        load_app,
+        os.getcwd(),
+        sys.stdin,
+        sys.stdout,
+    ).serve()
+
+
+@cli.command(help="Show available translators and their priorities.")
 @click.option(
-    "--function-name-format",
-    default="{m_lc}{r_pc}",
+    "--stats",
+    is_flag=True,
     help=(
-        "Format string used to generate function names from the route and HTTP method. "
-        "Available placeholders are: "
-        "{r_d} or {m_d} (default route name or HTTP method), "
-        "{r_cc} or {m_cc} (camelCase), "
-        "{r_pc} or {m_pc} (PascalCase), "
-        "{r_uc} or {m_uc} (UPPERCASE), "
-        "{r_lc} or {m_lc} (lowercase), "
-        "{r_sc} or {m_sc} (snake_case). "
-        "Defaults to: '{m_lc}{r_pc}'."
+        "Extract the types of every route of the app (without generating any code),"
+        " and show how many types each translator was asked to translate, how many"
+        " it did translate and the time it took."
     ),
 )
-def generate(
-    out_dir: str,
-    endpoint: str,
-    translator: tuple[type["Translator"], ...],
-    translator_priority: tuple[tuple[str, int], ...],
-    inference: bool,
-    inference_can_eval: bool,
-    skip_unannotated: bool,
-    types_file: str,
-    apis_file: str,
-    return_type_format: str,
-    args_type_format: str,
-    function_name_format: str,
-    samefile: str | None = None,
-):
-    rules: list[Rule] = sorted(
-        current_app.url_map.iter_rules(),
-        key=lambda rule: rule.endpoint
-    )
+@translation_options
+def list_translators(stats: bool, **options: typing.Any):
+    from prettytable import PrettyTable  # noqa: PLC0415
 
-    os.makedirs(out_dir, exist_ok=True)
-
-    with (
-        open(os.path.join(out_dir, types_file), "w") as types_f,
-        open(os.path.join(out_dir, apis_file), "w") as api_f,
-    ):
-        code_writer = CodeWriter(
-            types_f,
-            api_f,
-            types_file,
-            return_type_format,
-            args_type_format,
-            function_name_format,
-            endpoint,
-        )
-        result = code_writer.write(
-            RouteTypeExtractor(
-                current_app,
-                rule,
-                translators=translator,
-                translator_priorities=dict(translator_priority),
-                inference_enabled=inference,
-                inference_can_eval=inference_can_eval,
-                skip_unannotated=skip_unannotated,
-            )
-            for rule in rules
-        )
-        if not result:
-            click.secho("Errors occurred during file generation", fg="red")
-
-
-@cli.command(help="Show available translators and their default priorities.")
-def list_translators():
-    translators = RouteTypeExtractor.sort_translators(
-        RouteTypeExtractor.default_translators(), {}
-    )
+    from .codegen.generator import CodeGenerator, GenerateOptions  # noqa: PLC0415
+
+    # Nothing is written, so there's no output directory
+    generator = CodeGenerator(GenerateOptions(out_dir="", **options))
+    if stats:
+        print(generator.translator_stats(current_app))
+        return
+
+    # In dispatch order
+    priorities = generator.translator_priorities
     table = PrettyTable()
     table.field_names = ["ID", "Priority"]
     table.add_rows(
-        [[translator.ID, translator.DEFAULT_PRIORITY] for translator in translators]
+        [
+            [translator.ID, priorities.get(translator.ID, translator.DEFAULT_PRIORITY)]
+            for translator in generator.translator_types
+        ]
     )
     table.align["ID"] = "l"
     table.align["Priority"] = "r"
@@ -0,0 +1,472 @@
+import dis
+import inspect
+import types
+import typing
+
+from .inference import (
+    MAX_LITERAL_UNION,
+    ASTVisitor,
+    combine_types,
+    define_types_from_closure,
+    define_types_from_signature,
+    infer_return_type,
+    return_type_from_values,
+)
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from .extractor import Logger
+
+
+class _Null:
+    """The NULL pushed along with callables that aren't bound methods."""
+
+
+_NULL = _Null()
+
+
+class _Constant(typing.NamedTuple):
+    value: typing.Any
+
+
+class _Built(typing.NamedTuple):
+    """A list, tuple or dict built by the function."""
+
+    kind: type
+    items: tuple[typing.Any, ...]
+    # Values of a dict, whose keys are `items`
+    values: tuple[typing.Any, ...] = ()
+
+
+_JUMPS = frozenset((*dis.hasjrel, *dis.hasjabs, *getattr(dis, "hasjump", ())))
+_UNCONDITIONAL_JUMPS = frozenset(
+    dis.opmap[name]
+    for name in (
+        "JUMP",
+        "JUMP_NO_INTERRUPT",
+        "JUMP_FORWARD",
+        "JUMP_BACKWARD",
+        "JUMP_BACKWARD_NO_INTERRUPT",
+    )
+    if name in dis.opmap
+)
+_TERMINATORS = frozenset(
+    dis.opmap[name]
+    for name in ("RETURN_VALUE", "RETURN_CONST", "RAISE_VARARGS", "RERAISE")
+    if name in dis.opmap
+)
+# Instructions that leave the stack untouched
+_NO_STACK_EFFECT = frozenset(
+    dis.opmap[name]
+    for name in (
+        "NOP",
+        "RESUME",
+        "EXTENDED_ARG",
+        "KW_NAMES",
+        "COPY_FREE_VARS",
+        "MAKE_CELL",
+        "NOT_TAKEN",
+    )
+    if name in dis.opmap
+)
+# Instructions that only pop values off the stack
+_ONLY_POP = frozenset(
+    opcode
+    for name, opcode in dis.opmap.items()
+    if name.startswith(("POP_", "STORE_", "DELETE_", "END_"))
+)
+
+
+class BytecodeInterpreter:
+    """Infers the return type of a function from its bytecode.
+
+    This is an alternative to inferring it from the source code (`ASTVisitor`),
+    for functions whose source isn't available. The instructions are run once, in
+    order, on a stack of types (`None` standing for unknown ones), with the
+    values returned being collected the same way the `ASTVisitor` does. Names are
+    resolved by an `ASTVisitor`, so that both engines agree on them.
+    """
+
+    def __init__(
+        self,
+        function: typing.Callable,
+        code: types.CodeType,
+        logger: "Logger",
+        can_eval: bool = False,
+        max_literal_union: int = MAX_LITERAL_UNION,
+    ) -> None:
+        self.code = code
+        self.logger = logger
+        self.can_eval = can_eval
+        self.max_literal_union = max_literal_union
+        self.names = ASTVisitor(
+            function,
+            logger,
+            can_eval=can_eval,
+            engine="bytecode",
+            max_literal_union=max_literal_union,
+        )
+        define_types_from_closure(function, self.names)
+        define_types_from_signature(function, self.names)
+        self.returns: list = []
+        self.stack: list[typing.Any] = []
+        # Whether the current instruction is only reached by exiting a `with`
+        # statement on an exception, whose code (e.g. the implicit `return None`
+        # after a `with` block that returns) isn't in the source
+        self.exiting_with = False
+
+    def type_of(self, value: typing.Any) -> typing.Any:
+        """The type of a value on the stack, as the `ASTVisitor` would infer it."""
+        match value:
+            case _Null():
+                return None
+            case _Constant(value=tuple() as items):
+                return self._tuple_type(tuple(_Constant(item) for item in items))
+            case _Constant(value=str() | float() | int() | bool() as constant):
+                return typing.Literal[constant]
+            case _Constant(value=constant):
+                return type(constant)
+            case _Built(kind=kind, items=items, values=values):
+                if kind is tuple:
+                    return self._tuple_type(items)
+                if kind is list:
+                    item_type = self._combined_type(items, allow_literals=False)
+                    return list if item_type is None else list[item_type]
+                keys_type = self._combined_type(items)
+                values_type = self._combined_type(values)
+                if keys_type is None and values_type is None:
+                    return dict
+                return dict[
+                    typing.Any if keys_type is None else keys_type,
+                    typing.Any if values_type is None else values_type,
+                ]
+        return value
+
+    def _tuple_type(self, items: "Sequence[typing.Any]") -> typing.Any:
+        item_types = tuple(self.type_of(item) for item in items)
+        if any(item_type is None for item_type in item_types):
+            return tuple
+        return tuple[item_types]
+
+    def _combined_type(
+        self, values: "Sequence[typing.Any]", allow_literals: bool = True
+    ) -> typing.Any:
+        return combine_types(
+            (self.type_of(value) for value in values),
+            allow_literals,
+            self.max_literal_union,
+        )
+
+    def call_type(self, called: typing.Any) -> typing.Any:
+        """The type returned by calling `called`."""
+        if called is None or isinstance(called, (_Null, _Constant, _Built)):
+            return None
+        if isinstance(called, type):
+            # This is a class
+            return called
+        origin = typing.get_origin(called) or called
+        if isinstance(origin, type):
+            # This is of the form type[T], so we should return T
+            args = typing.get_args(called)
+            return args[0] if len(args) == 1 else None
+
+        annotations = getattr(called, "__annotations__", {})
+        if "return" not in annotations:
+            return infer_return_type(
+                called, self.logger, self.can_eval, "bytecode", self.max_literal_union
+            )
+        return annotations["return"]
+
+    def _pop(self, count: int = 1) -> list[typing.Any]:
+        start = max(len(self.stack) - count, 0)
+        popped = self.stack[start:]
+        del self.stack[start:]
+        # Popping more values than the stack holds yields unknown ones
+        return [None] * (count - len(popped)) + popped
+
+    def _attribute(self, value: typing.Any, name: str) -> typing.Any:
+        value = self.type_of(value)
+        if value is None:
+            return None
+        try:
+            return getattr(value, name, None)
+        except Exception:
+            return None
+
+    def _generic(self, instruction: dis.Instruction, jump: bool = False) -> None:
+        if instruction.opcode in _NO_STACK_EFFECT:
+            return
+        effect = dis.stack_effect(
+            instruction.opcode,
+            instruction.arg if instruction.opcode >= dis.HAVE_ARGUMENT else None,
+            jump=jump,
+        )
+        if instruction.opcode in _ONLY_POP and effect <= 0:
+            self._pop(-effect)
+            return
+        # The net effect is all that's known, so assume the instruction replaces
+        # at least the value on top of the stack
+        popped = min(len(self.stack), max(-effect, 0) + 1)
+        self._pop(popped)
+        self.stack.extend([None] * max(popped + effect, 0))
+
+    def _step(self, instruction: dis.Instruction) -> None:
+        handler = self._HANDLERS.get(instruction.opname)
+        if handler is None:
+            self._generic(instruction)
+        else:
+            handler(self, instruction)
+
+    def _load_const(self, instruction: dis.Instruction) -> None:
+        self.stack.append(_Constant(instruction.argval))
+
+    def _load_name(self, instruction: dis.Instruction) -> None:
+        self.stack.append(self.names.lookup(instruction.argval))
+
+    def _load_fast_load_fast(self, instruction: dis.Instruction) -> None:
+        self.stack.extend(self.names.lookup(local) for local in instruction.argval)
+
+    def _load_global(self, instruction: dis.Instruction) -> None:
+        if instruction.arg is not None and instruction.arg & 1:
+            self.stack.append(_NULL)
+        self.stack.append(self.names.lookup(instruction.argval))
+
+    def _store_name(self, instruction: dis.Instruction) -> None:
+        (value,) = self._pop()
+        self.names.locals[instruction.argval] = self.type_of(value)
+
+    def _store_fast_load_fast(self, instruction: dis.Instruction) -> None:
+        stored, loaded = instruction.argval
+        (value,) = self._pop()
+        self.names.locals[stored] = self.type_of(value)
+        self.stack.append(self.names.lookup(loaded))
+
+    def _store_fast_store_fast(self, instruction: dis.Instruction) -> None:
+        first, second = self._pop(2)
+        self.names.locals[instruction.argval[0]] = self.type_of(second)
+        self.names.locals[instruction.argval[1]] = self.type_of(first)
+
+    def _load_attr(self, instruction: dis.Instruction) -> None:
+        (value,) = self._pop()
+        if instruction.arg is not None and instruction.arg & 1:
+            # A method: pushed along with the object it's called on
+            self.stack.extend((self._attribute(value, instruction.argval), value))
+        else:
+            self.stack.append(
+                self._attribute(value, instruction.argval)
+                if isinstance(self.type_of(value), types.ModuleType)
+                else None
+            )
+
+    def _call(self, instruction: dis.Instruction) -> None:
+        if instruction.opname == "CALL":
+            self._pop(instruction.arg or 0)
+        elif instruction.opname == "CALL_KW":
+            self._pop((instruction.arg or 0) + 1)
+        else:
+            self._pop(2 if (instruction.arg or 0) & 1 else 1)
+        # The callable and `self` (for methods) or NULL, in that order since
+        # Python 3.13, and NULL first otherwise before
+        first, second = self._pop(2)
+        called = second if isinstance(first, _Null) else first
+        self.stack.append(self.call_type(called))
+
+    def _build_sequence(self, instruction: dis.Instruction) -> None:
+        items = tuple(self._pop(instruction.arg or 0))
+        kind = list if instruction.opname == "BUILD_LIST" else tuple
+        self.stack.append(_Built(kind, items))
+
+    def _build_map(self, instruction: dis.Instruction) -> None:
+        flat = self._pop(2 * (instruction.arg or 0))
+        self.stack.append(_Built(dict, tuple(flat[::2]), tuple(flat[1::2])))
+
+    def _build_const_key_map(self, instruction: dis.Instruction) -> None:
+        *values, keys = self._pop((instruction.arg or 0) + 1)
+        self.stack.append(
+            _Built(dict, tuple(_Constant(key) for key in keys.value), tuple(values))
+            if isinstance(keys, _Constant)
+            else dict
+        )
+
+    def _list_add(self, instruction: dis.Instruction) -> None:
+        (value,) = self._pop()
+        stack = self.stack
+        index = len(stack) - (instruction.arg or 1)
+        built = stack[index] if 0 <= index < len(stack) else None
+        if not isinstance(built, _Built) or built.kind is not list:
+            return
+        if instruction.opname == "LIST_APPEND":
+            added = (value,)
+        elif isinstance(value, _Constant):
+            added = tuple(_Constant(item) for item in value.value)
+        else:
+            # Unpacking something else makes the type of the items unknown
+            added = (None,)
+        stack[index] = built._replace(items=built.items + added)
+
+    def _dict_update(self, instruction: dis.Instruction) -> None:
+        self._pop()
+        index = len(self.stack) - (instruction.arg or 1)
+        if 0 <= index < len(self.stack):
+            # TODO: support unpacking
+            self.stack[index] = dict
+
+    def _build_string(self, instruction: dis.Instruction) -> None:
+        self._pop(instruction.arg or 0)
+        self.stack.append(str)
+
+    def _copy(self, instruction: dis.Instruction) -> None:
+        stack = self.stack
+        index = len(stack) - (instruction.arg or 1)
+        stack.append(stack[index] if 0 <= index < len(stack) else None)
+
+    def _swap(self, instruction: dis.Instruction) -> None:
+        stack = self.stack
+        index = len(stack) - (instruction.arg or 1)
+        if 0 <= index < len(stack) - 1:
+            stack[-1], stack[index] = stack[index], stack[-1]
+
+    def _push_null(self, instruction: dis.Instruction) -> None:
+        self.stack.append(_NULL)
+
+    def _return_value(self, instruction: dis.Instruction) -> None:
+        (value,) = self._pop()
+        if not self.exiting_with:
+            self.returns.append(self.type_of(value))
+
+    def _return_const(self, instruction: dis.Instruction) -> None:
+        if not self.exiting_with:
+            self.returns.append(self.type_of(_Constant(instruction.argval)))
+
+    # How each instruction is run, by name; the others only have their generic
+    # stack effect (see `_generic`)
+    _HANDLERS: typing.ClassVar[
+        dict[str, "Callable[[BytecodeInterpreter, dis.Instruction], None]"]
+    ] = {
+        "LOAD_CONST": _load_const,
+        "LOAD_SMALL_INT": _load_const,
+        "LOAD_FAST": _load_name,
+        "LOAD_FAST_CHECK": _load_name,
+        "LOAD_FAST_AND_CLEAR": _load_name,
+        "LOAD_DEREF": _load_name,
+        "LOAD_CLOSURE": _load_name,
+        "LOAD_FAST_LOAD_FAST": _load_fast_load_fast,
+        "LOAD_GLOBAL": _load_global,
+        "LOAD_NAME": _load_global,
+        "STORE_FAST": _store_name,
+        "STORE_DEREF": _store_name,
+        "STORE_FAST_LOAD_FAST": _store_fast_load_fast,
+        "STORE_FAST_STORE_FAST": _store_fast_store_fast,
+        "LOAD_ATTR": _load_attr,
+        "CALL": _call,
+        "CALL_KW": _call,
+        "CALL_FUNCTION_EX": _call,
+        "BUILD_LIST": _build_sequence,
+        "BUILD_TUPLE": _build_sequence,
+        "BUILD_MAP": _build_map,
+        "BUILD_CONST_KEY_MAP": _build_const_key_map,
+        "LIST_APPEND": _list_add,
+        "LIST_EXTEND": _list_add,
+        "DICT_UPDATE": _dict_update,
+        "BUILD_STRING": _build_string,
+        "COPY": _copy,
+        "SWAP": _swap,
+        "PUSH_NULL": _push_null,
+        "RETURN_VALUE": _return_value,
+        "RETURN_CONST": _return_const,
+    }
+
+    def run(self) -> None:
+        bytecode = dis.Bytecode(self.code)
+        instructions = list(bytecode)
+        exception_entries = getattr(bytecode, "exception_entries", ())
+        # Stacks at the start of instructions jumped to, by offset
+        targets: dict[int, list[typing.Any]] = {
+            entry.target: [None] * (entry.depth + entry.lasti + 1)
+            for entry in exception_entries
+        }
+        # Whether each of them is only reached by exiting a `with` statement
+        exiting_with = dict.fromkeys(targets, False)
+        exiting_with.update(
+            (instructions[i].offset, True)
+            for i in range(len(instructions) - 1)
+            if instructions[i].offset in targets
+            and instructions[i + 1].opname == "WITH_EXCEPT_START"
+        )
+        reachable = True
+        for instruction in instructions:
+            if instruction.offset in targets:
+                incoming = targets.pop(instruction.offset)
+                self.stack = (
+                    _merge(self.stack, incoming) if reachable else list(incoming)
+                )
+                incoming_exiting_with = exiting_with.pop(instruction.offset)
+                self.exiting_with = (
+                    self.exiting_with and incoming_exiting_with
+                    if reachable
+                    else incoming_exiting_with
+                )
+                reachable = True
+            if not reachable:
+                continue
+
+            if instruction.opcode in _JUMPS:
+                if isinstance(instruction.argval, int) and (
+                    instruction.argval > instruction.offset
+                ):
+                    saved = list(self.stack)
+                    self._generic(instruction, jump=True)
+                    target = instruction.argval
+                    if target in targets:
+                        targets[target] = _merge(targets[target], self.stack)
+                        exiting_with[target] = (
+                            exiting_with[target] and self.exiting_with
+                        )
+                    else:
+                        targets[target] = self.stack
+                        exiting_with[target] = self.exiting_with
+                    self.stack = saved
+                if instruction.opcode in _UNCONDITIONAL_JUMPS:
+                    reachable = False
+                else:
+                    self._generic(instruction)
+                continue
+
+            self._step(instruction)
+            if instruction.opcode in _TERMINATORS:
+                reachable = False
+
+
+def _merge(stack: list[typing.Any], other: list[typing.Any]) -> list[typing.Any]:
+    """The stack at an instruction reached from both `stack` and `other`."""
+    merged = []
+    for value, other_value in zip(stack, other, strict=False):
+        try:
+            same = value is other_value or bool(value == other_value)
+        except Exception:
+            same = False
+        merged.append(value if same else None)
+    return merged + [None] * (len(stack) - len(merged))
+
+
+def infer_return_type_from_bytecode(
+    function: typing.Callable,
+    logger: "Logger",
+    can_eval: bool,
+    max_literal_union: int = MAX_LITERAL_UNION,
+) -> typing.Any:
+    """The return type of `function`, inferred from its bytecode."""
+    try:
+        function = inspect.unwrap(function)
+    except ValueError:
+        return None
+    code = getattr(function, "__code__", None)
+    if not isinstance(code, types.CodeType):
+        return None
+
+    interpreter = BytecodeInterpreter(
+        function, code, logger, can_eval=can_eval, max_literal_union=max_literal_union
+    )
+    interpreter.run()
+    return return_type_from_values(interpreter.returns, max_literal_union)
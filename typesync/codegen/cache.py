@@ -0,0 +1,276 @@
+import dataclasses
+import hashlib
+import marshal
+import os
+import pickle
+import tempfile
+import typing
+
+from .dependencies import unwrap
+from .extractor import ExtractedRoute, get_type_hints
+from typesync.ts_types import iter_references
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from flask import Flask
+    from werkzeug.routing.rules import Rule
+
+    from typesync.ts_types import TSDeclaration
+
+
+# Bump when the format of the cached entries changes
+CACHE_VERSION = 1
+# Entries are told apart from other files in the cache directory by their suffix,
+# since it can be shared with other tools
+_ENTRY_SUFFIX = ".typesync.pickle"
+
+
+@dataclasses.dataclass
+class CachedRoute:
+    fingerprint: str
+    # Digests of the route's source files at the time it was extracted
+    sources: dict[str, str]
+    route: ExtractedRoute
+    log_records: list[tuple[str, str]]
+    declarations: dict[str, "TSDeclaration"]
+
+
+def _describe(value: typing.Any) -> str:
+    # Reprs of arbitrary objects usually contain their address, which changes on
+    # every run. Types are described by name, their definitions are covered by the
+    # digests of the source files.
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    return type(value).__qualname__
+
+
+def _describe_annotation(annotation: typing.Any) -> str:
+    return _describe(annotation) if isinstance(annotation, type) else repr(annotation)
+
+
+class ExtractionCache:
+    """Extracted route types, kept between runs.
+
+    Each route is stored under a fingerprint of its rule, its view function's code
+    and annotations, and the options of the run (`salt`). An entry is only used if
+    all of the source files it was extracted from are unchanged, as well as the
+    `source_files` every route depends on (such as those defining the translators).
+
+    Entries are kept on disk in `directory`, and also in memory with
+    `keep_in_memory` (for processes that generate code several times).
+    """
+
+    def __init__(
+        self,
+        directory: str | None,
+        salt: "Iterable[str]" = (),
+        source_files: "Iterable[str]" = (),
+        keep_in_memory: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.keep_in_memory = keep_in_memory
+        self.app: Flask | None = None
+        self.hits = 0
+        self.misses = 0
+        self._memory: dict[str, CachedRoute] = {}
+        self._digests: dict[str, str | None] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._used_endpoints: set[str] = set()
+        self._salt = "\0".join(
+            (
+                str(CACHE_VERSION),
+                *salt,
+                *(
+                    f"{path}={self.file_digest(path)}"
+                    for path in sorted(set(source_files))
+                ),
+            )
+        )
+
+    def start_run(self, app: "Flask") -> None:
+        """Prepare for extracting the routes of `app`.
+
+        Files may have changed since the previous run, so their digests (and the
+        fingerprints of the view functions) are computed again.
+        """
+        self.app = app
+        self.hits = 0
+        self.misses = 0
+        self._digests.clear()
+        self._fingerprints.clear()
+        self._used_endpoints.clear()
+
+    def file_digest(self, path: str) -> str | None:
+        """The digest of the file at `path`, computed at most once per run."""
+        if path not in self._digests:
+            try:
+                with open(path, "rb") as f:
+                    self._digests[path] = hashlib.file_digest(f, "sha256").hexdigest()
+            except OSError:
+                self._digests[path] = None
+        return self._digests[path]
+
+    def fingerprint(self, rule: "Rule") -> str:
+        fingerprint = self._fingerprints.get(rule.endpoint)
+        if fingerprint is None:
+            fingerprint = self._fingerprints[rule.endpoint] = self._fingerprint(rule)
+        return fingerprint
+
+    def _fingerprint(self, rule: "Rule") -> str:
+        assert self.app is not None  # noqa: S101
+        h = hashlib.sha256(self._salt.encode())
+        function = self.app.view_functions[rule.endpoint]
+        parts = [
+            rule.endpoint,
+            rule.rule,
+            ",".join(sorted(rule.methods or ())),
+            *(
+                f"{arg}={_describe(converter)}:"
+                f"{_describe_annotation(get_type_hints(converter.to_python))}"
+                for arg, converter in sorted(rule._converters.items())
+            ),
+            repr(getattr(function, "_typesync_json_key", None)),
+        ]
+        for f in unwrap(function):
+            parts.append(getattr(f, "__qualname__", ""))
+            parts.extend(
+                f"{name}: {_describe_annotation(annotation)}"
+                for name, annotation in get_type_hints(f).items()
+            )
+            for cell in getattr(f, "__closure__", None) or ():
+                try:
+                    parts.append(_describe(cell.cell_contents))
+                except ValueError:
+                    parts.append("<empty>")
+            code = getattr(f, "__code__", None)
+            if code is not None:
+                h.update(marshal.dumps(code))
+        h.update("\0".join(parts).encode())
+        return h.hexdigest()
+
+    def _entry_path(self, endpoint: str) -> str | None:
+        if self.directory is None:
+            return None
+        name = hashlib.sha256(endpoint.encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}{_ENTRY_SUFFIX}")
+
+    def _read_entry(self, endpoint: str) -> CachedRoute | None:
+        entry = self._memory.get(endpoint)
+        path = self._entry_path(endpoint)
+        if entry is None and path is not None:
+            try:
+                with open(path, "rb") as f:
+                    entry = pickle.load(f)  # noqa: S301
+            except Exception:
+                entry = None
+        return entry if isinstance(entry, CachedRoute) else None
+
+    def load(self, rule: "Rule") -> CachedRoute | None:
+        self._used_endpoints.add(rule.endpoint)
+        entry = self._read_entry(rule.endpoint)
+        if (
+            entry is None
+            or entry.fingerprint != self.fingerprint(rule)
+            or any(
+                self.file_digest(source) != digest
+                for source, digest in entry.sources.items()
+            )
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def mark_used(self, endpoint: str) -> None:
+        """Keep the entry of `endpoint`, whose route was reused without being looked
+        up, when pruning."""
+        self._used_endpoints.add(endpoint)
+
+    def store(
+        self,
+        rule: "Rule",
+        route: ExtractedRoute,
+        log_records: list[tuple[str, str]],
+        declarations: "Mapping[str, TSDeclaration] | None" = None,
+    ) -> None:
+        self._used_endpoints.add(rule.endpoint)
+        self._memory.pop(rule.endpoint, None)
+        if route.source_files is None:
+            return
+        sources = {path: self.file_digest(path) for path in route.source_files}
+        if any(digest is None for digest in sources.values()):
+            return
+
+        entry = CachedRoute(
+            fingerprint=self.fingerprint(rule),
+            sources=typing.cast(dict[str, str], sources),
+            route=route,
+            log_records=log_records,
+            declarations=(
+                {} if declarations is None else used_declarations(route, declarations)
+            ),
+        )
+        if self.keep_in_memory:
+            self._memory[rule.endpoint] = entry
+
+        path = self._entry_path(rule.endpoint)
+        if path is None:
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Types from translator plugins can't always be pickled, such routes
+            # are simply extracted again next time
+            os.unlink(tmp_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def prune(self) -> None:
+        """Remove the entries of routes that weren't looked up during this run.
+
+        Other files in the cache directory are left alone.
+        """
+        for endpoint in self._memory.keys() - self._used_endpoints:
+            del self._memory[endpoint]
+        if self.directory is None:
+            return
+
+        used_paths = {self._entry_path(endpoint) for endpoint in self._used_endpoints}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.endswith(_ENTRY_SUFFIX) and path not in used_paths:
+                os.unlink(path)
+
+
+def used_declarations(
+    route: ExtractedRoute, declarations: "Mapping[str, TSDeclaration]"
+) -> dict[str, "TSDeclaration"]:
+    """The declarations referenced by `route`, directly or through each other."""
+    stack = [
+        reference.key
+        for types in (route.return_types, route.args_types, route.json_body_types)
+        for type_ in types.values()
+        if type_ is not None
+        for reference in iter_references(type_)
+    ]
+    used: dict[str, TSDeclaration] = {}
+    while stack:
+        key = stack.pop()
+        if key in used or key not in declarations:
+            continue
+        used[key] = declarations[key]
+        stack.extend(
+            reference.key for reference in iter_references(used[key].definition)
+        )
+    return used
@@ -0,0 +1,146 @@
+import functools
+import glob
+import inspect
+import os
+import sys
+import sysconfig
+import types
+import typing
+
+from typesync.type_translators import TypeNode, to_type_node
+
+
+def unwrap(function: typing.Callable) -> list[typing.Callable]:
+    """`function` followed by every function it wraps (see `functools.wraps`)."""
+    functions = [function]
+    while (wrapped := getattr(functions[-1], "__wrapped__", None)) is not None:
+        if wrapped in functions:
+            break
+        functions.append(wrapped)
+    return functions
+
+
+def type_modules(types: typing.Iterable[typing.Any]) -> set[str]:
+    """The modules defining any of `types` or the types nested inside them."""
+    modules: set[str] = set()
+    seen: set[TypeNode] = set()
+    stack = [to_type_node(type_) for type_ in types]
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        # Base classes may come from other modules (e.g. inherited fields)
+        for cls in getattr(node.origin, "__mro__", (node.origin,)):
+            module = getattr(cls, "__module__", None)
+            if isinstance(module, str):
+                modules.add(module)
+        stack.extend(node.args)
+        stack.extend(hint for _, hint in node.hints)
+        if node.value is not None:
+            stack.append(node.value)
+    return modules
+
+
+def function_modules(function: typing.Callable) -> set[str]:
+    """The modules defining `function` and the globals its code refers to.
+
+    This covers the functions and classes a view may call, and the modules it
+    calls them through (e.g. `helpers.f()`). The functions return type inference
+    looks into are recorded by the inference itself (see `infer_return_type`).
+    """
+    modules: set[str] = set()
+    for f in unwrap(function):
+        module = getattr(f, "__module__", None)
+        if isinstance(module, str):
+            modules.add(module)
+        code = getattr(f, "__code__", None)
+        globals_dict = getattr(f, "__globals__", {})
+        if code is None:
+            continue
+        values = [globals_dict.get(name) for name in _code_names(code)]
+        values.extend(
+            _cell_contents(cell) for cell in getattr(f, "__closure__", None) or ()
+        )
+        for value in values:
+            if isinstance(value, types.ModuleType):
+                modules.add(value.__name__)
+                continue
+            module = getattr(value, "__module__", None)
+            if isinstance(module, str):
+                modules.add(module)
+    return modules
+
+
+def _cell_contents(cell: types.CellType) -> typing.Any:
+    try:
+        return cell.cell_contents
+    except ValueError:
+        # The variable hasn't been assigned yet
+        return None
+
+
+def _code_names(code: types.CodeType) -> set[str]:
+    """The global names used by `code` and the functions nested in it."""
+    names: set[str] = set()
+    stack = [code]
+    while stack:
+        current = stack.pop()
+        names.update(current.co_names)
+        stack.extend(
+            const for const in current.co_consts if isinstance(const, types.CodeType)
+        )
+    return names
+
+
+def module_file(module: object) -> str | None:
+    """The absolute path of the source file of `module`, if it has one."""
+    try:
+        path = inspect.getsourcefile(module)  # type: ignore[arg-type]
+    except TypeError:
+        # Built-in modules
+        return None
+    if path is None:
+        # e.g. extension modules, which have no Python source
+        path = getattr(module, "__file__", None)
+    return os.path.abspath(path) if isinstance(path, str) else None
+
+
+def module_files(modules: typing.Iterable[str]) -> set[str]:
+    """The source files of the already imported `modules`."""
+    files: set[str] = set()
+    for name in modules:
+        module = sys.modules.get(name)
+        path = None if module is None else module_file(module)
+        if path is not None:
+            files.add(path)
+    return files
+
+
+def package_files(package: str) -> set[str]:
+    """The source files of the already imported `package`, including those of its
+    modules that haven't been imported (yet)."""
+    path = module_file(sys.modules[package])
+    if path is None:
+        return set()
+    root = os.path.dirname(path)
+    return {
+        os.path.join(root, name)
+        for name in glob.glob("**/*.py", root_dir=root, recursive=True)
+    }
+
+
+@functools.cache
+def _library_paths() -> tuple[str, ...]:
+    paths = sysconfig.get_paths()
+    return tuple(
+        os.path.abspath(paths[key]) + os.sep
+        for key in ("stdlib", "platstdlib", "purelib", "platlib")
+        if key in paths
+    )
+
+
+def is_library_file(path: str) -> bool:
+    """Whether `path` belongs to the standard library or an installed package."""
+    path = os.path.abspath(path)
+    return path.startswith(_library_paths()) or "site-packages" in path.split(os.sep)
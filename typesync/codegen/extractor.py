@@ -1,3 +1,4 @@
+import dataclasses
 import typing
 
 import click
@@ -13,10 +14,16 @@ from werkzeug.routing import (
 from werkzeug.routing.rules import Rule
 
 
-from .inference import infer_return_type
+from .dependencies import function_modules, module_files, type_modules
+from .inference import MAX_LITERAL_UNION, InferenceEngine, infer_return_type
 from typesync.misc import HTTPMethod
+from typesync.profiling import profile
 from typesync.ts_types import TSType, TSSimpleType, TSObject
-from typesync.type_translators import TranslationContext, TypeNode, to_type_node
+from typesync.type_translators import TranslationContext, TranslatorRegistry
+from typesync.type_translators.registry import (
+    default_translators,
+    sort_translators,
+)
 
 if typing.TYPE_CHECKING:
     from typesync.type_translators import Translator
@@ -49,10 +56,61 @@ class ClickLogger:
         click.secho(f"Error: {text}", fg="red")
 
 
+class BufferedLogger:
+    """Keeps messages so they can be logged later, e.g. by another process."""
+
+    def __init__(self) -> None:
+        self.records: list[tuple[str, str]] = []
+
+    def info(self, text: str) -> None:
+        self.records.append(("info", text))
+
+    def warning(self, text: str) -> None:
+        self.records.append(("warning", text))
+
+    def error(self, text: str) -> None:
+        self.records.append(("error", text))
+
+
+def replay_log(records: typing.Iterable[tuple[str, str]], logger: Logger) -> None:
+    for level, text in records:
+        getattr(logger, level)(text)
+
+
+@dataclasses.dataclass
+class ExtractedRoute:
+    """The types of a route, extracted ahead of writing it.
+
+    This can be passed to `CodeWriter.write()` in place of a `RouteTypeExtractor`.
+    """
+
+    rule_name: str
+    rule_url: str
+    return_types: dict[HTTPMethod, TSType]
+    args_types: dict[HTTPMethod, TSType]
+    json_body_types: dict[HTTPMethod, TSType]
+    # The source files the types were extracted from, or None if unknown
+    source_files: tuple[str, ...] | None = None
+
+    def parse_return_types(self) -> dict[HTTPMethod, TSType]:
+        return self.return_types
+
+    def parse_args_types(self) -> dict[HTTPMethod, TSType]:
+        return self.args_types
+
+    def parse_json_body(self) -> dict[HTTPMethod, TSType]:
+        return self.json_body_types
+
+
 def get_type_hints(tp: typing.Any) -> dict[str, typing.Any]:
     return getattr(tp, "__annotations__", {})
 
 
+def rule_name(rule: Rule) -> str:
+    """The name of `rule` in the generated code."""
+    return rule.endpoint.replace(".", "_")
+
+
 class RouteTypeExtractor:
     def __init__(
         self,
@@ -62,51 +120,48 @@ class RouteTypeExtractor:
         translator_priorities: dict[str, int] | None = None,
         inference_enabled: bool = False,
         inference_can_eval: bool = False,
+        inference_engine: InferenceEngine = "ast",
+        max_literal_union: int = MAX_LITERAL_UNION,
         skip_unannotated: bool = True,
         logger: Logger | None = None,
+        registry: TranslatorRegistry | None = None,
     ) -> None:
         self.app = app
         self.rule = rule
         self.inference_enabled = inference_enabled
         self.inference_can_eval = inference_can_eval
+        self.inference_engine: InferenceEngine = inference_engine
+        self.max_literal_union = max_literal_union
         self.skip_unannotated = skip_unannotated
         self.logger = ClickLogger() if logger is None else logger
-        self.translator_priorities = (
-            {} if translator_priorities is None else translator_priorities
-        )
-        self.translators = self.sort_translators(
-            (*self.default_translators(), *(translators or ())),
-            self.translator_priorities,
+        # Translators are instantiated once per registry, so callers extracting
+        # many routes should share a single registry between extractors.
+        self.registry = (
+            TranslatorRegistry(translators, translator_priorities)
+            if registry is None
+            else registry
         )
+        self.translator_priorities = self.registry.translator_priorities
+        self.translators = self.registry.translator_types
+        # Every type handed over to the registry, used to find the route's sources
+        self.translated_types: list[Type] = []
+        # The modules looked into while inferring the return type
+        self.inferred_modules: set[str] = set()
 
     @staticmethod
     def sort_translators[T: type["Translator"] | "Translator"](
         translators: typing.Iterable[T],
         priorities: dict[str, int],
     ) -> tuple[T, ...]:
-        return tuple(
-            sorted(translators, key=lambda t: -priorities.get(t.ID, t.DEFAULT_PRIORITY))
-        )
+        return sort_translators(translators, priorities)
 
     @staticmethod
     def default_translators() -> tuple[type["Translator"], ...]:
-        from typesync.type_translators import (  # noqa: PLC0415
-            AnnotationsTranslator,
-            BaseTranslator,
-            FlaskTranslator,
-            PydanticTranslator,
-        )
-
-        return (
-            AnnotationsTranslator,
-            BaseTranslator,
-            FlaskTranslator,
-            PydanticTranslator,
-        )
+        return default_translators()
 
     @property
     def rule_name(self) -> str:
-        return self.rule.endpoint.replace(".", "_")
+        return rule_name(self.rule)
 
     @property
     def rule_url(self) -> str:
@@ -116,6 +171,45 @@ class RouteTypeExtractor:
             ]
         )
 
+    def extract(self) -> ExtractedRoute:
+        # Same order as `CodeWriter.write()`, so messages are logged in the same order
+        return_types = self.parse_return_types()
+        args_types = self.parse_args_types()
+        json_body_types = self.parse_json_body()
+        return ExtractedRoute(
+            self.rule_name,
+            self.rule_url,
+            return_types,
+            args_types,
+            json_body_types,
+            self.source_files(),
+        )
+
+    def source_files(self) -> tuple[str, ...] | None:
+        """The files defining the view function, the functions its return type was
+        inferred from and the types translated so far."""
+        try:
+            function = self.app.view_functions[self.rule.endpoint]
+            modules = (
+                function_modules(function)
+                | self.inferred_modules
+                | type_modules(
+                    [
+                        *self.translated_types,
+                        *(
+                            type(converter)
+                            for converter in self.rule._converters.values()
+                        ),
+                    ]
+                )
+            )
+        except Exception as e:
+            self.logger.error(
+                f"couldn't find the sources of '{self.rule.endpoint}' ({e})"
+            )
+            return None
+        return tuple(sorted(module_files(modules)))
+
     def parse_args_types(self) -> dict[HTTPMethod, TSType]:
         try:
             used_converters: dict[str, BaseConverter] = {
@@ -127,11 +221,16 @@ class RouteTypeExtractor:
                 if converter is not None
             }
 
+            methods = self.rule.methods or set()
+            converter_types: dict[str, dict[HTTPMethod, TSType]] = {
+                arg: self._get_converter_types(arg, converter, methods)
+                for arg, converter in used_converters.items()
+            }
+
             results: dict[HTTPMethod, TSType] = {}
-            for method in self.rule.methods or set():
+            for method in methods:
                 types: list[tuple[str, TSType]] = [
-                    (arg, self._get_converter_type(arg, converter, method))
-                    for arg, converter in used_converters.items()
+                    (arg, converter_types[arg][method]) for arg in used_converters
                 ]
 
                 results[method] = (
@@ -150,26 +249,7 @@ class RouteTypeExtractor:
     def translate_type(
         self, type_: Type, ctx: TranslationContext
     ) -> tuple[TSType, str | None]:
-        warning = None
-
-        def translate(
-            node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
-        ) -> TSType:
-            nonlocal warning
-            for translator in translators:
-                r = translator.translate(node, generics)
-                if r is not None:
-                    return r
-
-            warning = (
-                f"can't translate '{getattr(node.origin, '__name__', node.origin)}'"
-                " to a TypeScript equivalent, defaulting to 'any'"
-            )
-            return TSSimpleType("any")
-
-        translators = [Translator(translate, ctx) for Translator in self.translators]
-        node = to_type_node(type_)
-        return translate(node, {}), warning
+        return self.registry.translate(type_, ctx)
 
     def parse_return_types(self, force_inference=False) -> dict[HTTPMethod, TSType]:
         try:
@@ -192,27 +272,36 @@ class RouteTypeExtractor:
             ):
                 return_annotations = annotations["return"]
             elif self.inference_enabled:
-                return_annotations = infer_return_type(
-                    function, self.logger, self.inference_can_eval
-                )
+                with profile("inference"):
+                    return_annotations = infer_return_type(
+                        function,
+                        self.logger,
+                        self.inference_can_eval,
+                        self.inference_engine,
+                        self.max_literal_union,
+                        self.inferred_modules,
+                    )
                 ctx.inferred = True
 
             if return_annotations is None and self.skip_unannotated:
                 return {}
 
             route_annotations = self._get_route_annotations(return_annotations)
+            self.translated_types.append(route_annotations)
 
-            results: dict[HTTPMethod, TSType] = {}
-            for method in self.rule.methods or set():
-                ctx.method = method
-                result, warning = self.translate_type(route_annotations, ctx)
-
-                if warning is not None and not ctx.inferred and self.inference_enabled:
-                    return self.parse_return_types(force_inference=True)
+            translated = self.registry.translate_methods(
+                route_annotations, ctx, self.rule.methods or set()
+            )
+            warnings = self._collect_warnings(translated)
+            if warnings and not ctx.inferred and self.inference_enabled:
+                return self.parse_return_types(force_inference=True)
 
-                results[method] = result or TSSimpleType("any")
-                if warning is not None:
-                    self.logger.warning(warning)
+            results: dict[HTTPMethod, TSType] = {
+                method: result or TSSimpleType("any")
+                for method, (result, _) in translated.items()
+            }
+            for warning in warnings:
+                self.logger.warning(warning)
 
         except Exception as e:
             self.logger.error(
@@ -239,6 +328,7 @@ class RouteTypeExtractor:
                 return {}
 
             json_body_annotations = annotations[json_key]
+            self.translated_types.append(json_body_annotations)
 
             ctx = TranslationContext(
                 rule=self.rule,
@@ -247,16 +337,15 @@ class RouteTypeExtractor:
                 mode="JSON",
                 inferred=False,
             )
-            results: dict[HTTPMethod, TSType] = {}
-
-            for method in self.rule.methods or set():
-                json_body_type, warning = self.translate_type(
-                    json_body_annotations, ctx
-                )
-                if warning is not None:
-                    self.logger.warning(warning)
-
-                results[method] = json_body_type
+            translated = self.registry.translate_methods(
+                json_body_annotations, ctx, self.rule.methods or set()
+            )
+            results: dict[HTTPMethod, TSType] = {
+                method: json_body_type
+                for method, (json_body_type, _) in translated.items()
+            }
+            for warning in self._collect_warnings(translated):
+                self.logger.warning(warning)
 
         except Exception as e:
             self.logger.error(
@@ -277,13 +366,24 @@ class RouteTypeExtractor:
             return self._get_route_annotations_from_tuple(tp)
         return tp
 
-    def _get_converter_type(
-        self, arg: str, converter: BaseConverter, method: HTTPMethod
-    ) -> TSType:
+    @staticmethod
+    def _collect_warnings(
+        translated: dict[HTTPMethod, tuple[TSType, str | None]],
+    ) -> list[str]:
+        # Methods sharing a translation also share its warning, report it once
+        return list(
+            dict.fromkeys(
+                warning for _, warning in translated.values() if warning is not None
+            )
+        )
+
+    def _get_converter_types(
+        self, arg: str, converter: BaseConverter, methods: typing.Iterable[HTTPMethod]
+    ) -> dict[HTTPMethod, TSType]:
         if isinstance(converter, (FloatConverter, IntegerConverter)):
-            return TSSimpleType("number")
+            return dict.fromkeys(methods, TSSimpleType("number"))
         if isinstance(converter, (UUIDConverter, PathConverter, UnicodeConverter)):
-            return TSSimpleType("string")
+            return dict.fromkeys(methods, TSSimpleType("string"))
 
         # Custom converter, check to_python() annotations
         annotations = get_type_hints(converter.to_python)
@@ -292,18 +392,19 @@ class RouteTypeExtractor:
                 f"route '{self.rule.endpoint}', argument '{arg}': using non-standard"
                 "converter without type annotations, defaulting to 'string'",
             )
-            return TSSimpleType("string")
+            return dict.fromkeys(methods, TSSimpleType("string"))
 
         ctx = TranslationContext(
             rule=self.rule,
             view_function=self.app.view_functions[self.rule.endpoint],
-            method=method,
+            method="GET",
             mode="ARGS",
             inferred=False,
         )
 
         return_annotations = annotations["return"]
-        return_type, warning = self.translate_type(return_annotations, ctx)
-        if warning is not None:
+        self.translated_types.append(return_annotations)
+        translated = self.registry.translate_methods(return_annotations, ctx, methods)
+        for warning in self._collect_warnings(translated):
             self.logger.warning(warning)
-        return return_type
+        return {method: return_type for method, (return_type, _) in translated.items()}
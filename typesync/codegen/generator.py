@@ -0,0 +1,460 @@
+import contextlib
+import cProfile
+import dataclasses
+import functools
+import hashlib
+import io
+import json
+import os
+import typing
+
+from .cache import ExtractionCache
+from .dependencies import module_files, package_files
+from .extractor import BufferedLogger, ExtractedRoute, Logger, RouteTypeExtractor
+from .inference import MAX_LITERAL_UNION, InferenceCache, InferenceEngine
+from .manifest import (
+    Fragments,
+    RouteFragment,
+    build_manifest,
+    load_manifest,
+    project_files,
+    reusable_routes,
+    text_digest,
+    write_manifest,
+)
+from .output import file_digest, replace_if_changed
+from .parallel import extract_routes
+from .writer import CodeWriter, RenderedRoute
+from typesync.profiling import Profiler, format_report, profile, profile_route
+from typesync.ts_types import GenerationCache
+from typesync.type_translators import TranslatorRegistry
+from typesync.type_translators.stats import format_translator_stats
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable, Collection, Generator, Iterator
+
+    from flask import Flask
+    from werkzeug.routing.rules import Rule
+
+    from typesync.ts_types import TSDeclaration
+    from typesync.type_translators import Translator
+
+
+@dataclasses.dataclass
+class GenerateOptions:
+    """The options of `flask typesync generate`, named after its parameters."""
+
+    out_dir: str
+    endpoint: str = ""
+    translator: tuple[type["Translator"], ...] = ()
+    translator_priority: tuple[tuple[str, int], ...] = ()
+    inference: bool = False
+    inference_can_eval: bool = False
+    inference_engine: InferenceEngine = "ast"
+    max_literal_union: int = MAX_LITERAL_UNION
+    skip_unannotated: bool = True
+    types_file: str = "types.ts"
+    apis_file: str = "apis.ts"
+    return_type_format: str = "{r_pc}{m_uc}ReturnType"
+    args_type_format: str = "{r_pc}{m_uc}ArgsType"
+    function_name_format: str = "{m_lc}{r_pc}"
+    hoist_types: bool = False
+    jobs: int = 1
+    cache_dir: str | None = None
+    cache_size: int = 4096
+    cache_stats: bool = False
+    samefile: str | None = None
+    manifest_file: str = ".typesync-manifest.json"
+    profile: bool = False
+    profile_top: int = 10
+    profile_json: str | None = None
+    profile_stats: str | None = None
+    translator_stats: bool = False
+
+
+class GenerationCancelledError(Exception):
+    """Raised by `CodeGenerator.run` when it is cancelled before finishing."""
+
+
+@dataclasses.dataclass
+class GenerationResult:
+    ok: bool
+    # Names of the output files whose content changed
+    updated: list[str]
+
+
+class CodeGenerator:
+    """Generates the TypeScript files of an app.
+
+    A generator can be run several times (e.g. by `flask typesync serve`), in which
+    case routes whose sources didn't change between runs are reused from memory.
+    """
+
+    def __init__(self, options: GenerateOptions, keep_in_memory: bool = False) -> None:
+        self.options = options
+        self.translator_priorities = dict(options.translator_priority)
+        self.translator_types = TranslatorRegistry(
+            options.translator, self.translator_priorities
+        ).translator_types
+        # Changes to typesync itself or to a translator invalidate every route. All
+        # of typesync's files are included, as some of its modules are only
+        # imported once they're needed (e.g. by inference)
+        self.source_files = sorted(
+            module_files(t.__module__ for t in self.translator_types)
+            | package_files("typesync")
+        )
+        self.extraction_cache = (
+            ExtractionCache(
+                options.cache_dir,
+                salt=self._cache_salt(),
+                source_files=self.source_files,
+                keep_in_memory=keep_in_memory,
+            )
+            if options.cache_dir is not None or keep_in_memory
+            else None
+        )
+
+    def _cache_salt(self) -> tuple[str, ...]:
+        options = self.options
+        return (
+            f"inference={options.inference}",
+            f"inference_can_eval={options.inference_can_eval}",
+            f"inference_engine={options.inference_engine}",
+            f"max_literal_union={options.max_literal_union}",
+            f"skip_unannotated={options.skip_unannotated}",
+            f"hoist_types={options.hoist_types}",
+            *(
+                f"{t.__module__}.{t.__qualname__}:{t.ID}="
+                f"{self.translator_priorities.get(t.ID, t.DEFAULT_PRIORITY)}"
+                for t in self.translator_types
+            ),
+        )
+
+    def _fragments_fingerprint(self) -> str:
+        options = self.options
+        h = hashlib.sha256()
+        for part in (
+            *self._cache_salt(),
+            options.return_type_format,
+            options.args_type_format,
+            options.function_name_format,
+            *(f"{path}={file_digest(path)}" for path in self.source_files),
+        ):
+            h.update(part.encode() + b"\0")
+        return h.hexdigest()
+
+    def run(
+        self,
+        app: "Flask",
+        logger: Logger,
+        cancelled: "Callable[[], bool] | None" = None,
+        changed_files: "Collection[str] | None" = None,
+    ) -> GenerationResult:
+        """Generate the code of `app`, replacing the output files that changed.
+
+        `cancelled` is checked before each route is extracted; once it returns true
+        the run stops with `GenerationCancelledError`, leaving the output files as
+        they were. Routes extracted until then are still kept in the cache.
+
+        With `changed_files`, the source files modified since the previous run, only
+        the routes depending on them are extracted again. The code of the others is
+        copied from the previous output, using the index of the manifest. This isn't
+        possible with hoisted types, whose declarations are shared between routes.
+        """
+        options = self.options
+        profiling = bool(
+            options.profile or options.profile_json or options.profile_stats
+        )
+        rules: list[Rule] = sorted(
+            app.url_map.iter_rules(), key=lambda rule: rule.endpoint
+        )
+
+        registry = self._make_registry(collect_stats=options.translator_stats)
+        # Declarations hoisted by worker processes are merged here
+        declarations: dict[str, TSDeclaration] | None = (
+            None if registry.declarations is None else {}
+        )
+
+        os.makedirs(options.out_dir, exist_ok=True)
+        fingerprint = self._fragments_fingerprint()
+        previous_manifest = load_manifest(
+            os.path.join(options.out_dir, options.manifest_file)
+        )
+        reused = self._reused_routes(
+            app, rules, previous_manifest, changed_files, fingerprint
+        )
+
+        route_files: dict[str, list[str] | None] = {}
+        fragments: dict[str, RouteFragment] = {}
+
+        def record(
+            routes: "Generator[ExtractedRoute]",
+        ) -> "Iterator[ExtractedRoute | RenderedRoute]":
+            try:
+                for rule in rules:
+                    if cancelled is not None and cancelled():
+                        raise GenerationCancelledError
+                    types_start = types_f.tell()
+                    apis_start = api_f.tell()
+                    names_start = len(code_writer.function_names)
+
+                    with profile_route(rule.endpoint):
+                        rendered = reused.get(rule.endpoint)
+                        if rendered is not None:
+                            assert previous_manifest is not None  # noqa: S101
+                            route_files[rule.endpoint] = previous_manifest["routes"][
+                                rule.endpoint
+                            ]
+                            with profile("write"):
+                                yield rendered
+                        else:
+                            with profile("extract"):
+                                route = next(routes)
+                            route_files[rule.endpoint] = project_files(
+                                route.source_files
+                            )
+                            with profile("write"):
+                                yield route
+
+                    # The writer is done with the route once it asks for the next
+                    fragments[rule.endpoint] = RouteFragment(
+                        rule=rule.rule,
+                        methods=sorted(rule.methods or ()),
+                        types=(types_start, types_f.tell()),
+                        apis=(apis_start, api_f.tell()),
+                        function_names=code_writer.function_names[names_start:],
+                    )
+            finally:
+                # Stops the worker processes of a cancelled run
+                routes.close()
+
+        # Files are rendered in memory and only replaced if their content changed,
+        # so that watchers (e.g. Vite) don't rebuild for nothing
+        types_f = io.StringIO()
+        api_f = io.StringIO()
+        profiler = Profiler() if profiling else None
+        c_profile = cProfile.Profile() if options.profile_stats else None
+        with (
+            GenerationCache(options.cache_size) as generation_cache,
+            # Shared by the routes, so that helpers are only inferred once
+            InferenceCache() as inference_cache,
+            profiler or contextlib.nullcontext(),
+            c_profile or contextlib.nullcontext(),
+        ):
+            code_writer = CodeWriter(
+                types_f,
+                api_f,
+                options.types_file,
+                options.return_type_format,
+                options.args_type_format,
+                options.function_name_format,
+                options.endpoint,
+                declarations=declarations,
+                rules=rules,
+            )
+            ok = code_writer.write(
+                record(
+                    extract_routes(
+                        [rule for rule in rules if rule.endpoint not in reused],
+                        functools.partial(self._make_extractor, app, registry),
+                        self._jobs(logger, profiling),
+                        logger,
+                        declarations,
+                        self.extraction_cache,
+                    )
+                )
+            )
+            if options.cache_stats:
+                self._report_cache_stats(
+                    logger,
+                    generation_cache,
+                    inference_cache,
+                    None
+                    if changed_files is None
+                    else (len(reused), len(rules) - len(reused)),
+                )
+        self._report_profile(logger, profiler, c_profile, registry)
+
+        updated = self._write_files(
+            app,
+            logger,
+            types_f.getvalue(),
+            api_f.getvalue(),
+            route_files,
+            fingerprint,
+            fragments,
+        )
+        if self.extraction_cache is not None:
+            self.extraction_cache.prune()
+        return GenerationResult(ok, updated)
+
+    def _write_files(
+        self,
+        app: "Flask",
+        logger: Logger,
+        types_text: str,
+        apis_text: str,
+        route_files: dict[str, list[str] | None],
+        fingerprint: str,
+        fragments: dict[str, RouteFragment],
+    ) -> list[str]:
+        """Replace the output files that changed and write the manifest, returning
+        the names of the files that were updated."""
+        options = self.options
+        updated = [
+            file_name
+            for file_name, text in (
+                (options.types_file, types_text),
+                (options.apis_file, apis_text),
+            )
+            if replace_if_changed(os.path.join(options.out_dir, file_name), text)
+        ]
+        if updated:
+            logger.info(f"updated {', '.join(updated)}")
+        else:
+            logger.info("generated files are up to date")
+
+        # Tells watchers (such as the Rollup plugin) which files to watch, and
+        # where the code of each route is for incremental runs
+        write_manifest(
+            os.path.join(options.out_dir, options.manifest_file),
+            build_manifest(
+                app,
+                route_files,
+                None
+                if options.hoist_types
+                else Fragments(
+                    fingerprint=fingerprint,
+                    types_digest=text_digest(types_text),
+                    apis_digest=text_digest(apis_text),
+                    routes=fragments,
+                ),
+            ),
+        )
+        return updated
+
+    def _jobs(self, logger: Logger, profiling: bool) -> int:
+        if (profiling or self.options.translator_stats) and self.options.jobs > 1:
+            # What happens in worker processes couldn't be measured
+            logger.warning(
+                "profiling and translator statistics extract routes in a single process"
+            )
+            return 1
+        return self.options.jobs
+
+    def translator_stats(self, app: "Flask") -> str:
+        """Extract the types of every route of `app` without generating any code,
+        and return the table of translator statistics `--translator-stats` reports.
+        """
+        registry = self._make_registry(collect_stats=True)
+        for rule in app.url_map.iter_rules():
+            self._make_extractor(app, registry, rule, BufferedLogger()).extract()
+        assert registry.stats is not None  # noqa: S101
+        return format_translator_stats(registry.stats, registry.priorities)
+
+    def _make_registry(self, collect_stats: bool) -> TranslatorRegistry:
+        options = self.options
+        return TranslatorRegistry(
+            options.translator,
+            self.translator_priorities,
+            hoist_types=options.hoist_types,
+            collect_stats=collect_stats,
+        )
+
+    def _make_extractor(
+        self, app: "Flask", registry: TranslatorRegistry, rule: "Rule", logger: Logger
+    ) -> RouteTypeExtractor:
+        options = self.options
+        return RouteTypeExtractor(
+            app,
+            rule,
+            inference_enabled=options.inference,
+            inference_can_eval=options.inference_can_eval,
+            inference_engine=options.inference_engine,
+            max_literal_union=options.max_literal_union,
+            skip_unannotated=options.skip_unannotated,
+            logger=logger,
+            registry=registry,
+        )
+
+    def _reused_routes(
+        self,
+        app: "Flask",
+        rules: "list[Rule]",
+        previous_manifest: dict[str, typing.Any] | None,
+        changed_files: "Collection[str] | None",
+        fingerprint: str,
+    ) -> dict[str, RenderedRoute]:
+        """The routes of an incremental run whose code is copied from the previous
+        output. This also starts the run of the extraction cache."""
+        options = self.options
+        reused = (
+            reusable_routes(
+                previous_manifest,
+                rules,
+                changed_files,
+                fingerprint,
+                os.path.join(options.out_dir, options.types_file),
+                os.path.join(options.out_dir, options.apis_file),
+            )
+            if changed_files is not None and not options.hoist_types
+            else {}
+        )
+        if self.extraction_cache is not None:
+            self.extraction_cache.start_run(app)
+            # Their entries are still valid, they're only not looked up
+            for endpoint in reused:
+                self.extraction_cache.mark_used(endpoint)
+        return reused
+
+    def _report_cache_stats(
+        self,
+        logger: Logger,
+        generation_cache: GenerationCache,
+        inference_cache: InferenceCache,
+        incremental: tuple[int, int] | None,
+    ) -> None:
+        """Log the hits and misses of the caches, and with `incremental`, the
+        number of routes reused and extracted by an incremental run."""
+        logger.info(
+            f"generation cache: {generation_cache.hits} hits, "
+            f"{generation_cache.misses} misses, "
+            f"{len(generation_cache)} entries"
+        )
+        if self.options.inference:
+            logger.info(
+                f"inference cache: {inference_cache.hits} hits, "
+                f"{inference_cache.misses} misses"
+            )
+        if self.extraction_cache is not None:
+            logger.info(
+                f"extraction cache: {self.extraction_cache.hits} hits, "
+                f"{self.extraction_cache.misses} misses"
+            )
+        if incremental is not None:
+            reused, extracted = incremental
+            logger.info(
+                f"incremental run: {reused} routes reused, {extracted} extracted"
+            )
+
+    def _report_profile(
+        self,
+        logger: Logger,
+        profiler: Profiler | None,
+        c_profile: cProfile.Profile | None,
+        registry: TranslatorRegistry,
+    ) -> None:
+        options = self.options
+        if profiler is not None:
+            phases_table, routes_table = format_report(profiler, options.profile_top)
+            logger.info(f"time per phase:\n{phases_table}")
+            logger.info(f"slowest routes:\n{routes_table}")
+            if options.profile_json is not None:
+                with open(options.profile_json, "w", encoding="utf-8") as f:
+                    json.dump(profiler.to_json(), f, indent=2)
+        if registry.stats is not None:
+            stats = format_translator_stats(registry.stats, registry.priorities)
+            logger.info(f"translators:\n{stats}")
+        if c_profile is not None:
+            assert options.profile_stats is not None  # noqa: S101
+            c_profile.dump_stats(options.profile_stats)
@@ -1,37 +1,67 @@
 import ast
 import builtins
+import contextvars
+import dataclasses
 import inspect
+import linecache
+import math
 import textwrap
 import types
 import typing
 
+from .dependencies import function_modules
+
 if typing.TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from .extractor import Logger
 
 
+# How return types are inferred: from the source code of functions ("ast"), from
+# their bytecode ("bytecode"), or from their source code if it's available and from
+# their bytecode otherwise ("auto")
+type InferenceEngine = typing.Literal["ast", "bytecode", "auto"]
+INFERENCE_ENGINES: tuple[InferenceEngine, ...] = ("ast", "bytecode", "auto")
+
+# Largest number of literal values merged into a union (e.g. `Literal["a", "b"]`);
+# literals with more values are widened to their underlying type
+MAX_LITERAL_UNION = 9
+
+
 class ASTVisitor(ast.NodeVisitor):
     def __init__(
-        self, function: typing.Callable, logger: "Logger", can_eval: bool = False
+        self,
+        function: typing.Callable,
+        logger: "Logger",
+        can_eval: bool = False,
+        engine: InferenceEngine = "ast",
+        max_literal_union: int = MAX_LITERAL_UNION,
     ) -> None:
         self.function: typing.Callable = function
         self.logger = logger
         self.can_eval = can_eval
+        # Used to infer the return types of the functions called by this one
+        self.engine: InferenceEngine = engine
+        self.max_literal_union = max_literal_union
         self.locals: dict[str, typing.Any] = {}
         self.returns: list = []
 
-    def get_variable(self, name: ast.Name) -> typing.Any:
-        local_var = self.locals.get(name.id, None)
+    def lookup(self, name: str) -> typing.Any:
+        local_var = self.locals.get(name, None)
         if local_var is not None:
             return local_var
         globals_dict = getattr(self.function, "__globals__", {})
-        global_var = globals_dict.get(name.id, None)
+        global_var = globals_dict.get(name, None)
         if global_var is not None:
             return global_var
-        builtin = getattr(builtins, name.id, None)
+        builtin = getattr(builtins, name, None)
         if isinstance(builtin, type):
             return builtin
         return None
 
+    def get_variable(self, name: ast.Name) -> typing.Any:
+        return self.lookup(name.id)
+
     def get_constant(self, constant: ast.Constant) -> typing.Any:
         try:
             constant_value = ast.literal_eval(constant)
@@ -44,22 +74,11 @@ class ASTVisitor(ast.NodeVisitor):
     def get_combined_type(
         self, expressions: list[ast.expr], allow_literals: bool = True
     ) -> typing.Any:
-        if len(expressions) == 0:
-            return None
-        if len(expressions) == 1:
-            return self.get_value(expressions[0])
-
-        most_generic_type = self.get_value(expressions[0])
-        for element in expressions[1:]:
-            most_generic_type = closest_common_parent_type(
-                self.get_value(element),
-                most_generic_type,
-                allow_literals=allow_literals
-            )
-            if most_generic_type is None:
-                break
-
-        return most_generic_type
+        return combine_types(
+            (self.get_value(expression) for expression in expressions),
+            allow_literals,
+            self.max_literal_union,
+        )
 
     def get_list(self, list_: ast.List) -> typing.Any:
         list_type = self.get_combined_type(list_.elts, False)
@@ -123,7 +142,13 @@ class ASTVisitor(ast.NodeVisitor):
 
         annotations = getattr(called_function, "__annotations__", {})
         if "return" not in annotations:
-            return infer_return_type(called_function, self.logger, self.can_eval)
+            return infer_return_type(
+                called_function,
+                self.logger,
+                self.can_eval,
+                self.engine,
+                self.max_literal_union,
+            )
         return annotations["return"]
 
     def from_method_call(self, method: ast.Attribute) -> typing.Any:
@@ -136,7 +161,9 @@ class ASTVisitor(ast.NodeVisitor):
             return None
         annotations = getattr(func, "__annotations__", {})
         if "return" not in annotations:
-            return infer_return_type(func, self.logger, self.can_eval)
+            return infer_return_type(
+                func, self.logger, self.can_eval, self.engine, self.max_literal_union
+            )
         return annotations["return"]
 
     def infer_call_type(self, call: ast.Call) -> typing.Any:
@@ -221,48 +248,90 @@ def define_types_from_signature(function: typing.Callable, visitor: ASTVisitor)
 
 
 def closest_common_parent_type(
-        type1: typing.Any, type2: typing.Any, allow_literals: bool = True
-    ) -> typing.Any:
-        if type1 == type2:
-            return type1
-
-        types = [type1, type2]
-        literals = True
-
-        # 1st case: literals are an instance of their underlying type
-        for i, type_ in enumerate(types):
-            if typing.get_origin(type_) is typing.Literal:
-                args = typing.get_args(type_)
-                if len(args) < 1:
-                    continue
-                types[i] = type(args[0])
-            else:
-                literals = False
-
-        if types[0] == types[1]:
-            if literals and allow_literals:
-                total_args = [
-                    *typing.get_args(type1), *typing.get_args(type2)
-                ]
-                args_without_duplicates = list(set(total_args))
-                if len(args_without_duplicates) > 1 and types[0] is bool:
-                    # Special case: typing.Literal[True, False] <=> bool
-                    return bool
-                if len(args_without_duplicates) < 10:
-                    # If there are less than 10 literal types, return
-                    # a literal with all of those options.
-                    # FIXME: don't use magic number
-                    return typing.Literal[*args_without_duplicates]
-            # Return the underlying type
-            return types[0]
-
-        # 2nd case: one is a more generic version of the same type, such as
-        # dict and dict[str, int]
-        origins = [typing.get_origin(type_) or type_ for type_ in types]
-        if origins[0] == origins[1]:
-            return origins[0]
+    type1: typing.Any,
+    type2: typing.Any,
+    allow_literals: bool = True,
+    max_literal_union: int = MAX_LITERAL_UNION,
+) -> typing.Any:
+    """The most specific type both `type1` and `type2` are instances of, if any.
 
-        return None
+    Literals are instances of their underlying type, and generic types (such as
+    `dict[str, int]`) of their origin. Literals of the same type are merged into
+    a union of their values, unless `allow_literals` is False or there would be
+    more than `max_literal_union` of them.
+    """
+    return combine_types((type1, type2), allow_literals, max_literal_union)
+
+
+def _literal_args(type_: typing.Any) -> tuple:
+    if typing.get_origin(type_) is typing.Literal:
+        return typing.get_args(type_)
+    return ()
+
+
+def _coalescing_key(type_: typing.Any) -> typing.Any:
+    # Two types have a common parent type when they have the same key: literals
+    # stand for their underlying type, and generic types for their origin
+    if args := _literal_args(type_):
+        type_ = type(args[0])
+    return typing.get_origin(type_) or type_
+
+
+def _literal_union(
+    base: type,
+    values: frozenset,
+    allow_literals: bool,
+    max_literal_union: int,
+) -> typing.Any:
+    if not allow_literals:
+        return base
+    if len(values) > 1 and base is bool:
+        # Special case: typing.Literal[True, False] <=> bool
+        return bool
+    if len(values) <= max_literal_union:
+        return typing.Literal[*values]
+    return base
+
+
+def combine_types(
+    type_list: "Iterable[typing.Any]",
+    allow_literals: bool = True,
+    max_literal_union: int = MAX_LITERAL_UNION,
+) -> typing.Any:
+    """The closest common parent type of all the types in `type_list` (see
+    `closest_common_parent_type`), or None if they don't have one.
+
+    Types are only consumed from `type_list` until one without a common parent
+    type is found. The values of literal types are collected along the way, and
+    only turned into a `typing.Literal` once all of them are known.
+    """
+    types_ = iter(type_list)
+    first = next(types_, None)
+    key = _coalescing_key(first)
+    same = True
+    # The values of each literal type, as long as all the types are literals
+    args = _literal_args(first)
+    literal_args: list[tuple] | None = [args] if args else None
+    for type_ in types_:
+        if type_ == first:
+            continue
+        if _coalescing_key(type_) != key:
+            return None
+        same = False
+        if literal_args is not None:
+            if args := _literal_args(type_):
+                literal_args.append(args)
+            else:
+                literal_args = None
+
+    if same:
+        return first
+    if literal_args is None:
+        # e.g. dict and dict[str, int], or a literal and its underlying type
+        return key
+    return _literal_union(
+        key, frozenset().union(*literal_args), allow_literals, max_literal_union
+    )
 
 
 def flatten_union(type_: typing.Any) -> list:
@@ -280,32 +349,235 @@ def flatten_unions(type_list: typing.Sequence) -> list:
     return result
 
 
-def coalesce_types(type_list: list) -> list:
+def coalesce_types(type_list: list, max_literal_union: int = MAX_LITERAL_UNION) -> list:
+    """Merge the types of `type_list` that have a common parent type.
+
+    Types only merge with the types of the same key (see `_coalescing_key`), and
+    always into a type with that key, so each group of types with the same key
+    is merged once, into a single type.
+    """
     if len(type_list) <= 1:
         return type_list
 
-    result = type_list[:]
-    i = 0
-    j = 1
-    while i + j < len(result):
-        if result[i] != result[i+j]:
-            common = closest_common_parent_type(
-                result[i], result[i+j]
+    groups: dict[typing.Any, list] = {}
+    for type_ in dict.fromkeys(type_list):
+        groups.setdefault(_coalescing_key(type_), []).append(type_)
+    return [
+        combine_types(group, max_literal_union=max_literal_union)
+        for group in groups.values()
+    ]
+
+
+type _InferenceKey = tuple[
+    types.CodeType, bool, InferenceEngine, int, bool, tuple[int, ...]
+]
+
+
+class _Inferred(typing.NamedTuple):
+    return_type: typing.Any
+    log_records: list[tuple[str, str]]
+    # Keeps the function (and so the closure cells in the key) alive
+    function: typing.Callable
+    # The modules the inferred type depends on (see `function_modules`)
+    modules: frozenset[str]
+
+
+@dataclasses.dataclass
+class _Frame:
+    depth: int
+    # Depth of the outermost function whose inference this one ran into again,
+    # if any (see `InferenceCache.infer`)
+    cycle_depth: float = math.inf
+    # The modules of this function and of those it looked into
+    modules: set[str] = dataclasses.field(default_factory=set)
+
+
+class InferenceCache:
+    """Return types inferred during a run, by function.
+
+    Helpers used by many views are only inferred once, and the modules they're
+    defined in only parsed once (see `index_functions`). Inferring
+    a function while it is already being inferred (e.g. mutually recursive helpers)
+    stops the cycle instead of recursing without bound. Like the
+    `GenerationCache`, the cache only takes effect while it is active
+    (`with InferenceCache():`).
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._definitions: dict[types.CodeType, ast.FunctionDef | None] = {}
+        # The functions defined in each source file, or None if it can't be read
+        self._modules: dict[str, dict[tuple[int, str], ast.FunctionDef] | None] = {}
+        self._results: dict[_InferenceKey, _Inferred] = {}
+        # Functions being inferred, and the depth of their frame
+        self._in_progress: dict[_InferenceKey, int] = {}
+        self._stack: list[_Frame] = []
+        self._token: contextvars.Token | None = None
+
+    def __enter__(self) -> "InferenceCache":
+        self._token = _active_inference_cache.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._token is not None:
+            _active_inference_cache.reset(self._token)
+            self._token = None
+        self._definitions.clear()
+        self._modules.clear()
+        self._results.clear()
+
+    @staticmethod
+    def _key(
+        function: typing.Callable,
+        can_eval: bool,
+        engine: InferenceEngine,
+        max_literal_union: int,
+    ) -> _InferenceKey | None:
+        try:
+            code = getattr(inspect.unwrap(function), "__code__", None)
+        except ValueError:
+            return None
+        if not isinstance(code, types.CodeType):
+            return None
+        # Functions created by the same code (e.g. by a factory) differ by their
+        # closure, and the parameters of bound methods don't include `self`
+        closure = getattr(function, "__closure__", None) or ()
+        return (
+            code,
+            can_eval,
+            engine,
+            max_literal_union,
+            isinstance(function, types.MethodType),
+            tuple(id(cell) for cell in closure),
+        )
+
+    def _definition(
+        self, function: typing.Callable, code: types.CodeType
+    ) -> ast.FunctionDef | None:
+        try:
+            return self._definitions[code]
+        except KeyError:
+            pass
+
+        filename = code.co_filename
+        try:
+            functions = self._modules[filename]
+        except KeyError:
+            functions = self._modules[filename] = _index_file(filename)
+        definition = self._definitions[code] = (
+            # e.g. modules loaded from archives
+            parse_function(function)
+            if functions is None
+            else functions.get((code.co_firstlineno, code.co_name))
+        )
+        return definition
+
+    def _depends_on(self, modules: "Iterable[str]", into: set[str] | None) -> None:
+        # The function being inferred, and so those calling it, depend on `modules`
+        if self._stack:
+            self._stack[-1].modules.update(modules)
+        if into is not None:
+            into.update(modules)
+
+    def infer(
+        self,
+        function: typing.Callable,
+        logger: "Logger",
+        can_eval: bool,
+        engine: InferenceEngine = "ast",
+        max_literal_union: int = MAX_LITERAL_UNION,
+        modules: set[str] | None = None,
+    ) -> typing.Any:
+        from .bytecode import infer_return_type_from_bytecode  # noqa: PLC0415
+        from .extractor import BufferedLogger, replay_log  # noqa: PLC0415
+
+        key = self._key(function, can_eval, engine, max_literal_union)
+        if key is None:
+            return None
+
+        depth = self._in_progress.get(key)
+        if depth is not None:
+            # What is inferred for the functions on the cycle depends on where it
+            # was entered, so none of them past `function` can be kept
+            frame = self._stack[-1]
+            frame.cycle_depth = min(frame.cycle_depth, depth)
+            return None
+
+        inferred = self._results.get(key)
+        if inferred is not None:
+            self.hits += 1
+            replay_log(inferred.log_records, logger)
+            self._depends_on(inferred.modules, modules)
+            return inferred.return_type
+
+        self.misses += 1
+        frame = _Frame(len(self._stack), modules=function_modules(function))
+        self._in_progress[key] = frame.depth
+        self._stack.append(frame)
+        records = BufferedLogger()
+        try:
+            definition = (
+                None if engine == "bytecode" else self._definition(function, key[0])
+            )
+            if definition is not None:
+                return_type = _infer_from_definition(
+                    function, definition, records, can_eval, engine, max_literal_union
+                )
+            elif engine != "ast":
+                return_type = infer_return_type_from_bytecode(
+                    function, records, can_eval, max_literal_union
+                )
+            else:
+                return_type = None
+        finally:
+            self._stack.pop()
+            del self._in_progress[key]
+            replay_log(records.records, logger)
+
+        if self._stack:
+            parent = self._stack[-1]
+            parent.cycle_depth = min(parent.cycle_depth, frame.cycle_depth)
+        self._depends_on(frame.modules, modules)
+        if frame.cycle_depth >= frame.depth:
+            self._results[key] = _Inferred(
+                return_type, records.records, function, frozenset(frame.modules)
             )
-            if common is not None:
-                result[i] = result[i+j] = common
-                i = 0
-                j = 0
-        j += 1
-        if i + j >= len(result):
-            j = 1
-            i += 1
+        return return_type
 
-    return list(set(result))
 
-def infer_return_type(
-    function: typing.Callable, logger: "Logger", can_eval: bool
-) -> typing.Any:
+_active_inference_cache: contextvars.ContextVar[InferenceCache | None] = (
+    contextvars.ContextVar("typesync_active_inference_cache", default=None)
+)
+
+
+def index_functions(tree: ast.Module) -> dict[tuple[int, str], ast.FunctionDef]:
+    """The functions defined in `tree`, by the first line of their code object (that
+    of their first decorator, if any) and their name."""
+    return {
+        (
+            min([node.lineno, *(d.lineno for d in node.decorator_list)]),
+            node.name,
+        ): node
+        for node in ast.walk(tree)
+        if isinstance(node, ast.FunctionDef)
+    }
+
+
+def _index_file(filename: str) -> dict[tuple[int, str], ast.FunctionDef] | None:
+    # The same source `inspect.getsource` would see
+    linecache.checkcache(filename)
+    lines = linecache.getlines(filename)
+    if not lines:
+        return None
+    try:
+        return index_functions(ast.parse("".join(lines), filename))
+    except (SyntaxError, ValueError):
+        return {}
+
+
+def parse_function(function: typing.Callable) -> ast.FunctionDef | None:
+    """The definition of `function` in its source code, if it can be found."""
     try:
         source = inspect.getsource(function)
     except (TypeError, OSError):
@@ -319,16 +591,62 @@ def infer_return_type(
     body = statements[0]
     if not isinstance(body, ast.FunctionDef):
         return None
+    return body
+
 
-    visitor = ASTVisitor(function, logger, can_eval=can_eval)
+def infer_return_type(
+    function: typing.Callable,
+    logger: "Logger",
+    can_eval: bool,
+    engine: InferenceEngine = "ast",
+    max_literal_union: int = MAX_LITERAL_UNION,
+    modules: set[str] | None = None,
+) -> typing.Any:
+    """Infer the return type of `function` from its code.
+
+    The modules of `function` and of every function looked into along the way
+    (see `function_modules`) are added to `modules`, if given.
+    """
+    cache = _active_inference_cache.get()
+    if cache is None:
+        # Still needed to stop cycles between the functions this one calls
+        with InferenceCache() as cache:
+            return cache.infer(
+                function, logger, can_eval, engine, max_literal_union, modules
+            )
+    return cache.infer(function, logger, can_eval, engine, max_literal_union, modules)
+
+
+def _infer_from_definition(
+    function: typing.Callable,
+    body: ast.FunctionDef,
+    logger: "Logger",
+    can_eval: bool,
+    engine: InferenceEngine,
+    max_literal_union: int,
+) -> typing.Any:
+    visitor = ASTVisitor(
+        function,
+        logger,
+        can_eval=can_eval,
+        engine=engine,
+        max_literal_union=max_literal_union,
+    )
     define_types_from_closure(function, visitor)
     define_types_from_signature(function, visitor)
     visitor.visit(body)
-    if len(visitor.returns) == 0:
+    return return_type_from_values(visitor.returns, max_literal_union)
+
+
+def return_type_from_values(
+    returns: list, max_literal_union: int = MAX_LITERAL_UNION
+) -> typing.Any:
+    """The return type of a function returning values of the types in `returns`."""
+    if len(returns) == 0:
         return type(None)
 
-    possible_return_types = flatten_unions(visitor.returns)
-    coalesced_return_types = coalesce_types(possible_return_types)
+    possible_return_types = flatten_unions(returns)
+    coalesced_return_types = coalesce_types(possible_return_types, max_literal_union)
 
     if len(coalesced_return_types) == 1:
         return coalesced_return_types[0]
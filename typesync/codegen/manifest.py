@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sys
+import typing
+
+from .dependencies import is_library_file, module_file
+from .output import replace_if_changed
+from .writer import RenderedRoute
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Collection, Iterable, Mapping, Sequence
+
+    from flask import Flask
+    from werkzeug.routing.rules import Rule
+
+
+# Bump when the format of the manifest changes
+MANIFEST_VERSION = 2
+
+
+class RouteFragment(typing.TypedDict):
+    """Where the code of a route is in the generated files."""
+
+    rule: str
+    methods: list[str]
+    # Character offsets of the route's code in the types and APIs files
+    types: tuple[int, int]
+    apis: tuple[int, int]
+    function_names: list[str]
+
+
+class Fragments(typing.TypedDict):
+    # Identifies the options and code used to write the routes, which must match
+    # for them to be reused
+    fingerprint: str
+    # Digests of the generated types and APIs files the offsets refer to
+    types_digest: str
+    apis_digest: str
+    routes: dict[str, RouteFragment]
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def project_files(source_files: "Iterable[str] | None") -> list[str] | None:
+    """`source_files` without those of the standard library and installed
+    packages."""
+    if source_files is None:
+        return None
+    return [path for path in source_files if not is_library_file(path)]
+
+
+def build_manifest(
+    app: "Flask",
+    route_files: "Mapping[str, Sequence[str] | None]",
+    fragments: Fragments | None = None,
+) -> dict[str, typing.Any]:
+    """Describe which of the project's source files the generated code depends on.
+
+    `route_files` maps each endpoint to the project files its view function,
+    converters and types are defined in (or to `None` if they couldn't be
+    determined), and `files` lists all of them along with the `app`'s own module.
+    The `fragments` index, if any, is kept along with them for incremental runs.
+    """
+    app_module = sys.modules.get(app.import_name)
+    app_file = None if app_module is None else module_file(app_module)
+
+    files = {path for paths in route_files.values() for path in paths or ()}
+    if app_file is not None:
+        files.add(app_file)
+    manifest: dict[str, typing.Any] = {
+        "version": MANIFEST_VERSION,
+        "app": app_file,
+        "routes": {
+            endpoint: None if paths is None else list(paths)
+            for endpoint, paths in route_files.items()
+        },
+        "files": sorted(files),
+    }
+    if fragments is not None:
+        manifest["fragments"] = fragments
+    return manifest
+
+
+def load_manifest(path: str) -> dict[str, typing.Any] | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(path: str, manifest: dict[str, typing.Any]) -> bool:
+    """Write `manifest` to `path` unless it is unchanged, returning whether it was."""
+    return replace_if_changed(path, json.dumps(manifest, indent=2) + "\n")
+
+
+def _read_output(path: str, digest: str) -> str | None:
+    try:
+        # Offsets were computed on the text as written, newlines included
+        with open(path, encoding="utf-8", newline="") as f:
+            text = f.read()
+    except OSError:
+        return None
+    return text if text_digest(text) == digest else None
+
+
+def reusable_routes(
+    manifest: dict[str, typing.Any] | None,
+    rules: "Iterable[Rule]",
+    changed_files: "Collection[str]",
+    fingerprint: str,
+    types_path: str,
+    apis_path: str,
+) -> dict[str, RenderedRoute]:
+    """The code of the routes of the previous run that don't depend on any of
+    `changed_files`, by endpoint.
+
+    Nothing is reused if the generated files were modified since the previous run,
+    if the app's own module changed, or if the previous run used different options
+    (`fingerprint`).
+    """
+    if manifest is None or manifest["app"] is None:
+        return {}
+    fragments: Fragments | None = manifest.get("fragments")
+    if fragments is None or fragments["fingerprint"] != fingerprint:
+        return {}
+    changed = {os.path.abspath(path) for path in changed_files}
+    if manifest["app"] in changed:
+        return {}
+
+    types_text = _read_output(types_path, fragments["types_digest"])
+    apis_text = _read_output(apis_path, fragments["apis_digest"])
+    if types_text is None or apis_text is None:
+        return {}
+
+    reused: dict[str, RenderedRoute] = {}
+    for rule in rules:
+        fragment = fragments["routes"].get(rule.endpoint)
+        files = manifest["routes"].get(rule.endpoint)
+        if (
+            fragment is None
+            or files is None
+            or not changed.isdisjoint(files)
+            or fragment["rule"] != rule.rule
+            or fragment["methods"] != sorted(rule.methods or ())
+        ):
+            continue
+        types_start, types_end = fragment["types"]
+        apis_start, apis_end = fragment["apis"]
+        reused[rule.endpoint] = RenderedRoute(
+            types_text[types_start:types_end],
+            apis_text[apis_start:apis_end],
+            tuple(fragment["function_names"]),
+        )
+    return reused
@@ -0,0 +1,46 @@
+import hashlib
+import os
+import tempfile
+
+
+def _default_mode() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def file_digest(path: str) -> str | None:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def replace_if_changed(path: str, content: str) -> bool:
+    """Write `content` to `path` unless the file already contains it.
+
+    The file is replaced atomically, so watchers never see it partially written.
+    Returns whether the file was written.
+    """
+    data = content.encode()
+    if file_digest(path) == hashlib.sha256(data).hexdigest():
+        return False
+
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = _default_mode()
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}."
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
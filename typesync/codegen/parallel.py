@@ -0,0 +1,273 @@
+import dataclasses
+import math
+import multiprocessing
+import typing
+
+from .cache import used_declarations
+from .extractor import BufferedLogger, ExtractedRoute, Logger, replay_log
+from typesync.ts_types import TSDeclaration, iter_references, rekey_references
+
+if typing.TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Generator,
+        Mapping,
+        MutableMapping,
+        Sequence,
+    )
+
+    from werkzeug.routing.rules import Rule
+
+    from .cache import ExtractionCache
+    from .extractor import RouteTypeExtractor
+
+
+type ExtractorFactory = Callable[[Rule, Logger], RouteTypeExtractor]
+type LogRecords = list[tuple[str, str]]
+type Extracted = tuple[ExtractedRoute, LogRecords, dict[str, TSDeclaration]]
+
+# Inherited by the forked workers, so neither the rules nor the factory (which
+# usually closes over the app) have to be pickled
+_shard_state: "tuple[Sequence[Rule], ExtractorFactory] | None" = None
+
+
+def _extract(rule: "Rule", make_extractor: ExtractorFactory) -> Extracted:
+    logger = BufferedLogger()
+    extractor = make_extractor(rule, logger)
+    route = extractor.extract()
+    declarations = (
+        {}
+        if extractor.registry.declarations is None
+        else used_declarations(route, extractor.registry.declarations)
+    )
+    return route, logger.records, declarations
+
+
+def _extract_shard(shard: range) -> list[Extracted]:
+    assert _shard_state is not None  # noqa: S101
+    rules, make_extractor = _shard_state
+    return [_extract(rules[i], make_extractor) for i in shard]
+
+
+def _extract_serially(
+    rules: "Sequence[Rule]", make_extractor: ExtractorFactory
+) -> "Generator[Extracted]":
+    for rule in rules:
+        yield _extract(rule, make_extractor)
+
+
+def _extract_in_parallel(
+    rules: "Sequence[Rule]", make_extractor: ExtractorFactory, jobs: int
+) -> "Generator[Extracted]":
+    global _shard_state  # noqa: PLW0603
+
+    # Several small shards per worker, so that a few slow routes don't leave the
+    # other workers idle
+    shard_size = max(1, math.ceil(len(rules) / (jobs * 4)))
+    shards = [
+        range(start, min(start + shard_size, len(rules)))
+        for start in range(0, len(rules), shard_size)
+    ]
+
+    _shard_state = (rules, make_extractor)
+    try:
+        with multiprocessing.get_context("fork").Pool(jobs) as pool:
+            for extracted in pool.imap(_extract_shard, shards):
+                yield from extracted
+    finally:
+        _shard_state = None
+
+
+def extract_routes(
+    rules: "Sequence[Rule]",
+    make_extractor: ExtractorFactory,
+    jobs: int,
+    logger: Logger,
+    declarations: "MutableMapping[str, TSDeclaration] | None" = None,
+    cache: "ExtractionCache | None" = None,
+) -> "Generator[ExtractedRoute]":
+    """Extract the types of `rules`, using `jobs` forked worker processes.
+
+    Routes are yielded in the same order as `rules`, and the messages logged while
+    extracting each of them are replayed to `logger` right before it is yielded, so
+    the result is the same as extracting them one by one. Declarations hoisted by
+    the workers are merged into `declarations`.
+
+    With a `cache`, routes that haven't changed since the last run are loaded from
+    it instead, and only the remaining ones are extracted.
+    """
+    entries = [None if cache is None else cache.load(rule) for rule in rules]
+    pending = [
+        rule for rule, entry in zip(rules, entries, strict=True) if entry is None
+    ]
+
+    if jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("--jobs requires 'fork' support, extracting serially")
+        jobs = 1
+    extracted = (
+        _extract_in_parallel(pending, make_extractor, jobs)
+        if jobs > 1 and len(pending) > 1
+        else _extract_serially(pending, make_extractor)
+    )
+
+    try:
+        for rule, entry in zip(rules, entries, strict=True):
+            if entry is not None:
+                route, records, new_declarations = (
+                    entry.route,
+                    entry.log_records,
+                    entry.declarations,
+                )
+            else:
+                route, records, new_declarations = next(extracted)
+
+            if declarations is not None:
+                keys = merge_declarations(declarations, new_declarations)
+                if keys:
+                    route = _rekey_route(route, keys)
+            if entry is None and cache is not None:
+                cache.store(rule, route, records, declarations)
+            replay_log(records, logger)
+            yield route
+    finally:
+        extracted.close()
+
+
+def merge_declarations(
+    declarations: "MutableMapping[str, TSDeclaration]",
+    new_declarations: "Mapping[str, TSDeclaration]",
+) -> dict[str, str]:
+    """Merge `new_declarations` into `declarations`.
+
+    Routes extracted by different processes (or in earlier runs, when they're
+    cached) can use the same key for different types, e.g. two types sharing a
+    qualified name, which were keyed in a different order. Such declarations are
+    merged under another key, and the keys that changed are returned.
+    """
+    # Declarations that clash with another under the same key, and those referring
+    # to them, which refer to another type under the same key
+    clashing = {
+        key
+        for key, declaration in new_declarations.items()
+        if declarations.get(key, declaration) != declaration
+    }
+    changed = True
+    while changed:
+        changed = False
+        for key, declaration in new_declarations.items():
+            if (
+                key not in clashing
+                and key in declarations
+                and any(
+                    reference.key in clashing
+                    for reference in iter_references(declaration.definition)
+                )
+            ):
+                clashing.add(key)
+                changed = True
+
+    # The existing declarations each clashing one is the same as: those sharing its
+    # base key and its definition, where the references to clashing declarations
+    # must match too. Pairs whose references don't match are dropped until none are
+    # left, so that nested declarations are matched all together
+    matches = {
+        key: {
+            other
+            for other, declaration in declarations.items()
+            if _base_key(other) == _base_key(key)
+            and _same_shape(new_declarations[key], declaration)
+        }
+        for key in clashing
+    }
+    changed = True
+    while changed:
+        changed = False
+        for key, others in matches.items():
+            for other in list(others):
+                if not _references_match(
+                    new_declarations[key], declarations[other], matches
+                ):
+                    others.remove(other)
+                    changed = True
+
+    # Declarations are merged into the first existing one they match, or under the
+    # first free key otherwise
+    keys: dict[str, str] = {}
+    used = set(declarations) | (new_declarations.keys() - clashing)
+    for key in new_declarations:
+        if key not in clashing:
+            continue
+        if matches[key]:
+            keys[key] = min(matches[key], key=_key_index)
+            continue
+        base_key = _base_key(key)
+        new_key = base_key
+        i = 2
+        while new_key in used:
+            new_key = f"{base_key}#{i}"
+            i += 1
+        keys[key] = new_key
+        used.add(new_key)
+
+    for key, declaration in new_declarations.items():
+        new_key = keys.get(key, key)
+        declarations.setdefault(new_key, _rekey_declaration(declaration, new_key, keys))
+    return {key: new_key for key, new_key in keys.items() if new_key != key}
+
+
+def _base_key(key: str) -> str:
+    return key.partition("#")[0]
+
+
+def _key_index(key: str) -> int:
+    return int(key.partition("#")[2] or 1)
+
+
+def _same_shape(declaration: TSDeclaration, other: TSDeclaration) -> bool:
+    """Whether the declarations are the same, regardless of the keys they refer
+    to."""
+    return _rekey_declaration(declaration, "", _blank(declaration)) == (
+        _rekey_declaration(other, "", _blank(other))
+    )
+
+
+def _blank(declaration: TSDeclaration) -> dict[str, str]:
+    return {reference.key: "" for reference in iter_references(declaration.definition)}
+
+
+def _references_match(
+    declaration: TSDeclaration,
+    other: TSDeclaration,
+    matches: "Mapping[str, set[str]]",
+) -> bool:
+    return all(
+        other_reference.key in matches[reference.key]
+        if reference.key in matches
+        else other_reference.key == reference.key
+        for reference, other_reference in zip(
+            iter_references(declaration.definition),
+            iter_references(other.definition),
+            strict=True,
+        )
+    )
+
+
+def _rekey_declaration(
+    declaration: TSDeclaration, key: str, keys: "Mapping[str, str]"
+) -> TSDeclaration:
+    return declaration._replace(
+        key=key, definition=rekey_references(declaration.definition, keys)
+    )
+
+
+def _rekey_route(route: ExtractedRoute, keys: "Mapping[str, str]") -> ExtractedRoute:
+    return dataclasses.replace(
+        route,
+        **{
+            field: {
+                method: type_ if type_ is None else rekey_references(type_, keys)
+                for method, type_ in getattr(route, field).items()
+            }
+            for field in ("return_types", "args_types", "json_body_types")
+        },
+    )
@@ -2,12 +2,71 @@ import typing
 
 import inflection
 
-from typesync.ts_types import TSType, TSSimpleType
+from .extractor import rule_name
+from typesync.ts_types import (
+    TSDeclaration,
+    TSType,
+    TSSimpleType,
+    declaration_names,
+    is_undefined,
+    iter_references,
+)
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
     from io import TextIOBase
+
+    from werkzeug.routing.rules import Rule
+
     from typesync.misc import HTTPMethod
-    from .extractor import RouteTypeExtractor
+    from .extractor import ExtractedRoute, RouteTypeExtractor
+
+
+type Parser = RouteTypeExtractor | ExtractedRoute
+
+# TypeScript globals that the generated code (or translated types) may refer to,
+# which declarations must not shadow
+_GLOBAL_NAMES = frozenset(
+    (
+        "Array",
+        "ArrayBuffer",
+        "Awaited",
+        "BigInt",
+        "Blob",
+        "Boolean",
+        "Date",
+        "Error",
+        "Exclude",
+        "Extract",
+        "File",
+        "FormData",
+        "Function",
+        "Map",
+        "NonNullable",
+        "Number",
+        "Object",
+        "Omit",
+        "Parameters",
+        "Partial",
+        "Pick",
+        "Promise",
+        "Readonly",
+        "Record",
+        "Required",
+        "ReturnType",
+        "Set",
+        "String",
+        "Symbol",
+    )
+)
+
+
+class RenderedRoute(typing.NamedTuple):
+    """The code of a route written by a previous run, which is copied as is."""
+
+    types: str
+    apis: str
+    function_names: tuple[str, ...]
 
 
 def make_rule_name_map(rule_name: str, prefix: str = "") -> dict[str, str]:
@@ -38,6 +97,8 @@ class CodeWriter:
         function_name_format: str,
         endpoint: str = "",
         stop_on_error: bool = False,
+        declarations: "Mapping[str, TSDeclaration] | None" = None,
+        rules: "Iterable[Rule]" = (),
     ) -> None:
         self.types_file = types_file
         self.api_file = api_file
@@ -47,6 +108,26 @@ class CodeWriter:
         self.function_name_format = function_name_format
         self.endpoint = endpoint
         self.stop_on_error = stop_on_error
+        # Hoisted declarations are written right before the first route that
+        # uses them. Names are only assigned then, so they don't depend on the
+        # order in which the types were translated.
+        self.declarations: Mapping[str, TSDeclaration] = (
+            {} if declarations is None else declarations
+        )
+        self._declaration_names: dict[str, str] = {}
+        # The names of the header, the types of the routes in `rules` (which are
+        # known before they're written) and TypeScript's are taken
+        self._used_names: set[str] = {
+            *_GLOBAL_NAMES,
+            "RequestArgs",
+            "RequestOptions",
+            "RequestFunction",
+        }
+        for rule in rules:
+            for method in rule.methods or ():
+                self._used_names.update(self._route_type_names(rule_name(rule), method))
+        # Names of the API functions written so far, in order
+        self.function_names: list[str] = []
 
     def _api_function_name(self, rule_name: str, method: str) -> str:
         return self.function_name_format.format_map(
@@ -63,6 +144,14 @@ class CodeWriter:
             {**make_rule_name_map(rule_name, "r_"), **make_rule_name_map(method, "m_")}
         )
 
+    def _route_type_names(self, rule_name: str, method: str) -> tuple[str, ...]:
+        return (
+            self._return_type_name(rule_name, method),
+            self._params_type_name(rule_name, method),
+            f"_{rule_name}{method}Args",
+            f"_{rule_name}{method}Body",
+        )
+
     def _bundle_types_per_method(
         self,
         return_types: dict["HTTPMethod", TSType],
@@ -79,12 +168,22 @@ class CodeWriter:
             for method in sorted(methods)
         }
 
-    def write(self, parsers: typing.Iterable["RouteTypeExtractor"]) -> bool:
+    def write(self, parsers: typing.Iterable[Parser | RenderedRoute]) -> bool:
+        with declaration_names(self._declaration_names):
+            return self._write(parsers)
+
+    def _write(self, parsers: typing.Iterable[Parser | RenderedRoute]) -> bool:
         error = False
         self._write_types_header()
         self._write_api_header()
-        names: list[str] = []
+        names = self.function_names
         for parser in parsers:
+            if isinstance(parser, RenderedRoute):
+                self.types_file.write(parser.types)
+                self.api_file.write(parser.apis)
+                names.extend(parser.function_names)
+                continue
+
             return_types = parser.parse_return_types()
             args_types = parser.parse_args_types()
             json_body_types = parser.parse_json_body()
@@ -92,6 +191,12 @@ class CodeWriter:
             types_per_method = self._bundle_types_per_method(
                 return_types, args_types, json_body_types
             )
+            if self.declarations:
+                for method in types_per_method:
+                    self._used_names.update(
+                        self._route_type_names(parser.rule_name, method)
+                    )
+                self._write_declarations(types_per_method)
 
             for (
                 method,
@@ -134,6 +239,51 @@ class CodeWriter:
             "\n\n"
         )
 
+    def _declaration_name(self, name: str) -> str:
+        unique_name = name
+        i = 2
+        while unique_name in self._used_names:
+            unique_name = f"{name}{i}"
+            i += 1
+        self._used_names.add(unique_name)
+        return unique_name
+
+    def _write_declarations(
+        self, types_per_method: dict["HTTPMethod", TypesDict]
+    ) -> None:
+        # Name every declaration reachable from this route (in the order they're
+        # referenced) before writing any of them, since they may refer to each other
+        stack = [
+            reference.key
+            for types in reversed(types_per_method.values())
+            for type_ in reversed(types.values())
+            if type_ is not None
+            for reference in reversed(list(iter_references(type_)))
+        ]
+        new_declarations: list[TSDeclaration] = []
+        while stack:
+            key = stack.pop()
+            if key in self._declaration_names:
+                continue
+            declaration = self.declarations[key]
+            self._declaration_names[key] = self._declaration_name(declaration.name)
+            new_declarations.append(declaration)
+            stack.extend(
+                reference.key
+                for reference in reversed(list(iter_references(declaration.definition)))
+            )
+
+        for declaration in new_declarations:
+            self._write_declaration(declaration)
+
+    def _write_declaration(self, declaration: TSDeclaration) -> None:
+        name = self._declaration_names[declaration.key]
+        if len(declaration.params) > 0:
+            name += f"<{', '.join(declaration.params)}>"
+        self.types_file.write(f"export type {name} = ")
+        declaration.definition.emit(self.types_file, name)
+        self.types_file.write(";\n\n")
+
     def _write_api_header(self) -> None:
         self.api_file.write(f'import * as types from "./{self.types_file_name}";\n\n')
         self.api_file.write(
@@ -187,33 +337,31 @@ class CodeWriter:
         types_per_method: dict["HTTPMethod", TypesDict],
     ) -> typing.Generator[tuple[str, str, str, bool, bool], None, None]:
         for method, types in types_per_method.items():
-            return_type_name = self._return_type_name(rule_name, method)
-            generated_return_type = types["return_type"].generate(return_type_name)
-            self.types_file.write(
-                f"export type {return_type_name} = {generated_return_type};\n"
-            )
-            params_type_name = self._params_type_name(rule_name, method)
-            optional_args = "?" if types["args_type"] == "undefined" else ""
+            (
+                return_type_name,
+                params_type_name,
+                internal_args_name,
+                internal_body_name,
+            ) = self._route_type_names(rule_name, method)
+            self.types_file.write(f"export type {return_type_name} = ")
+            types["return_type"].emit(self.types_file, return_type_name)
+            self.types_file.write(";\n")
+            optional_args = "?" if is_undefined(types["args_type"]) else ""
             json_body_type = types["json_body_type"]
             optional_body = (
-                "?" if json_body_type is None or json_body_type == "undefined" else ""
+                "?" if json_body_type is None or is_undefined(json_body_type) else ""
             )
 
-            internal_args_name = f"_{rule_name}{method}Args"
-            generated_args_type = types["args_type"].generate(internal_args_name)
-            self.types_file.write(
-                f"type {internal_args_name} = {generated_args_type};\n"
-            )
+            self.types_file.write(f"type {internal_args_name} = ")
+            types["args_type"].emit(self.types_file, internal_args_name)
+            self.types_file.write(";\n")
 
-            internal_body_name = f"_{rule_name}{method}Body"
-            string_json_body_type = (
-                "undefined"
-                if types["json_body_type"] is None
-                else types["json_body_type"].generate(internal_body_name)
-            )
-            self.types_file.write(
-                f"type {internal_body_name} = {string_json_body_type};\n"
-            )
+            self.types_file.write(f"type {internal_body_name} = ")
+            if json_body_type is None:
+                self.types_file.write("undefined")
+            else:
+                json_body_type.emit(self.types_file, internal_body_name)
+            self.types_file.write(";\n")
 
             self.types_file.write(
                 f"export interface {params_type_name} extends RequestArgs" + " {\n"
@@ -0,0 +1,241 @@
+import contextlib
+import importlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import types
+import typing
+
+from .codegen.dependencies import is_library_file
+from .codegen.extractor import BufferedLogger
+from .codegen.generator import CodeGenerator, GenerationCancelledError
+from .type_translators.type_node import clear_type_node_cache
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+
+    from flask import Flask
+
+
+def is_project_file(path: str, root: str) -> bool:
+    """Whether `path` belongs to the project in `root`, rather than to a library
+    (which may live in a virtual environment inside `root`)."""
+    path = os.path.abspath(path)
+    root = os.path.abspath(root) + os.sep
+    return path.startswith(root) and not is_library_file(path)
+
+
+def _refers_to(module: types.ModuleType, names: set[str]) -> bool:
+    for value in list(vars(module).values()):
+        try:
+            name = (
+                value.__name__
+                if isinstance(value, types.ModuleType)
+                else getattr(value, "__module__", None)
+            )
+        except Exception:
+            # e.g. context-bound proxies such as `flask.request`
+            name = None
+        if name in names:
+            return True
+    return False
+
+
+def stale_modules(
+    changed_files: "Iterable[str]",
+    root: str,
+    modules: "Mapping[str, types.ModuleType] | None" = None,
+) -> set[str]:
+    """The project modules that have to be imported again after `changed_files`
+    were modified.
+
+    These are the modules defined in those files, and the modules that import
+    anything from a stale module (recursively).
+    """
+    modules = sys.modules if modules is None else modules
+    changed = {os.path.abspath(path) for path in changed_files}
+    project_modules = {
+        name: module
+        for name, module in list(modules.items())
+        if isinstance(getattr(module, "__file__", None), str)
+        and is_project_file(module.__file__, root)  # type: ignore[arg-type]
+    }
+    stale = {
+        name
+        for name, module in project_modules.items()
+        if os.path.abspath(module.__file__) in changed  # type: ignore[arg-type]
+    }
+
+    while True:
+        dependents = {
+            name
+            for name, module in project_modules.items()
+            if name not in stale and _refers_to(module, stale)
+        }
+        if not dependents:
+            return stale
+        stale |= dependents
+
+
+class Daemon:
+    """Generates code on request, keeping the app loaded between requests.
+
+    Requests and responses are JSON objects, one per line. A request looks like
+    `{"id": 1, "command": "generate", "changed": ["/path/to/views.py"]}`; modules
+    defined in the `changed` files (and the app itself) are imported again, and only
+    the routes depending on those files are generated again. The response has the
+    same `id`, along with `ok`, the `updated` output files, the logged `messages` and
+    the `duration_ms` of the request.
+
+    `{"command": "cancel"}` stops the request being handled (if any), which is then
+    answered with `"cancelled": true`. `{"command": "shutdown"}` stops the daemon.
+    """
+
+    def __init__(
+        self,
+        generator: CodeGenerator,
+        app: "Flask",
+        load_app: "Callable[[], Flask]",
+        root: str,
+        stdin: typing.TextIO,
+        stdout: typing.TextIO,
+    ) -> None:
+        self.generator = generator
+        self.app: Flask | None = app
+        self.load_app = load_app
+        self.root = root
+        self.stdin = stdin
+        self.stdout = stdout
+        self._send_lock = threading.Lock()
+        # Requests are numbered in the order they are received; a cancellation
+        # applies to every request received before it
+        self._received = 0
+        self._cancelled_until = 0
+
+    def _send(self, message: dict[str, typing.Any]) -> None:
+        with self._send_lock:
+            self.stdout.write(json.dumps(message) + "\n")
+            self.stdout.flush()
+
+    def _read_requests(
+        self, requests: "queue.Queue[tuple[int, dict[str, typing.Any]] | None]"
+    ) -> None:
+        # Runs in its own thread, so that cancellations are seen while generating
+        for line in self.stdin:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                self._send({"id": None, "ok": False, "error": f"invalid request ({e})"})
+                continue
+            if request.get("command") == "cancel":
+                self._cancelled_until = self._received
+                self._send({"id": request.get("id"), "ok": True})
+                continue
+            self._received += 1
+            requests.put((self._received, request))
+            if request.get("command") == "shutdown":
+                return
+        requests.put(None)
+
+    def serve(self) -> None:
+        requests: queue.Queue[tuple[int, dict[str, typing.Any]] | None] = queue.Queue()
+        threading.Thread(
+            target=self._read_requests, args=(requests,), daemon=True
+        ).start()
+        self._send({"event": "ready"})
+        while (received := requests.get()) is not None:
+            number, request = received
+            if request.get("command") == "shutdown":
+                self._send({"id": request.get("id"), "ok": True})
+                return
+            self._send(
+                self.handle(
+                    request,
+                    cancelled=lambda number=number: self._cancelled_until >= number,
+                )
+            )
+
+    def handle(
+        self,
+        request: dict[str, typing.Any],
+        cancelled: "Callable[[], bool] | None" = None,
+    ) -> dict[str, typing.Any]:
+        request_id = request.get("id")
+        command = request.get("command")
+        if command != "generate":
+            return {
+                "id": request_id,
+                "ok": False,
+                "error": f"unknown command {command!r}",
+            }
+
+        start = time.perf_counter()
+        logger = BufferedLogger()
+        # stdout is reserved for responses, anything the app prints goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                changed = request.get("changed") or ()
+                app = self._reload(changed)
+                with app.app_context():
+                    result = self.generator.run(
+                        app,
+                        logger,
+                        cancelled=cancelled,
+                        # Without changes, this is a full run (e.g. when the plugin
+                        # starts), which may still reuse routes from memory
+                        changed_files=changed or None,
+                    )
+            except GenerationCancelledError:
+                return {
+                    "id": request_id,
+                    "ok": False,
+                    "cancelled": True,
+                    "messages": self._messages(logger),
+                    "duration_ms": self._elapsed_ms(start),
+                }
+            except Exception as e:
+                return {
+                    "id": request_id,
+                    "ok": False,
+                    "error": f"{type(e).__name__}: {e}",
+                    "messages": self._messages(logger),
+                }
+
+        return {
+            "id": request_id,
+            "ok": result.ok,
+            "updated": result.updated,
+            "messages": self._messages(logger),
+            "duration_ms": self._elapsed_ms(start),
+        }
+
+    @staticmethod
+    def _elapsed_ms(start: float) -> float:
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    @staticmethod
+    def _messages(logger: BufferedLogger) -> list[dict[str, str]]:
+        return [{"level": level, "text": text} for level, text in logger.records]
+
+    def _reload(self, changed_files: "Iterable[str]") -> "Flask":
+        stale = stale_modules(changed_files, self.root)
+        if self.app is not None and not stale:
+            return self.app
+
+        if self.app is not None:
+            # Views are registered on the app, so it has to be created again too
+            stale.add(self.app.import_name)
+        for name in stale:
+            sys.modules.pop(name, None)
+        importlib.invalidate_caches()
+        # Nodes of the old types would otherwise be kept alive forever
+        clear_type_node_cache()
+
+        self.app = None
+        self.app = self.load_app()
+        return self.app
@@ -0,0 +1,218 @@
+import contextlib
+import contextvars
+import dataclasses
+import sys
+import time
+import typing
+
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+# Phases of a run, in the order they happen for each route
+PHASES = ("extract", "type_node", "inference", "translate", "write")
+
+
+@dataclasses.dataclass
+class Timing:
+    calls: int = 0
+    seconds: float = 0.0
+    # Net number of memory blocks allocated (see `sys.getallocatedblocks`)
+    blocks: int = 0
+
+    def add(self, seconds: float, blocks: int) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.blocks += blocks
+
+
+@dataclasses.dataclass
+class _Frame:
+    phase: str
+    method: str
+    start: float
+    start_blocks: int
+    child_seconds: float = 0.0
+    child_blocks: int = 0
+
+
+_active_profiler: contextvars.ContextVar["Profiler | None"] = contextvars.ContextVar(
+    "typesync_active_profiler", default=None
+)
+
+
+class Profiler:
+    """Wall time and allocations spent in each phase of a run, and for each route.
+
+    Phases may be nested (e.g. translating a type while inferring a return type),
+    in which case each of them is only charged for its own time. Like the
+    `GenerationCache`, the profiler only records anything while it is active
+    (`with Profiler():`).
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, Timing] = {phase: Timing() for phase in PHASES}
+        # Timings per endpoint, HTTP method ("" for the whole route) and phase
+        self.routes: dict[str, dict[str, dict[str, Timing]]] = {}
+        self._endpoint = ""
+        self._stack: list[_Frame] = []
+        self._token: contextvars.Token | None = None
+
+    def __enter__(self) -> "Profiler":
+        self._token = _active_profiler.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._token is not None:
+            _active_profiler.reset(self._token)
+            self._token = None
+
+    @contextlib.contextmanager
+    def route(self, endpoint: str) -> "Iterator[None]":
+        """Charge the phases run inside this block to `endpoint`."""
+        previous, self._endpoint = self._endpoint, endpoint
+        try:
+            yield
+        finally:
+            self._endpoint = previous
+
+    @contextlib.contextmanager
+    def phase(self, phase: str, method: str = "") -> "Iterator[None]":
+        frame = _Frame(phase, method, time.perf_counter(), sys.getallocatedblocks())
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            seconds = time.perf_counter() - frame.start
+            blocks = sys.getallocatedblocks() - frame.start_blocks
+            if self._stack:
+                self._stack[-1].child_seconds += seconds
+                self._stack[-1].child_blocks += blocks
+            self._record(
+                frame.phase,
+                frame.method or (self._stack[-1].method if self._stack else ""),
+                seconds - frame.child_seconds,
+                blocks - frame.child_blocks,
+            )
+
+    def _record(self, phase: str, method: str, seconds: float, blocks: int) -> None:
+        self.phases.setdefault(phase, Timing()).add(seconds, blocks)
+        if self._endpoint:
+            route = self.routes.setdefault(self._endpoint, {})
+            route.setdefault(method, {}).setdefault(phase, Timing()).add(
+                seconds, blocks
+            )
+
+    def route_total(self, endpoint: str) -> Timing:
+        total = Timing()
+        for phases in self.routes[endpoint].values():
+            for timing in phases.values():
+                total.calls += timing.calls
+                total.seconds += timing.seconds
+                total.blocks += timing.blocks
+        return total
+
+    def slowest_routes(self, n: int) -> list[str]:
+        return sorted(
+            self.routes, key=lambda endpoint: -self.route_total(endpoint).seconds
+        )[:n]
+
+    def to_json(self) -> dict[str, typing.Any]:
+        return {
+            "phases": {
+                phase: dataclasses.asdict(timing)
+                for phase, timing in self.phases.items()
+            },
+            "routes": {
+                endpoint: {
+                    "total": dataclasses.asdict(self.route_total(endpoint)),
+                    "methods": {
+                        method or "*": {
+                            phase: dataclasses.asdict(timing)
+                            for phase, timing in phases.items()
+                        }
+                        for method, phases in methods.items()
+                    },
+                }
+                for endpoint, methods in self.routes.items()
+            },
+        }
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+def format_report(profiler: Profiler, top: int) -> tuple[str, str]:
+    """Tables of the time spent in each phase, and of the `top` slowest routes."""
+    from prettytable import PrettyTable  # noqa: PLC0415
+
+    phases = PrettyTable(["Phase", "Calls", "Time (ms)", "%", "Blocks"])
+    total = sum(timing.seconds for timing in profiler.phases.values()) or 1.0
+    for phase, timing in profiler.phases.items():
+        phases.add_row(
+            [
+                phase,
+                timing.calls,
+                _ms(timing.seconds),
+                f"{timing.seconds / total * 100:.1f}",
+                timing.blocks,
+            ]
+        )
+
+    routes = PrettyTable(
+        ["Route", "Total (ms)", *PHASES, "Blocks", "Slowest method (ms)"]
+    )
+    for endpoint in profiler.slowest_routes(top):
+        methods = profiler.routes[endpoint]
+        method_seconds = {
+            method: sum(timing.seconds for timing in timings.values())
+            for method, timings in methods.items()
+            if method
+        }
+        slowest = max(method_seconds, key=method_seconds.__getitem__, default=None)
+        route_total = profiler.route_total(endpoint)
+        routes.add_row(
+            [
+                endpoint,
+                _ms(route_total.seconds),
+                *(
+                    _ms(
+                        sum(
+                            timings[phase].seconds
+                            for timings in methods.values()
+                            if phase in timings
+                        )
+                    )
+                    for phase in PHASES
+                ),
+                route_total.blocks,
+                "" if slowest is None else f"{slowest} {_ms(method_seconds[slowest])}",
+            ]
+        )
+
+    for table in (phases, routes):
+        table.align = "r"
+        table.align[table.field_names[0]] = "l"
+    return phases.get_string(), routes.get_string()
+
+
+def profile(phase: str, method: str = "") -> typing.ContextManager[None]:
+    """Record the time spent in this block under `phase`, if a profiler is active.
+
+    `method` is the HTTP method the block works on, if any; nested phases inherit
+    it.
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.phase(phase, method)
+
+
+def profile_route(endpoint: str) -> typing.ContextManager[None]:
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.route(endpoint)
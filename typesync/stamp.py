@@ -0,0 +1,109 @@
+"""Fingerprints of the files a run of `python -m typesync generate` depended on.
+
+This module is imported before deciding whether the app has to be loaded at all, so
+it must not import anything heavy (such as Flask).
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import typing
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+
+STAMP_FILE = ".typesync-stamp.json"
+# Bump when the format of the stamp changes
+STAMP_VERSION = 1
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _write_json(path: str, data: dict[str, typing.Any]) -> None:
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}."
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_stamp(out_dir: str, args: "Sequence[str]", files: "Iterable[str]") -> None:
+    """Record the state of `files` after a successful run with `args`."""
+    states: dict[str, list[typing.Any]] = {}
+    for path in sorted(set(files)):
+        st = os.stat(path)
+        states[path] = [st.st_mtime_ns, st.st_size, _file_digest(path)]
+    _write_json(
+        os.path.join(out_dir, STAMP_FILE),
+        {
+            "version": STAMP_VERSION,
+            "python": sys.version,
+            "cwd": os.getcwd(),
+            "args": list(args),
+            "files": states,
+        },
+    )
+
+
+def _check_stamp(path: str, args: "Sequence[str]") -> bool:
+    try:
+        with open(path, encoding="utf-8") as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if (
+        not isinstance(stamp, dict)
+        or stamp.get("version") != STAMP_VERSION
+        or stamp.get("python") != sys.version
+        or stamp.get("cwd") != os.getcwd()
+        or stamp.get("args") != list(args)
+    ):
+        return False
+
+    refreshed = False
+    for file, (mtime_ns, size, digest) in stamp["files"].items():
+        try:
+            st = os.stat(file)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns != mtime_ns:
+            # Touched (e.g. by a checkout or a formatter) but maybe not modified
+            if _file_digest(file) != digest:
+                return False
+            stamp["files"][file] = [st.st_mtime_ns, size, digest]
+            refreshed = True
+
+    if refreshed:
+        # So that the next check doesn't hash the file again
+        _write_json(path, stamp)
+    return True
+
+
+def is_up_to_date(args: "Sequence[str]") -> bool:
+    """Whether a previous run with the same `args` left a stamp whose files are all
+    unchanged.
+
+    The output directory isn't known without parsing `args`, so every argument
+    naming a directory that contains a stamp is tried; only the one written with
+    the same arguments can match.
+    """
+    for arg in args:
+        if arg.startswith("-"):
+            continue
+        path = os.path.join(arg, STAMP_FILE)
+        if os.path.isfile(path) and _check_stamp(path, args):
+            return True
+    return False
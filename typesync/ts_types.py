@@ -1,125 +1,486 @@
 __all__ = [
+    "GenerationCache",
+    "SupportsWrite",
     "TSArray",
+    "TSDeclaration",
     "TSObject",
     "TSRecord",
+    "TSReference",
     "TSSimpleType",
     "TSTuple",
     "TSType",
     "TSUnion",
+    "declaration_names",
     "is_signal",
+    "is_undefined",
+    "iter_references",
+    "rekey_references",
 ]
 
-from abc import ABC, abstractmethod
-from functools import cache
-from collections.abc import Sequence
+import contextlib
+import contextvars
+import io
+import typing
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping, Sequence
+
+
+class SupportsWrite(typing.Protocol):
+    def write(self, text: str, /) -> typing.Any: ...
+
+
+class _Tee:
+    """Forwards writes to `out` while keeping a copy of every fragment."""
+
+    def __init__(self, out: SupportsWrite) -> None:
+        self.out = out
+        self.fragments: list[str] = []
+
+    def write(self, text: str) -> None:
+        self.out.write(text)
+        self.fragments.append(text)
+
+
+class GenerationCache:
+    """A bounded LRU cache of generated TypeScript code.
+
+    The cache only takes effect while it is active (`with GenerationCache():`),
+    so that the types it keeps alive are released at the end of a run.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[TSType, str | None], str] = OrderedDict()
+        self._token: contextvars.Token | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> "GenerationCache":
+        self._token = _active_cache.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._token is not None:
+            _active_cache.reset(self._token)
+            self._token = None
+        self._entries.clear()
+
+    @staticmethod
+    def _cache_key(
+        type_: "TSType", type_name: str | None
+    ) -> tuple["TSType", str | None]:
+        # Most types don't refer to their own name, so they can share an entry
+        # regardless of the name they're generated under
+        return (type_, type_name if type_.uses_type_name else None)
+
+    def get(self, type_: "TSType", type_name: str | None = None) -> str | None:
+        key = self._cache_key(type_, type_name)
+        code = self._entries.get(key)
+        if code is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return code
+
+    def put(self, type_: "TSType", type_name: str | None, code: str) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[self._cache_key(type_, type_name)] = code
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def generate(self, type_: "TSType", type_name: str | None = None) -> str:
+        code = self.get(type_, type_name)
+        if code is None:
+            code = type_._generate(type_name)
+            self.put(type_, type_name, code)
+        return code
+
+    def emit(
+        self, type_: "TSType", out: SupportsWrite, type_name: str | None = None
+    ) -> None:
+        code = self.get(type_, type_name)
+        if code is not None:
+            out.write(code)
+            return
+        if self.maxsize <= 0:
+            type_._emit(out, type_name)
+            return
+        # Stream the output while keeping the fragments, so the whole type is
+        # joined exactly once instead of once per nesting level
+        tee = _Tee(out)
+        type_._emit(tee, type_name)
+        self.put(type_, type_name, "".join(tee.fragments))
+
+
+_active_cache: contextvars.ContextVar[GenerationCache | None] = contextvars.ContextVar(
+    "typesync_generation_cache", default=None
+)
 
 
-@cache
 def generate(type_: "TSType", type_name: str | None = None):
-    return type_._generate(type_name)
+    cache = _active_cache.get()
+    if cache is None:
+        return type_._generate(type_name)
+    return cache.generate(type_, type_name)
 
 
-class TSType(ABC):
+def emit(type_: "TSType", out: SupportsWrite, type_name: str | None = None) -> None:
+    cache = _active_cache.get()
+    if cache is None:
+        type_._emit(out, type_name)
+    else:
+        cache.emit(type_, out, type_name)
+
+
+class TSType:
+    """A TypeScript type.
+
+    Subclasses write their code with `_emit()`, which should pass the same `out`
+    to the `_emit()` of any nested types so the whole tree is written in one
+    depth-first pass. Subclasses that only implement `_generate()` are still
+    supported, but those implementing neither are abstract.
+    """
+
+    __slots__ = ("_hash", "_uses_type_name")
+
+    def __init_subclass__(cls, **kwargs: typing.Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # `_emit()` and `_generate()` are implemented in terms of each other, so
+        # one of them has to be overridden; otherwise, instantiating the class
+        # raises a TypeError, as it would for an abstract method
+        if cls._emit is TSType._emit and cls._generate is TSType._generate:
+            cls.__abstractmethods__ = _EMIT_METHODS
+
     def __str__(self):
         return self._generate()
 
     def __repr__(self):
         return f"<TSType {self.generate()}>"
 
+    def _key(self) -> tuple:
+        """The fields that identify this type, used for hashing and equality.
+
+        Subclasses should override this; the default falls back to comparing the
+        generated code.
+        """
+        return (self._generate(),)
+
+    def _children(self) -> Sequence["TSType"]:
+        return ()
+
+    def _finalize(self) -> None:
+        # Children have already been finalized, so this is O(fanout)
+        self._hash = hash((type(self), self._key()))
+        self._uses_type_name = any(child.uses_type_name for child in self._children())
+
+    @property
+    def uses_type_name(self) -> bool:
+        """Whether the generated code depends on the `type_name` argument."""
+        try:
+            return self._uses_type_name
+        except AttributeError:
+            return True
+
     def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, TSType):
+            return (
+                type(self) is type(other)
+                and hash(self) == hash(other)
+                and self._key() == other._key()
+            )
         if isinstance(other, str):
             return str(self) == other
-        if isinstance(other, TSType):
-            return str(self) == str(other)
         return False
 
     def __hash__(self):
-        return hash(str(self))
+        try:
+            return self._hash
+        except AttributeError:
+            # Subclasses defined elsewhere may not compute it on construction
+            self._hash = hash((type(self), self._key()))
+            return self._hash
+
+    def __getstate__(self) -> dict[str, typing.Any]:
+        # The hash depends on the process (string hashes are randomized), so it
+        # is recomputed when unpickling instead
+        state = dict(getattr(self, "__dict__", {}))
+        for cls in type(self).__mro__:
+            slots = getattr(cls, "__slots__", ())
+            for slot in (slots,) if isinstance(slots, str) else slots:
+                if slot != "_hash" and hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state: dict[str, typing.Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self._hash = hash((type(self), self._key()))
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        out.write(self._generate(type_name))
 
-    @abstractmethod
     def _generate(self, type_name: str | None = None) -> str:
-        raise NotImplementedError
+        buffer = io.StringIO()
+        self._emit(buffer, type_name)
+        return buffer.getvalue()
 
     def generate(self, type_name: str | None = None) -> str:
         return generate(self, type_name)
 
+    def emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        """Write the code for this type to `out` without building it in memory."""
+        emit(self, out, type_name)
+
+
+_EMIT_METHODS = frozenset({"_emit", "_generate"})
+TSType.__abstractmethods__ = _EMIT_METHODS
+
 
 class TSSimpleType(TSType):
+    __slots__ = ("type_",)
+
     def __init__(self, type_: str):
         self.type_ = type_
+        self._finalize()
 
-    def _generate(self, type_name: str | None = None) -> str:
-        if self.type_ == "...":
-            return "never"
-        return self.type_
+    def _key(self) -> tuple:
+        return (self.type_,)
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        out.write("never" if self.type_ == "..." else self.type_)
 
 
 class TSRecord(TSType):
+    __slots__ = ("key_type", "value_type")
+
     def __init__(self, key_type: TSType, value_type: TSType):
         self.key_type: TSType = key_type
         self.value_type: TSType = value_type
+        self._finalize()
 
-    def _generate(self, type_name: str | None = None) -> str:
-        return (
-            f"Record<{self.key_type.generate(type_name)}, "
-            f"{self.value_type.generate(type_name)}>"
-        )
+    def _key(self) -> tuple:
+        return (self.key_type, self.value_type)
+
+    def _children(self) -> Sequence[TSType]:
+        return (self.key_type, self.value_type)
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        out.write("Record<")
+        self.key_type._emit(out, type_name)
+        out.write(", ")
+        self.value_type._emit(out, type_name)
+        out.write(">")
 
 
 class TSObject(TSType):
+    __slots__ = ("keys", "required", "value_types")
+
     def __init__(
         self,
         keys: Sequence[str],
         value_types: Sequence[TSType],
         required: Sequence[bool] | None = None,
     ):
-        self.keys: Sequence[str] = keys
-        self.value_types: Sequence[TSType] = value_types
-        self.required: Sequence[bool] = required or [True for _ in self.keys]
+        self.keys: Sequence[str] = tuple(keys)
+        self.value_types: Sequence[TSType] = tuple(value_types)
+        self.required: Sequence[bool] = (
+            tuple(required) if required else tuple(True for _ in self.keys)
+        )
+        self._finalize()
 
-    def _generate(self, type_name: str | None = None) -> str:
-        string = ""
+    def _key(self) -> tuple:
+        return (self.keys, self.value_types, self.required)
+
+    def _children(self) -> Sequence[TSType]:
+        return self.value_types
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        out.write("{")
         first = True
         for key, value_type, required in zip(
             self.keys, self.value_types, self.required, strict=True
         ):
-            string += (
-                f"{'' if first else ' '}{key}{'' if required else '?'}: "
-                f"{value_type.generate(type_name)};"
-            )
+            out.write(f"{'' if first else ' '}{key}{'' if required else '?'}: ")
+            value_type._emit(out, type_name)
+            out.write(";")
             first = False
-        return f"{{{string}}}"
+        out.write("}")
 
 
 class TSAggregatorType(TSType):
+    __slots__ = ("types",)
+
     def __init__(self, types: Sequence[TSType]):
-        self.types: Sequence[TSType] = types
+        self.types: Sequence[TSType] = tuple(types)
+        self._finalize()
+
+    def _key(self) -> tuple:
+        return (self.types,)
+
+    def _children(self) -> Sequence[TSType]:
+        return self.types
 
 
 class TSUnion(TSAggregatorType):
-    def _generate(self, type_name: str | None = None) -> str:
-        return " | ".join([t.generate(type_name) for t in self.types])
+    __slots__ = ()
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        for i, t in enumerate(self.types):
+            if i > 0:
+                out.write(" | ")
+            t._emit(out, type_name)
 
 
 class TSTuple(TSAggregatorType):
-    def _generate(self, type_name: str | None = None) -> str:
-        return "[" + ", ".join([t.generate(type_name) for t in self.types]) + "]"
+    __slots__ = ()
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        out.write("[")
+        for i, t in enumerate(self.types):
+            if i > 0:
+                out.write(", ")
+            t._emit(out, type_name)
+        out.write("]")
 
 
 class TSArray(TSType):
+    __slots__ = ("type_",)
+
     def __init__(self, type_: TSType):
         self.type_: TSType = type_
+        self._finalize()
 
-    def _generate(self, type_name: str | None = None) -> str:
+    def _key(self) -> tuple:
+        return (self.type_,)
+
+    def _children(self) -> Sequence[TSType]:
+        return (self.type_,)
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
         if isinstance(self.type_, TSUnion):
-            return f"({self.type_.generate(type_name)})[]"
-        return f"{self.type_.generate(type_name)}[]"
+            out.write("(")
+            self.type_._emit(out, type_name)
+            out.write(")[]")
+        else:
+            self.type_._emit(out, type_name)
+            out.write("[]")
 
 
 class TSRecursiveType(TSType):
-    def _generate(self, type_name: str | None = None) -> str:
-        return "=Self" if type_name is None else type_name
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        self._finalize()
+        self._uses_type_name = True
+
+    def _key(self) -> tuple:
+        return ()
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        out.write("=Self" if type_name is None else type_name)
+
+
+class TSReference(TSType):
+    """A reference to a hoisted declaration, such as `Page<User>`.
+
+    `name` is the name the declaration would like to have; the name it is actually
+    written under is looked up by `key` (see `declaration_names`).
+    """
+
+    __slots__ = ("args", "key", "name")
+
+    def __init__(self, key: str, name: str, args: Sequence[TSType] = ()):
+        self.key = key
+        self.name = name
+        self.args: Sequence[TSType] = tuple(args)
+        self._finalize()
+
+    def _key(self) -> tuple:
+        return (self.key, self.args)
+
+    def _children(self) -> Sequence[TSType]:
+        return self.args
+
+    def _emit(self, out: SupportsWrite, type_name: str | None = None) -> None:
+        names = _declaration_names.get()
+        out.write(self.name if names is None else names.get(self.key, self.name))
+        if len(self.args) == 0:
+            return
+        out.write("<")
+        for i, arg in enumerate(self.args):
+            if i > 0:
+                out.write(", ")
+            arg._emit(out, type_name)
+        out.write(">")
+
+
+class TSDeclaration(typing.NamedTuple):
+    """A named type, written once and referred to by `TSReference`s."""
+
+    key: str
+    name: str
+    params: tuple[str, ...]
+    definition: TSType
+
+
+_declaration_names: contextvars.ContextVar[Mapping[str, str] | None] = (
+    contextvars.ContextVar("typesync_declaration_names", default=None)
+)
+
+
+@contextlib.contextmanager
+def declaration_names(names: Mapping[str, str]) -> Iterator[None]:
+    """Write references using the names in `names` (keyed by declaration key)."""
+    token = _declaration_names.set(names)
+    try:
+        yield
+    finally:
+        _declaration_names.reset(token)
+
+
+def iter_references(t: TSType) -> Iterator[TSReference]:
+    """Yield every `TSReference` in `t`, in the order they would be written."""
+    stack = [t]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, TSReference):
+            yield current
+        stack.extend(reversed(current._children()))
+
+
+def rekey_references(t: TSType, keys: Mapping[str, str]) -> TSType:
+    """A copy of `t` where references to the declarations in `keys` use the keys
+    they map to instead."""
+    if not any(reference.key in keys for reference in iter_references(t)):
+        return t
+    state = {
+        name: _rekey_value(value, keys) for name, value in t.__getstate__().items()
+    }
+    if isinstance(t, TSReference):
+        state["key"] = keys.get(t.key, t.key)
+    copy = object.__new__(type(t))
+    copy.__setstate__(state)
+    return copy
+
+
+def _rekey_value(value: typing.Any, keys: Mapping[str, str]) -> typing.Any:
+    if isinstance(value, TSType):
+        return rekey_references(value, keys)
+    if isinstance(value, (tuple, list)):
+        return type(value)(_rekey_value(item, keys) for item in value)
+    return value
 
 
 def is_signal(t: TSType):
     return isinstance(t, TSSimpleType) and t.type_ == "..."
+
+
+def is_undefined(t: TSType):
+    return isinstance(t, TSSimpleType) and t.type_ == "undefined"
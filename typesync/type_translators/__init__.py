@@ -5,6 +5,7 @@ __all__ = [
     "PydanticTranslator",
     "TranslationContext",
     "Translator",
+    "TranslatorRegistry",
     "TypeNode",
     "to_type_node",
 ]
@@ -15,4 +16,5 @@ from .flask_translator import FlaskTranslator
 from .pydantic_translator import PydanticTranslator
 from .context import TranslationContext
 from .abstract import Translator
+from .registry import TranslatorRegistry
 from .type_node import TypeNode, to_type_node
@@ -1,28 +1,98 @@
 import abc
+import contextlib
 import typing
 
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Collection, Iterator
+
     from . import TypeNode
     from .context import TranslationContext
+    from .declarations import DeclarationTable, InstanceTable
     from typesync.ts_types import TSType
 
 
 class Translator(abc.ABC):
     DEFAULT_PRIORITY: int = 0
     ID: str
+    # Set by the registry when named types should be hoisted into declarations
+    declarations: "DeclarationTable | None" = None
+    # Set by the registry to translate each instance of a named type only once
+    instances: "InstanceTable | None" = None
+    # The origins of the nodes this translator can translate, along with those
+    # accepted by `handles()`. The registry only consults a translator for nodes
+    # with one of these origins, or for every node if this is left as `None`.
+    ORIGINS: typing.ClassVar["Collection[typing.Any] | None"] = None
 
     def __init__(
         self,
         translate: typing.Callable[
             ["TypeNode", dict[typing.TypeVar, "TSType"] | None], "TSType"
         ],
-        ctx: "TranslationContext",
+        ctx: "TranslationContext | None" = None,
     ) -> None:
         self._translate = translate
-        self.ctx = ctx
+        self._ctx = ctx
+
+    @property
+    def ctx(self) -> "TranslationContext":
+        if self._ctx is None:
+            raise RuntimeError(  # noqa: TRY003
+                f"translator {self.ID!r} was used outside of a translation context"
+            )
+        return self._ctx
+
+    @contextlib.contextmanager
+    def bind(self, ctx: "TranslationContext") -> "Iterator[None]":
+        """Use `ctx` as the context of the translations made inside this block.
+
+        Translators are shared across a whole run, so the registry binds the
+        context of each translation; the previous one is restored afterwards,
+        e.g. when a translation is started while another one is in progress.
+        """
+        previous, self._ctx = self._ctx, ctx
+        try:
+            yield
+        finally:
+            self._ctx = previous
+
+    def handles(self, origin: typing.Any) -> bool:
+        """Whether this translator can translate nodes with `origin`, besides those
+        in `ORIGINS` (e.g. subclasses of some class)."""
+        return False
 
     @abc.abstractmethod
     def translate(
         self, node: "TypeNode", generics: dict[typing.TypeVar, "TSType"] | None
     ) -> "TSType | None": ...
+
+    def _hoist(
+        self,
+        node: "TypeNode",
+        args: tuple["TSType", ...],
+        define: typing.Callable[[dict[typing.TypeVar, "TSType"]], "TSType"],
+    ) -> "TSType":
+        """Translate the named type `node` with `define`, or refer to it by name.
+
+        `define` receives the generics mapping of the type's parameters. When types
+        are hoisted, it is called once with the parameters left as TypeScript
+        generics; otherwise it's called with `args`. Either way, each instance of
+        `node` is only translated once per run (see `InstanceTable`).
+        """
+        if self.instances is None:
+            return self._hoist_instance(node, args, define)
+        return self.instances.instantiate(
+            node, args, self.ctx, lambda: self._hoist_instance(node, args, define)
+        )
+
+    def _hoist_instance(
+        self,
+        node: "TypeNode",
+        args: tuple["TSType", ...],
+        define: typing.Callable[[dict[typing.TypeVar, "TSType"]], "TSType"],
+    ) -> "TSType":
+        if self.declarations is not None:
+            reference = self.declarations.reference(node, args, self.ctx, define)
+            if reference is not None:
+                return reference
+        return define(dict(zip(node.params, args, strict=True)))
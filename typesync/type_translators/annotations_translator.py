@@ -10,6 +10,7 @@ from typesync.ts_types import TSSimpleType, TSType
 class AnnotationsTranslator(Translator):
     DEFAULT_PRIORITY = -100
     ID = "typesync.AnnotationsTranslator"
+    ORIGINS = frozenset({typing.Annotated})
 
     def _translate_http_method_annotation(
         self,
@@ -20,6 +20,35 @@ from typesync.utils import Loadable
 class BaseTranslator(Translator):
     DEFAULT_PRIORITY = 0
     ID = "typesync.BaseTranslator"
+    ORIGINS = frozenset(
+        {
+            RecursiveCall,
+            Loadable,
+            typing.Literal,
+            typing.NotRequired,
+            # Simple types
+            str,
+            int,
+            float,
+            bool,
+            None,
+            type(None),
+            typing.Any,
+            typing.Never,
+            ...,
+            # Complex types
+            dict,
+            list,
+            tuple,
+            types.UnionType,
+            typing.Union,
+        }
+    )
+
+    def handles(self, origin: typing.Any) -> bool:
+        return isinstance(
+            origin, (typing.TypeVar, typing.TypeAliasType)
+        ) or typing.is_typeddict(origin)
 
     def _unwrap_generic(
         self, node: TypeNode, generics: dict[typing.TypeVar, TSType]
@@ -36,11 +65,11 @@ class BaseTranslator(Translator):
         return tuple(self._unwrap_generic(arg, generics) for arg in args)
 
     def _translate_hints(
-        self, hints: dict[str, TypeNode], generics: dict[typing.TypeVar, TSType]
+        self,
+        hints: tuple[tuple[str, TypeNode], ...],
+        generics: dict[typing.TypeVar, TSType],
     ) -> dict[str, TSType]:
-        return {
-            key: self._unwrap_generic(hint, generics) for key, hint in hints.items()
-        }
+        return {key: self._unwrap_generic(hint, generics) for key, hint in hints}
 
     def _translate_simple_type(self, origin: typing.Any) -> TSType | None:
         if origin is str:
@@ -103,13 +132,20 @@ class BaseTranslator(Translator):
         self, node: TypeNode, generics: dict[typing.TypeVar, TSType]
     ) -> TSType | None:
         translated_args = self._translate_args(node.args, generics)
-        translated_hints = self._translate_hints(
-            node.hints, dict(zip(node.params, translated_args, strict=True))
+        return self._hoist(
+            node,
+            translated_args,
+            lambda generics: self._translate_typed_dict_body(node, generics),
         )
 
-        keys = tuple(node.hints.keys())
+    def _translate_typed_dict_body(
+        self, node: TypeNode, generics: dict[typing.TypeVar, TSType]
+    ) -> TSType:
+        translated_hints = self._translate_hints(node.hints, generics)
+
+        keys = tuple(key for key, _ in node.hints)
         required = tuple(
-            node.origin is not typing.NotRequired for node in node.hints.values()
+            hint.origin is not typing.NotRequired for _, hint in node.hints
         )
         value_types = tuple(arg_value for arg_value in translated_hints.values())
         return TSObject(keys, value_types, required)
@@ -119,9 +155,10 @@ class BaseTranslator(Translator):
     ) -> TSType | None:
         if node.value is None:
             return None
+        value = node.value
         translated_args = self._translate_args(node.args, generics)
-        return self._translate(
-            node.value, dict(zip(node.params, translated_args, strict=True))
+        return self._hoist(
+            node, translated_args, lambda generics: self._translate(value, generics)
         )
 
     def _translate_recursive_call(
@@ -0,0 +1,188 @@
+import re
+import typing
+from collections.abc import Callable, Iterator, Mapping
+
+from .type_node import TypeNode, depends_on_http_method
+from typesync.ts_types import TSDeclaration, TSReference, TSSimpleType, TSType
+
+if typing.TYPE_CHECKING:
+    from .context import TranslationContext
+    from .registry import TranslatorRegistry
+
+
+type Generics = dict[typing.TypeVar, TSType]
+
+
+def declaration_name(origin: typing.Any) -> str:
+    """A valid TypeScript identifier for the type `origin`."""
+    name = re.sub(r"\W+", "_", getattr(origin, "__name__", "")).strip("_")
+    return name or "Type"
+
+
+class DeclarationTable(Mapping[str, TSDeclaration]):
+    """Named Python types hoisted into their own TypeScript declarations.
+
+    Each distinct type (keyed by its module and qualified name) is translated once
+    per translation mode, with its type parameters left as TypeScript generics, and
+    is referred to by name everywhere else. Types that translate the same way in
+    every mode (most of them) share a single declaration.
+    """
+
+    def __init__(self, registry: "TranslatorRegistry") -> None:
+        self._registry = registry
+        self._declarations: dict[str, TSDeclaration] = {}
+        self._warnings: dict[str, str] = {}
+        # Declarations currently being translated, so recursive types can refer
+        # to themselves before they're done
+        self._pending: dict[str, str] = {}
+        self._keys: dict[tuple[typing.Any, str], str] = {}
+        self._used_keys: set[str] = set()
+        # Keys of the declarations of each type, one per distinct translation
+        self._variants: dict[typing.Any, list[str]] = {}
+
+    def __getitem__(self, key: str) -> TSDeclaration:
+        return self._declarations[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._declarations)
+
+    def __len__(self) -> int:
+        return len(self._declarations)
+
+    def key(self, origin: typing.Any, mode: str) -> str | None:
+        key = self._keys.get((origin, mode))
+        if key is not None:
+            return key
+
+        module = getattr(origin, "__module__", None)
+        name = getattr(origin, "__qualname__", None) or getattr(
+            origin, "__name__", None
+        )
+        if module is None or name is None:
+            return None
+        key = base_key = f"{module}.{name}"
+        if origin in self._variants:
+            # The type already has a key for another mode
+            key = base_key = f"{base_key}@{mode}"
+        else:
+            self._variants[origin] = []
+        # Different types can share a qualified name (e.g. classes created by a
+        # factory function), they must not share a declaration
+        i = 2
+        while key in self._used_keys:
+            key = f"{base_key}#{i}"
+            i += 1
+        self._keys[origin, mode] = key
+        self._used_keys.add(key)
+        return key
+
+    def reference(
+        self,
+        node: TypeNode,
+        args: tuple[TSType, ...],
+        ctx: "TranslationContext",
+        define: Callable[[Generics], TSType],
+    ) -> TSReference | None:
+        """Refer to the declaration of `node` in the mode of `ctx`, defining it with
+        `define` if needed.
+
+        Returns None when `node` can't be hoisted, in which case it should be
+        translated inline.
+        """
+        if len(args) != len(node.params) or depends_on_http_method(node):
+            return None
+        key = self.key(node.origin, ctx.mode)
+        if key is None:
+            return None
+
+        declaration = self._declarations.get(key)
+        if declaration is not None:
+            name = declaration.name
+            warning = self._warnings.get(key)
+            if warning is not None:
+                self._registry.warn(warning)
+        elif key in self._pending:
+            name = self._pending[key]
+        else:
+            key = self._define(key, node, ctx.mode, define)
+            name = self._declarations[key].name
+        return TSReference(key, name, args)
+
+    def _define(
+        self,
+        key: str,
+        node: TypeNode,
+        mode: str,
+        define: Callable[[Generics], TSType],
+    ) -> str:
+        name = declaration_name(node.origin)
+        params = tuple(param.__name__ for param in node.params)
+        generics: Generics = {
+            param: TSSimpleType(param_name)
+            for param, param_name in zip(node.params, params, strict=True)
+        }
+        self._pending[key] = name
+        try:
+            definition, warning = self._registry.capture_warning(define, generics)
+        finally:
+            del self._pending[key]
+
+        if warning is not None:
+            self._registry.warn(warning)
+
+        variants = self._variants[node.origin]
+        for other in variants:
+            declaration = self._declarations[other]
+            if (
+                declaration.params == params
+                and declaration.definition == definition
+                and self._warnings.get(other) == warning
+            ):
+                self._keys[node.origin, mode] = other
+                return other
+
+        self._declarations[key] = TSDeclaration(key, name, params, definition)
+        if warning is not None:
+            self._warnings[key] = warning
+        variants.append(key)
+        return key
+
+
+class InstanceTable:
+    """Translations of named types (TypedDicts, pydantic models and type aliases)
+    applied to specific arguments, kept for a whole run.
+
+    Nested aliases such as `type A[T] = B[B[T]]` would otherwise be expanded again
+    at every use site, which is exponential in their depth. Instances are keyed by
+    their node and translated arguments, and by the mode and HTTP method of the
+    translation, which are the parts of the context translators depend on.
+    """
+
+    def __init__(self, registry: "TranslatorRegistry") -> None:
+        self._registry = registry
+        self._instances: dict[
+            tuple[TypeNode, tuple[TSType, ...], str, str], tuple[TSType, str | None]
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    def instantiate(
+        self,
+        node: TypeNode,
+        args: tuple[TSType, ...],
+        ctx: "TranslationContext",
+        translate: Callable[[], TSType],
+    ) -> TSType:
+        """The translation of `node` applied to `args`, calling `translate` the
+        first time it is needed."""
+        key = (node, args, ctx.mode, ctx.method)
+        instance = self._instances.get(key)
+        if instance is None:
+            instance = self._registry.capture_warning(translate)
+            self._instances[key] = instance
+
+        result, warning = instance
+        if warning is not None:
+            self._registry.warn(warning)
+        return result
@@ -9,6 +9,7 @@ from typesync.utils import Response
 class FlaskTranslator(Translator):
     DEFAULT_PRIORITY = -10
     ID = "typesync.FlaskTranslator"
+    ORIGINS = frozenset({Response})
 
     def translate(
         self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
@@ -8,6 +8,8 @@ from .type_node import TypeNode, to_type_node
 class PydanticTranslator(Translator):
     DEFAULT_PRIORITY = -20
     ID = "typesync.PydanticTranslator"
+    # Models are matched by `handles()`
+    ORIGINS = frozenset()
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
@@ -21,14 +23,24 @@ class PydanticTranslator(Translator):
 
         self._pydantic = pydantic
 
+    def handles(self, origin: typing.Any) -> bool:
+        return isinstance(origin, type) and issubclass(origin, self._pydantic.BaseModel)
+
     def translate(
         self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
     ) -> TSType | None:
-        if not isinstance(node.origin, type) or not issubclass(
-            node.origin, self._pydantic.BaseModel
-        ):
+        if not self.handles(node.origin):
             return None
 
+        if len(node.params) > 0:
+            return self._translate_model(node, generics)
+        return self._hoist(
+            node, (), lambda generics: self._translate_model(node, generics)
+        )
+
+    def _translate_model(
+        self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
+    ) -> TSType:
         keys = tuple(node.origin.model_fields.keys())
         value_types = tuple(
             self._translate(to_type_node(value.annotation, node), generics)
@@ -0,0 +1,245 @@
+import contextlib
+import time
+import typing
+
+from .abstract import Translator
+from .context import TranslationContext
+from .declarations import DeclarationTable, InstanceTable
+from .stats import TranslatorStats
+from .type_node import TypeNode, depends_on_http_method, to_type_node
+from typesync.misc import HTTPMethod
+from typesync.profiling import profile
+from typesync.ts_types import TSSimpleType, TSType
+
+
+def sort_translators[T: type[Translator] | Translator](
+    translators: typing.Iterable[T],
+    priorities: dict[str, int],
+) -> tuple[T, ...]:
+    return tuple(
+        sorted(translators, key=lambda t: -priorities.get(t.ID, t.DEFAULT_PRIORITY))
+    )
+
+
+def default_translators() -> tuple[type[Translator], ...]:
+    from . import (  # noqa: PLC0415
+        AnnotationsTranslator,
+        BaseTranslator,
+        FlaskTranslator,
+        PydanticTranslator,
+    )
+
+    return (
+        AnnotationsTranslator,
+        BaseTranslator,
+        FlaskTranslator,
+        PydanticTranslator,
+    )
+
+
+class TranslatorRegistry:
+    """The set of translators used during a single generation run.
+
+    Each translator is instantiated once and reused for every route; the
+    `TranslationContext` is handed over on each call to `translate()` instead of
+    being bound at construction time.
+
+    With `hoist_types`, named types (TypedDicts, pydantic models and type aliases)
+    are translated once into `declarations` and referred to by name.
+
+    With `collect_stats`, `stats` counts how many types each translator was asked
+    to translate, how many it did translate and the time it took, by translator ID.
+    """
+
+    def __init__(
+        self,
+        translators: tuple[type[Translator], ...] | None = None,
+        translator_priorities: dict[str, int] | None = None,
+        hoist_types: bool = False,
+        collect_stats: bool = False,
+    ) -> None:
+        self.translator_priorities = (
+            {} if translator_priorities is None else translator_priorities
+        )
+        self.translator_types = sort_translators(
+            (*default_translators(), *(translators or ())),
+            self.translator_priorities,
+        )
+        self._warning: str | None = None
+        # Results for method-independent subtrees, shared between the
+        # per-method translations of a single type (see `translate_methods`)
+        self._shared: dict[typing.Any, tuple[TSType, str | None]] | None = None
+        self.declarations = DeclarationTable(self) if hoist_types else None
+        self.instances = InstanceTable(self)
+        self.translators = tuple(
+            Translator(self._dispatch, None) for Translator in self.translator_types
+        )
+        for translator in self.translators:
+            translator.declarations = self.declarations
+            translator.instances = self.instances
+        self.stats: dict[str, TranslatorStats] | None = (
+            {t.ID: TranslatorStats() for t in self.translator_types}
+            if collect_stats
+            else None
+        )
+        # Time spent in the nested dispatches of each translator being timed
+        self._nested_seconds: list[float] = []
+        # The translators to consult for each node origin, in priority order
+        self._dispatch_index: dict[tuple[type, typing.Any], tuple[Translator, ...]] = {}
+
+    @property
+    def priorities(self) -> dict[str, int]:
+        """The priority of each translator, by ID."""
+        return {
+            t.ID: self.translator_priorities.get(t.ID, t.DEFAULT_PRIORITY)
+            for t in self.translator_types
+        }
+
+    def warn(self, warning: str) -> None:
+        """Report `warning` for the translation currently in progress."""
+        self._warning = warning
+
+    def capture_warning[**P](
+        self, translate: typing.Callable[P, TSType], *args: P.args, **kwargs: P.kwargs
+    ) -> tuple[TSType, str | None]:
+        """Call `translate`, returning its result and the warning it reported."""
+        outer_warning, self._warning = self._warning, None
+        try:
+            return translate(*args, **kwargs), self._warning
+        finally:
+            self._warning = outer_warning
+
+    def _dispatch(
+        self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
+    ) -> TSType:
+        if self._shared is None or depends_on_http_method(node):
+            return self._dispatch_uncached(node, generics)
+
+        key = (node, tuple(generics.items()) if generics else ())
+        cached = self._shared.get(key)
+        if cached is not None:
+            result, warning = cached
+        else:
+            result, warning = self.capture_warning(
+                self._dispatch_uncached, node, generics
+            )
+            self._shared[key] = (result, warning)
+
+        if warning is not None:
+            self.warn(warning)
+        return result
+
+    def _candidates(self, origin: typing.Any) -> tuple[Translator, ...]:
+        """The translators that may translate nodes with `origin`, in priority
+        order."""
+        try:
+            # The type tells apart equal origins such as `1` and `True`
+            key = (type(origin), origin)
+            return self._dispatch_index[key]
+        except TypeError:
+            # Unhashable origins (e.g. some literal values)
+            return self.translators
+        except KeyError:
+            pass
+        candidates = tuple(
+            translator
+            for translator in self.translators
+            if translator.ORIGINS is None
+            or origin in translator.ORIGINS
+            or translator.handles(origin)
+        )
+        self._dispatch_index[key] = candidates
+        return candidates
+
+    def _dispatch_uncached(
+        self, node: TypeNode, generics: dict[typing.TypeVar, TSType] | None
+    ) -> TSType:
+        for translator in self._candidates(node.origin):
+            r = (
+                translator.translate(node, generics)
+                if self.stats is None
+                else self._timed_translate(translator, node, generics)
+            )
+            if r is not None:
+                return r
+
+        self.warn(
+            f"can't translate '{getattr(node.origin, '__name__', node.origin)}'"
+            " to a TypeScript equivalent, defaulting to 'any'"
+        )
+        return TSSimpleType("any")
+
+    def _timed_translate(
+        self,
+        translator: Translator,
+        node: TypeNode,
+        generics: dict[typing.TypeVar, TSType] | None,
+    ) -> TSType | None:
+        assert self.stats is not None  # noqa: S101
+        r = None
+        self._nested_seconds.append(0.0)
+        start = time.perf_counter()
+        try:
+            r = translator.translate(node, generics)
+        finally:
+            seconds = time.perf_counter() - start
+            nested_seconds = self._nested_seconds.pop()
+            if self._nested_seconds:
+                self._nested_seconds[-1] += seconds
+            stats = self.stats[translator.ID]
+            stats.attempts += 1
+            stats.seconds += seconds - nested_seconds
+            if r is not None:
+                stats.hits += 1
+        return r
+
+    def translate(
+        self, type_: typing.Any, ctx: TranslationContext
+    ) -> tuple[TSType, str | None]:
+        with profile("type_node"):
+            node = to_type_node(type_)
+        with profile("translate", ctx.method):
+            return self._translate_node(node, ctx)
+
+    def translate_methods(
+        self,
+        type_: typing.Any,
+        ctx: TranslationContext,
+        methods: typing.Iterable[HTTPMethod],
+    ) -> dict[HTTPMethod, tuple[TSType, str | None]]:
+        """Translate `type_` for each of `methods`.
+
+        Types that don't depend on the HTTP method are translated once and the
+        result is shared by every method. Otherwise, only the subtrees that do
+        depend on it are translated again for each method.
+        """
+        methods = sorted(methods)
+        if len(methods) == 0:
+            return {}
+
+        with profile("type_node"):
+            node = to_type_node(type_)
+        if not depends_on_http_method(node):
+            ctx.method = methods[0]
+            with profile("translate"):
+                result = self._translate_node(node, ctx)
+            return dict.fromkeys(methods, result)
+
+        results: dict[HTTPMethod, tuple[TSType, str | None]] = {}
+        self._shared = {}
+        try:
+            for method in methods:
+                ctx.method = method
+                with profile("translate", method):
+                    results[method] = self._translate_node(node, ctx)
+        finally:
+            self._shared = None
+        return results
+
+    def _translate_node(
+        self, node: TypeNode, ctx: TranslationContext
+    ) -> tuple[TSType, str | None]:
+        with contextlib.ExitStack() as stack:
+            for translator in self.translators:
+                stack.enter_context(translator.bind(ctx))
+            return self.capture_warning(self._dispatch, node, {})
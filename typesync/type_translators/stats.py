@@ -0,0 +1,46 @@
+import dataclasses
+import typing
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+@dataclasses.dataclass
+class TranslatorStats:
+    """How a translator fared while dispatching types."""
+
+    # Number of types the translator was asked to translate
+    attempts: int = 0
+    # Number of those it did translate
+    hits: int = 0
+    # Time spent in the translator, excluding the nested types it dispatched
+    seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+
+def format_translator_stats(
+    stats: "Mapping[str, TranslatorStats]", priorities: "Mapping[str, int]"
+) -> str:
+    """A table of `stats` by translator ID, in dispatch order."""
+    from prettytable import PrettyTable  # noqa: PLC0415
+
+    table = PrettyTable(
+        ["ID", "Priority", "Attempts", "Hits", "Hit rate (%)", "Time (ms)"]
+    )
+    for translator_id, translator_stats in stats.items():
+        table.add_row(
+            [
+                translator_id,
+                priorities[translator_id],
+                translator_stats.attempts,
+                translator_stats.hits,
+                f"{translator_stats.hit_rate * 100:.1f}",
+                f"{translator_stats.seconds * 1000:.1f}",
+            ]
+        )
+    table.align = "r"
+    table.align["ID"] = "l"
+    return table.get_string()
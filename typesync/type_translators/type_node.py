@@ -1,6 +1,9 @@
 import dataclasses
+import functools
 import typing
 
+from typesync.annotations import TypesyncHTTPMethodAnnotation
+
 
 class RecursiveCallClass:
     def __repr__(self):
@@ -10,14 +13,49 @@ class RecursiveCallClass:
 RecursiveCall = RecursiveCallClass()
 
 
-@dataclasses.dataclass(frozen=True)
+def _value_key(value: typing.Any) -> tuple[type, typing.Any]:
+    # The type is part of the key so that e.g. `Literal[1]` and `Literal[True]`
+    # (where `1 == True`) don't end up sharing a node. Unhashable values (such as
+    # some `Annotated` metadata) are compared by identity instead.
+    try:
+        hash(value)
+    except TypeError:
+        return type(value), id(value)
+    return type(value), value
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
 class TypeNode:
     origin: typing.Any
     params: tuple[typing.TypeVar, ...]
     args: tuple["TypeNode", ...]
-    hints: dict[str, "TypeNode"]
+    hints: tuple[tuple[str, "TypeNode"], ...]
     value: "TypeNode | None"
     annotation: typing.Any
+    _key: tuple = dataclasses.field(init=False, repr=False)
+    _hash: int = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        key = (
+            _value_key(self.origin),
+            self.params,
+            self.args,
+            self.hints,
+            self.value,
+            _value_key(self.annotation),
+        )
+        object.__setattr__(self, "_key", key)
+        object.__setattr__(self, "_hash", hash(key))
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, TypeNode):
+            return NotImplemented
+        return self._hash == other._hash and self._key == other._key
+
+    def __hash__(self) -> int:
+        return self._hash
 
     def __repr__(self) -> str:
         s = f"<TypeNode {getattr(self.origin, '__name__', self.origin)}"
@@ -26,7 +64,7 @@ class TypeNode:
         if len(self.args):
             s += f" args={self.args}"
         if len(self.hints):
-            s += f" hints={self.hints}"
+            s += f" hints={dict(self.hints)}"
         if self.value is not None:
             s += f" value={self.value}"
         if self.annotation is not None:
@@ -34,10 +72,66 @@ class TypeNode:
         return s + ">"
 
 
+# Every node is interned, so structurally identical subtrees are shared in
+# memory and can be compared by identity in the common case.
+_interned_nodes: dict[TypeNode, TypeNode] = {}
+
+# Maps (id(type_), original_type, mapping) to (type_, node). The type object is
+# kept alive alongside its node so that its id can't be reused.
+_type_node_memo: dict[tuple, tuple[typing.Any, TypeNode]] = {}
+
+
+def make_type_node(
+    origin: typing.Any,
+    params: tuple[typing.TypeVar, ...],
+    args: tuple[TypeNode, ...],
+    hints: tuple[tuple[str, TypeNode], ...],
+    value: TypeNode | None,
+    annotation: typing.Any,
+) -> TypeNode:
+    node = TypeNode(
+        origin=origin,
+        params=params,
+        args=args,
+        hints=hints,
+        value=value,
+        annotation=annotation,
+    )
+    return _interned_nodes.setdefault(node, node)
+
+
+def clear_type_node_cache() -> None:
+    """Forget every memoized and interned `TypeNode`.
+
+    Long-lived processes should call this after reloading modules, so that nodes
+    referring to stale type objects can be garbage collected.
+    """
+    _type_node_memo.clear()
+    _interned_nodes.clear()
+    depends_on_http_method.cache_clear()
+
+
 def to_type_node(
-    type_: typing.Any, original_type: TypeNode | None = None, mapping=None
+    type_: typing.Any,
+    original_type: TypeNode | None = None,
+    mapping: dict[typing.TypeVar, TypeNode] | None = None,
 ) -> TypeNode:
     mapping = {} if mapping is None else mapping
+    key = (id(type_), original_type, tuple(mapping.items()))
+    cached = _type_node_memo.get(key)
+    if cached is not None:
+        return cached[1]
+
+    node = _to_type_node(type_, original_type, mapping)
+    _type_node_memo[key] = (type_, node)
+    return node
+
+
+def _to_type_node(
+    type_: typing.Any,
+    original_type: TypeNode | None,
+    mapping: dict[typing.TypeVar, TypeNode],
+) -> TypeNode:
     origin = typing.get_origin(type_) or type_
     params: tuple[typing.TypeVar, ...] = getattr(origin, "__type_params__", ())
     args = ()
@@ -51,10 +145,10 @@ def to_type_node(
         if len(base_args) > 0:
             args = (to_type_node(base_args[0], original_type, mapping),)
             annotations = base_args[1:]
-    hints = {
-        key: to_type_node(hint, original_type, mapping)
+    hints = tuple(
+        (key, to_type_node(hint, original_type, mapping))
         for key, hint in getattr(origin, "__annotations__", {}).items()
-    }
+    )
     patched_args = args
     if original_type is not None and origin is original_type.origin:
         mapping = {
@@ -72,7 +166,7 @@ def to_type_node(
         ):
             origin = RecursiveCall
 
-    node = TypeNode(
+    node = make_type_node(
         origin=origin,
         params=params,
         args=args,
@@ -81,7 +175,7 @@ def to_type_node(
         value=(
             to_type_node(
                 origin.__value__,
-                TypeNode(
+                make_type_node(
                     origin=origin,
                     params=params,
                     args=patched_args,
@@ -96,13 +190,28 @@ def to_type_node(
         ),
     )
     for annotation in annotations[1:]:
-        new_node = TypeNode(
+        new_node = make_type_node(
             origin=typing.Annotated,
             params=params,
             args=(node,),
-            hints={},
+            hints=(),
             annotation=annotation,
             value=None,
         )
         node = new_node
     return node
+
+
+@functools.cache
+def depends_on_http_method(node: TypeNode) -> bool:
+    """Whether translating `node` may produce different results per HTTP method.
+
+    This is the case when any part of the tree is annotated with a
+    `TypesyncHTTPMethodAnnotation` (e.g. `ForHTTPGet[T]`).
+    """
+    return (
+        isinstance(node.annotation, TypesyncHTTPMethodAnnotation)
+        or any(depends_on_http_method(arg) for arg in node.args)
+        or any(depends_on_http_method(hint) for _, hint in node.hints)
+        or (node.value is not None and depends_on_http_method(node.value))
+    )